@@ -0,0 +1,234 @@
+"""비동기 부하 생성기
+
+사용법:
+    python -m app.bench --target pessimistic optimistic distributed advisory --concurrency 1000 --requests 100000
+    python -m app.bench --target optimistic --loop open --rate 2000 --duration 30 --accounts 1000 --distribution zipf
+    python -m app.bench --target pessimistic --param mode=atomic --json result.json
+    python -m app.bench --target distributed ledger --concurrency 500 --requests 50000 --initialize
+
+closed 루프: concurrency 개의 워커가 응답을 받자마자 다음 요청 전송
+open 루프  : 응답과 상관없이 고정 도착률(rate/s)로 요청 전송 (지연시간은 예정 시각 기준으로 측정)
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from array import array
+from typing import Dict, List, Optional
+
+import aiohttp
+
+from .workload import OUTCOMES, DISTRIBUTIONS, AccountSampler, account_ids, classify
+from .seeding import BALANCE_DISTRIBUTIONS
+
+TARGETS = ["pessimistic", "optimistic", "distributed", "advisory", "serializable", "ledger", "sharded"]
+# ledger는 distributed와 같은 DB 테이블을 쓰고, sharded는 샤드 DB가 따로 필요하므로 기본 실행에서는 제외 (--target 으로 지정)
+DEFAULT_TARGETS = ["pessimistic", "optimistic", "distributed", "advisory", "serializable"]
+PERCENTILES = [("p50", 50), ("p95", 95), ("p99", 99), ("p999", 99.9)]
+
+
+class BenchResult:
+    """대상 1개에 대한 측정 결과"""
+
+    def __init__(self, target: str):
+        self.target = target
+        self.outcomes: Dict[str, int] = {outcome: 0 for outcome in OUTCOMES}
+        self.http_errors = 0
+        self.dropped = 0  # open 루프에서 동시 요청 상한 때문에 보내지 못한 요청
+        self.latencies = array("d")  # 초
+        self.started = 0.0
+        self.finished = 0.0
+        self.reconciliation: Optional[dict] = None  # ledger: Redis 원장 vs DB 대조 결과
+
+    def record(self, outcome: str, latency: float):
+        self.outcomes[outcome] += 1
+        self.latencies.append(latency)
+
+    def report(self) -> dict:
+        elapsed = self.finished - self.started
+        completed = len(self.latencies)
+        ordered = sorted(self.latencies)
+        latency_ms = {}
+        if ordered:
+            last = len(ordered) - 1
+            for name, p in PERCENTILES:
+                latency_ms[name] = round(ordered[min(last, int(len(ordered) * p / 100))] * 1000, 3)
+            latency_ms["max"] = round(ordered[-1] * 1000, 3)
+            latency_ms["mean"] = round(sum(ordered) / len(ordered) * 1000, 3)
+        report = {
+            "target": self.target,
+            "completed": completed,
+            "elapsed": round(elapsed, 3),
+            "throughput": round(completed / elapsed, 2) if elapsed > 0 else 0,
+            "latency_ms": latency_ms,
+            "outcomes": self.outcomes,
+            "http_errors": self.http_errors,
+            "dropped": self.dropped,
+        }
+        if self.reconciliation is not None:
+            report["reconciliation"] = self.reconciliation
+        return report
+
+
+async def send_transfer(session: aiohttp.ClientSession, url: str, params: dict,
+                        payload: dict, result: BenchResult, scheduled: float):
+    """이체 요청 1건 (지연시간은 scheduled 기준)"""
+    try:
+        async with session.post(url, params=params, json=payload) as response:
+            if response.status != 200:
+                result.http_errors += 1
+                result.record("error", time.perf_counter() - scheduled)
+                return
+            body = await response.json()
+        result.record(classify(body["success"], body["message"]), time.perf_counter() - scheduled)
+    except (aiohttp.ClientError, asyncio.TimeoutError):
+        result.http_errors += 1
+        result.record("error", time.perf_counter() - scheduled)
+
+
+async def run_closed(session, url, params, sampler, amount, concurrency, total, duration, result):
+    """closed 루프: 워커 concurrency개가 각자 응답을 받으면 바로 다음 요청"""
+    deadline = time.perf_counter() + duration if duration else None
+    remaining = [total]
+
+    async def worker():
+        while True:
+            if deadline is not None:
+                if time.perf_counter() >= deadline:
+                    return
+            else:
+                if remaining[0] <= 0:
+                    return
+                remaining[0] -= 1
+            from_account, to_account = sampler.pair()
+            payload = {"from_account": from_account, "to_account": to_account, "amount": amount}
+            await send_transfer(session, url, params, payload, result, time.perf_counter())
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+
+async def run_open(session, url, params, sampler, amount, rate, total, duration, max_inflight, result):
+    """open 루프: 응답과 상관없이 1/rate 간격으로 요청 전송
+    지연시간은 실제 전송 시각이 아니라 예정 시각 기준 (coordinated omission 보정)
+    """
+    count = int(rate * duration) if duration else total
+    interval = 1.0 / rate
+    inflight = set()
+    started = time.perf_counter()
+
+    for i in range(count):
+        scheduled = started + i * interval
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if len(inflight) >= max_inflight:
+            result.dropped += 1
+            continue
+        from_account, to_account = sampler.pair()
+        payload = {"from_account": from_account, "to_account": to_account, "amount": amount}
+        task = asyncio.create_task(send_transfer(session, url, params, payload, result, scheduled))
+        inflight.add(task)
+        task.add_done_callback(inflight.discard)
+
+    if inflight:
+        await asyncio.gather(*inflight)
+
+
+async def run_target(args, target: str) -> BenchResult:
+    result = BenchResult(target)
+    params = dict(item.split("=", 1) for item in args.param)
+    sampler = AccountSampler(account_ids(args.accounts), args.distribution, args.skew, args.seed)
+    url = f"{args.base_url}/{target}/transfer"
+
+    connector = aiohttp.TCPConnector(limit=0)
+    timeout = aiohttp.ClientTimeout(total=args.timeout)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        if args.initialize:
+            initialize_params = {"accounts": args.accounts, "balance_distribution": args.balance_distribution}
+            if args.seed is not None:
+                initialize_params["seed"] = args.seed
+            async with session.post(f"{args.base_url}/{target}/initialize", params=initialize_params) as response:
+                await response.read()
+
+        result.started = time.perf_counter()
+        if args.loop == "open":
+            await run_open(session, url, params, sampler, args.amount, args.rate,
+                           args.requests, args.duration, args.max_inflight, result)
+        else:
+            await run_closed(session, url, params, sampler, args.amount, args.concurrency,
+                             args.requests, args.duration, result)
+        result.finished = time.perf_counter()
+        
+        if target == "ledger":
+            # writer가 DB에 다 반영할 때까지 기다렸다가 Redis 원장과 대조
+            async with session.get(f"{args.base_url}/ledger/reconcile") as response:
+                result.reconciliation = await response.json()
+    return result
+
+
+def print_report(report: dict):
+    latency = report["latency_ms"]
+    print(f"\n=== {report['target']} ===")
+    print(f"완료: {report['completed']}건 / {report['elapsed']}초 -> {report['throughput']} req/s")
+    if latency:
+        print("지연시간(ms): " + "  ".join(f"{name}={latency[name]}" for name, _ in PERCENTILES)
+              + f"  max={latency['max']}")
+    print("결과: " + "  ".join(f"{name}={count}" for name, count in report["outcomes"].items()))
+    reconciliation = report.get("reconciliation")
+    if reconciliation:
+        print(f"원장 대조: 일치={reconciliation['consistent']}  불일치 계좌={reconciliation['mismatch_count']}  "
+              f"원장 합계={reconciliation['ledger_total']}  DB 합계={reconciliation['database_total']}")
+    if report["http_errors"] or report["dropped"]:
+        print(f"HTTP 오류: {report['http_errors']}  전송 포기(open 루프 상한): {report['dropped']}")
+
+
+def parse_args(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(prog="python -m app.bench", description="이체 API 부하 생성기")
+    parser.add_argument("--base-url", default=os.getenv("API_BASE_URL", "http://localhost:8000"))
+    parser.add_argument("--target", nargs="+", choices=TARGETS, default=DEFAULT_TARGETS)
+    parser.add_argument("--loop", choices=["closed", "open"], default="closed")
+    parser.add_argument("--concurrency", type=int, default=100, help="closed 루프 동시 요청 수")
+    parser.add_argument("--rate", type=float, default=500, help="open 루프 초당 요청 수")
+    parser.add_argument("--max-inflight", type=int, default=10000, help="open 루프 동시 요청 상한")
+    parser.add_argument("--requests", type=int, default=1000, help="총 요청 수 (--duration 없을 때)")
+    parser.add_argument("--duration", type=float, default=None, help="실행 시간 (초)")
+    parser.add_argument("--accounts", type=int, default=2, help="계좌 수")
+    parser.add_argument("--distribution", choices=DISTRIBUTIONS, default="fixed")
+    parser.add_argument("--skew", type=float, default=1.1, help="zipf 분포 지수")
+    parser.add_argument("--amount", type=int, default=10000)
+    parser.add_argument("--balance-distribution", choices=BALANCE_DISTRIBUTIONS, default="fixed",
+                        help="--initialize 시 계좌별 초기 잔액 분포")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--param", action="append", default=[],
+                        help="이체 요청 쿼리 파라미터 (예: --param mode=atomic)")
+    parser.add_argument("--initialize", action="store_true", help="실행 전 /{target}/initialize 호출")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--json", default=None, help="JSON 결과 파일 경로 ('-'면 표준출력)")
+    return parser.parse_args(argv)
+
+
+async def main(argv: Optional[List[str]] = None):
+    args = parse_args(argv)
+    reports = []
+    for target in args.target:
+        result = await run_target(args, target)
+        report = result.report()
+        reports.append(report)
+        print_report(report)
+
+    output = {
+        "config": {key: value for key, value in vars(args).items() if key != "json"},
+        "results": reports,
+    }
+    if args.json == "-":
+        json.dump(output, sys.stdout, ensure_ascii=False, indent=2)
+        print()
+    elif args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(output, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,103 @@
+import json
+import time
+from typing import AsyncIterator, Awaitable, Callable, List, Optional, Tuple
+from fastapi import HTTPException, Request
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from .models import TransferRequest
+
+# 벌크 이체 공통 도구 (입력 파싱 + 결과 NDJSON 스트리밍)
+
+BulkOutcome = Tuple[bool, str, Optional[int], Optional[int]]
+
+
+async def parse_bulk_transfers(request: Request) -> List[TransferRequest]:
+    """요청 본문을 이체 목록으로 변환
+    Content-Type이 application/x-ndjson 이면 한 줄에 이체 1건, 아니면 JSON 배열
+    """
+    body = await request.body()
+    try:
+        if "ndjson" in request.headers.get("content-type", ""):
+            items = [json.loads(line) for line in body.splitlines() if line.strip()]
+        else:
+            items = json.loads(body)
+            if not isinstance(items, list):
+                raise HTTPException(status_code=400, detail="이체 목록(JSON 배열)이 필요합니다.")
+        return [TransferRequest(**item) for item in items]
+    except (json.JSONDecodeError, TypeError, ValidationError) as e:
+        raise HTTPException(status_code=400, detail=f"잘못된 이체 목록입니다: {str(e)}")
+
+
+def outcome_record(index: int, outcome: BulkOutcome) -> dict:
+    success, message, from_balance, to_balance = outcome
+    return {
+        "index": index,
+        "success": success,
+        "message": message,
+        "from_balance": from_balance,
+        "to_balance": to_balance
+    }
+
+
+def outcome_line(index: int, outcome: BulkOutcome) -> str:
+    return json.dumps(outcome_record(index, outcome), ensure_ascii=False) + "\n"
+
+
+def bulk_summary(total: int, success_count: int, start_time: float) -> dict:
+    return {
+        "total_transfers": total,
+        "success_count": success_count,
+        "failed_count": total - success_count,
+        "total_execution_time": time.perf_counter() - start_time
+    }
+
+
+async def iter_bulk_outcomes(
+    transfer_bulk: Callable[[List[TransferRequest]], Awaitable[List[BulkOutcome]]],
+    transfers: List[TransferRequest],
+    chunk_size: int
+) -> AsyncIterator[Tuple[int, BulkOutcome]]:
+    """chunk_size 건씩 집합 단위로 실행하고, 청크가 끝날 때마다 (번호, 건별 결과) 를 내보냄"""
+    for start in range(0, len(transfers), chunk_size):
+        chunk = transfers[start:start + chunk_size]
+        try:
+            outcomes = await transfer_bulk(chunk)
+        except Exception as e:
+            outcomes = [(False, f"이체 중 오류가 발생했습니다: {str(e)}", None, None)] * len(chunk)
+        for offset, outcome in enumerate(outcomes):
+            yield start + offset, outcome
+
+
+async def stream_bulk_outcomes(
+    transfer_bulk: Callable[[List[TransferRequest]], Awaitable[List[BulkOutcome]]],
+    transfers: List[TransferRequest],
+    chunk_size: int
+) -> AsyncIterator[str]:
+    """건별 결과를 NDJSON으로 내보내고, 마지막에 전체 요약 한 줄 ({"summary": ...})"""
+    start_time = time.perf_counter()
+    success_count = 0
+    async for index, outcome in iter_bulk_outcomes(transfer_bulk, transfers, chunk_size):
+        success_count += outcome[0]
+        yield outcome_line(index, outcome)
+    yield json.dumps({"summary": bulk_summary(len(transfers), success_count, start_time)}, ensure_ascii=False) + "\n"
+
+
+async def bulk_response(
+    transfer_bulk: Callable[[List[TransferRequest]], Awaitable[List[BulkOutcome]]],
+    transfers: List[TransferRequest],
+    chunk_size: int,
+    stream: bool
+):
+    """stream=True 면 NDJSON 스트리밍, 아니면 전체 결과를 모아서 JSON 한 번에 반환"""
+    if stream:
+        return StreamingResponse(
+            stream_bulk_outcomes(transfer_bulk, transfers, chunk_size),
+            media_type="application/x-ndjson"
+        )
+    start_time = time.perf_counter()
+    results = [
+        outcome_record(index, outcome)
+        async for index, outcome in iter_bulk_outcomes(transfer_bulk, transfers, chunk_size)
+    ]
+    success_count = sum(1 for result in results if result["success"])
+    return {"results": results, "summary": bulk_summary(len(transfers), success_count, start_time)}
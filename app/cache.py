@@ -0,0 +1,142 @@
+import os
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+from .models import TransferRequest, TransferResponse
+
+# 잔액 조회 캐시 (프로세스 내 LRU + TTL)
+# /balances 폴링이 이체 트랜잭션과 커넥션 풀을 두고 경쟁하지 않도록 DB 앞단에서 응답
+# 항목마다 accounts.version을 같이 저장해서 더 오래된 version으로 덮어쓰지 않음 (stale 감지)
+
+
+def _cache_env(name: str, key: str, default: str) -> str:
+    """캐시 설정 환경 변수 조회: {NAME}_BALANCE_CACHE_{KEY} -> BALANCE_CACHE_{KEY} -> 기본값
+    예) OPTIMISTIC_BALANCE_CACHE_TTL=0.5, BALANCE_CACHE_MAX_SIZE=50000
+    """
+    return os.getenv(f"{name.upper()}_BALANCE_CACHE_{key}", os.getenv(f"BALANCE_CACHE_{key}", default))
+
+
+class BalanceCache:
+    """계좌 잔액 캐시 (account_id -> (잔액, version, 만료 시각))
+    조회: 캐시에 없거나 만료된 계좌만 DB에서 한 번에 읽어서 채움 (read-through)
+    쓰기: 이체 커밋 후 새 잔액/version으로 갱신 (write-through), version이 더 낮으면 무시
+    ttl이 0 이면 캐시 사용 안 함
+    """
+
+    def __init__(self, name: str, max_size: Optional[int] = None, ttl: Optional[float] = None):
+        self.name = name
+        self.max_size = max_size if max_size is not None else int(_cache_env(name, "MAX_SIZE", "10000"))
+        self.ttl = ttl if ttl is not None else float(_cache_env(name, "TTL", "1.0"))
+        self._entries: "OrderedDict[str, Tuple[int, int, float]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+        self.stale_rejections = 0  # 캐시에 있는 version보다 오래된 값으로 덮어쓰려다 거부된 횟수
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_size > 0
+
+    def get(self, account: str) -> Optional[Tuple[int, int]]:
+        """(잔액, version) 또는 None (없음/만료)"""
+        entry = self._entries.get(account)
+        if entry is None:
+            self.misses += 1
+            return None
+        balance, version, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self._entries[account]
+            self.expired += 1
+            self.misses += 1
+            return None
+        self._entries.move_to_end(account)
+        self.hits += 1
+        return balance, version
+
+    def put(self, account: str, balance: int, version: int) -> bool:
+        """version이 캐시에 있는 값 이상일 때만 저장 (동시에 읽은 예전 값이 새 값을 덮어쓰지 않도록)"""
+        if not self.enabled:
+            return False
+        entry = self._entries.get(account)
+        if entry is not None and entry[1] > version:
+            self.stale_rejections += 1
+            return False
+        self._entries[account] = (balance, version, time.monotonic() + self.ttl)
+        self._entries.move_to_end(account)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        return True
+
+    def put_rows(self, rows: Iterable):
+        """id / balance / version 컬럼이 있는 행들로 갱신"""
+        for row in rows:
+            self.put(row['id'], row['balance'], row['version'])
+
+    def record_transfer(self, request: TransferRequest, response: TransferResponse):
+        """커밋된 이체 결과로 두 계좌 갱신 (version이 없으면 무효화)"""
+        if not response.success:
+            return
+        if response.from_version is None or response.to_version is None:
+            self.invalidate([request.from_account, request.to_account])
+            return
+        self.put(request.from_account, response.from_balance, response.from_version)
+        self.put(request.to_account, response.to_balance, response.to_version)
+
+    def invalidate(self, accounts: Iterable[str]):
+        for account in accounts:
+            if self._entries.pop(account, None) is not None:
+                self.invalidations += 1
+
+    def clear(self):
+        self.invalidations += len(self._entries)
+        self._entries.clear()
+
+    async def get_many(
+        self,
+        accounts: List[str],
+        fetch: Callable[[List[str]], Awaitable[List]]
+    ) -> Dict[str, Tuple[int, int]]:
+        """여러 계좌 조회: 캐시 적중분은 그대로, 나머지는 fetch(계좌 목록) 한 번으로 읽고 캐시에 저장
+        fetch는 id / balance / version 컬럼이 있는 행 목록을 반환
+        """
+        result = {}
+        missing = []
+        for account in accounts:
+            cached = self.get(account) if self.enabled else None
+            if cached is None:
+                missing.append(account)
+            else:
+                result[account] = cached
+        if missing:
+            rows = await fetch(missing)
+            for row in rows:
+                self.put(row['id'], row['balance'], row['version'])
+                result[row['id']] = (row['balance'], row['version'])
+        return result
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "ttl": self.ttl,
+            "max_size": self.max_size,
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0,
+            "expired": self.expired,
+            "evictions": self.evictions,
+            "stale_rejections": self.stale_rejections,
+            "invalidations": self.invalidations,
+        }
+
+
+# DB별 잔액 캐시
+pessimistic_cache = BalanceCache("pessimistic")
+optimistic_cache = BalanceCache("optimistic")
+distributed_cache = BalanceCache("distributed")
+advisory_cache = BalanceCache("advisory")
+serializable_cache = BalanceCache("serializable")
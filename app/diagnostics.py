@@ -0,0 +1,187 @@
+import asyncio
+import os
+import time
+from collections import deque
+from typing import Dict, List, Optional
+from .database import Database, pessimistic_db
+
+# 비관적락 락 대기/데드락 진단
+# - pg_stat_activity + pg_blocking_pids: 누가 누구를 막고 있는지 (대기 체인)
+# - pg_locks(tuple 락) -> ctid로 accounts 조인: 어느 계좌 행에서 대기 중인지
+# - pg_stat_database.deadlocks: DB가 감지한 데드락 누적 횟수
+# - 애플리케이션 카운터: lock_timeout / NOWAIT / SKIP LOCKED 실패, 데드락 에러, 계좌별 락 대기 시간
+
+SESSIONS_SQL = """
+    SELECT
+        a.pid,
+        pg_blocking_pids(a.pid) AS blocked_by,
+        a.state,
+        a.wait_event_type,
+        a.wait_event,
+        EXTRACT(EPOCH FROM clock_timestamp() - a.xact_start)::float8 AS xact_seconds,
+        EXTRACT(EPOCH FROM clock_timestamp() - w.waitstart)::float8 AS wait_seconds,
+        left(a.query, 200) AS query
+    FROM pg_stat_activity AS a
+    LEFT JOIN LATERAL (
+        SELECT min(l.waitstart) AS waitstart FROM pg_locks AS l
+        WHERE l.pid = a.pid AND NOT l.granted
+    ) AS w ON true
+    WHERE a.datname = current_database()
+      AND a.pid <> pg_backend_pid()
+      AND a.backend_type = 'client backend'
+    ORDER BY a.pid
+"""
+
+# 행 락 대기열: 첫 번째 대기자는 tuple 락을 잡고 보유자의 트랜잭션 종료를 기다림
+# ctid로 계좌를 찾음 (행 단위 TID 스캔, 이미 갱신되어 ctid가 바뀐 행은 빠질 수 있음)
+TUPLE_LOCKS_SQL = """
+    SELECT l.pid, l.granted, l.mode, acc.id AS account
+    FROM pg_locks AS l
+    JOIN LATERAL (
+        SELECT id FROM accounts WHERE ctid = format('(%s,%s)', l.page, l.tuple)::tid
+    ) AS acc ON true
+    WHERE l.locktype = 'tuple'
+      AND l.relation = 'accounts'::regclass
+"""
+
+DEADLOCKS_SQL = "SELECT deadlocks FROM pg_stat_database WHERE datname = current_database()"
+
+
+def wait_chains(blocked_by: Dict[int, List[int]]) -> List[List[int]]:
+    """대기 중인 pid마다 [대기자, 막는 쪽, 그걸 막는 쪽, ...] 경로 (순환이면 거기서 멈춤)"""
+    chains = []
+    for pid, blockers in blocked_by.items():
+        if not blockers:
+            continue
+        chain = [pid]
+        current = blockers[0]
+        while current not in chain:
+            chain.append(current)
+            next_blockers = blocked_by.get(current)
+            if not next_blockers:
+                break
+            current = next_blockers[0]
+        chains.append(chain)
+    return chains
+
+
+class LockDiagnostics:
+    """락 대기 진단 (스냅샷 조회 + 백그라운드 샘플러 + 애플리케이션 카운터)"""
+
+    def __init__(self, db: Database, interval: Optional[float] = None, history_size: int = 720,
+                 max_accounts: int = 10000):
+        self.db = db
+        # 샘플링 간격 (초), 0 이면 샘플러 사용 안 함
+        self.interval = interval if interval is not None else float(os.getenv(f"{db.name.upper()}_LOCK_SAMPLE_INTERVAL", "5"))
+        self.history = deque(maxlen=history_size)
+        self.max_accounts = max_accounts
+        self.counters = {
+            "lock_timeouts": 0,        # lock_timeout 초과
+            "nowait_failures": 0,      # FOR UPDATE NOWAIT 즉시 실패
+            "skip_locked_failures": 0, # FOR UPDATE SKIP LOCKED 로 행을 건너뜀
+            "deadlocks": 0,            # 애플리케이션이 받은 데드락 에러 (40P01)
+        }
+        # 계좌별 락 대기 [횟수, 총 대기 시간, 최대 대기 시간]
+        self.account_waits: Dict[str, List[float]] = {}
+        self._sampler: Optional[asyncio.Task] = None
+        self._last_deadlocks: Optional[int] = None
+        self._last_counters = dict(self.counters)
+
+    def record_wait(self, account: str, seconds: float):
+        stats = self.account_waits.get(account)
+        if stats is None:
+            if len(self.account_waits) >= self.max_accounts:
+                return
+            stats = self.account_waits[account] = [0, 0.0, 0.0]
+        stats[0] += 1
+        stats[1] += seconds
+        if seconds > stats[2]:
+            stats[2] = seconds
+
+    def top_account_waits(self, limit: int = 20) -> List[dict]:
+        ordered = sorted(self.account_waits.items(), key=lambda item: item[1][1], reverse=True)[:limit]
+        return [
+            {
+                "account": account,
+                "count": int(count),
+                "total_wait_ms": total * 1000,
+                "mean_wait_ms": total / count * 1000 if count else 0,
+                "max_wait_ms": maximum * 1000,
+            }
+            for account, (count, total, maximum) in ordered
+        ]
+
+    async def snapshot(self) -> dict:
+        """현재 세션/대기 체인/계좌별 대기열 조회"""
+        async with self.db.get_connection() as conn:
+            sessions = await conn.fetch(SESSIONS_SQL)
+            tuple_locks = await conn.fetch(TUPLE_LOCKS_SQL)
+            deadlocks = await conn.fetchval(DEADLOCKS_SQL)
+
+        blocked_by = {row['pid']: list(row['blocked_by']) for row in sessions}
+        waiting = [row for row in sessions if row['blocked_by']]
+        waiting_accounts: Dict[str, List[int]] = {}
+        for row in tuple_locks:
+            waiting_accounts.setdefault(row['account'], []).append(row['pid'])
+
+        return {
+            "session_count": len(sessions),
+            "waiting_count": len(waiting),
+            "max_wait_seconds": max((row['wait_seconds'] or 0 for row in waiting), default=0),
+            "sessions": [dict(row) for row in sessions],
+            "wait_chains": wait_chains(blocked_by),
+            "waiting_accounts": waiting_accounts,
+            "deadlocks_total": deadlocks,
+            "counters": dict(self.counters),
+            "account_waits": self.top_account_waits(),
+        }
+
+    async def sample(self) -> dict:
+        """샘플 1개 (대기 세션 수, 최대 대기 시간, 직전 샘플 이후 데드락/타임아웃 증가량)"""
+        async with self.db.get_connection() as conn:
+            sessions = await conn.fetch(SESSIONS_SQL)
+            deadlocks = await conn.fetchval(DEADLOCKS_SQL)
+
+        waiting = [row for row in sessions if row['blocked_by']]
+        sample = {
+            "time": time.time(),
+            "sessions": len(sessions),
+            "waiting": len(waiting),
+            "max_wait_seconds": max((row['wait_seconds'] or 0 for row in waiting), default=0),
+            "longest_chain": max((len(chain) for chain in wait_chains(
+                {row['pid']: list(row['blocked_by']) for row in sessions}
+            )), default=0),
+            "deadlocks": deadlocks - self._last_deadlocks if self._last_deadlocks is not None else 0,
+        }
+        for name, value in self.counters.items():
+            sample[name] = value - self._last_counters[name]
+        self._last_deadlocks = deadlocks
+        self._last_counters = dict(self.counters)
+        self.history.append(sample)
+        return sample
+
+    async def _run_sampler(self):
+        while True:
+            try:
+                await self.sample()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"락 진단 샘플링 실패: {e}")
+            await asyncio.sleep(self.interval)
+
+    def start_sampler(self):
+        if self.interval > 0 and self._sampler is None:
+            self._sampler = asyncio.create_task(self._run_sampler())
+
+    async def stop_sampler(self):
+        if self._sampler is not None:
+            self._sampler.cancel()
+            try:
+                await self._sampler
+            except asyncio.CancelledError:
+                pass
+            self._sampler = None
+
+
+pessimistic_diagnostics = LockDiagnostics(pessimistic_db)
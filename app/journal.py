@@ -0,0 +1,232 @@
+import asyncio
+import base64
+import os
+import time
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+from fastapi import HTTPException
+from .database import (
+    Database, prepare_statement, ensure_journal_partitions, pessimistic_db, optimistic_db, distributed_db, advisory_db, serializable_db
+)
+from .cache import (
+    BalanceCache, pessimistic_cache, optimistic_cache, distributed_cache, advisory_cache, serializable_cache
+)
+from .models import TransferRequest
+from .sharding import shard_router
+from .metrics import journal_default_partition_alerts_total
+
+# 이체 저널 (transfers 테이블, 스키마는 database.TRANSFERS_TABLE_SQL)
+# 잔액을 바꾸는 트랜잭션 안에서 같은 커넥션으로 기록 -> 잔액과 저널이 같이 커밋/롤백
+# 여러 건은 unnest 다중 행 INSERT 한 문장으로 기록
+
+# (출금 계좌, 입금 계좌, 금액, 처리 후 출금 계좌 잔액, 처리 후 입금 계좌 잔액)
+JournalRow = Tuple[str, str, int, int, int]
+
+INSERT_TRANSFER_SQL = """
+    INSERT INTO transfers (from_account, to_account, amount, from_balance, to_balance)
+    VALUES ($1, $2, $3, $4, $5)
+"""
+INSERT_TRANSFERS_SQL = """
+    INSERT INTO transfers (from_account, to_account, amount, from_balance, to_balance)
+    SELECT * FROM unnest($1::varchar[], $2::varchar[], $3::integer[], $4::integer[], $5::integer[])
+"""
+
+# 저널로 계좌별 잔액 복원: 계좌가 나온 마지막 이체(id 순)의 처리 후 잔액
+# 같은 계좌의 이체는 행 락/분산락으로 직렬화된 뒤에 INSERT 되므로 id 순서 = 커밋 순서
+REBUILT_BALANCES_SQL = """
+    WITH movements AS (
+        SELECT from_account AS account, from_balance AS balance, id FROM transfers
+        UNION ALL
+        SELECT to_account, to_balance, id FROM transfers
+    )
+    SELECT DISTINCT ON (account) account, balance
+    FROM movements
+    ORDER BY account, id DESC
+"""
+# 복원 결과와 현재 잔액 비교 (저널에 없는 계좌는 비교하지 않음)
+VERIFY_BALANCES_SQL = f"""
+    WITH rebuilt AS ({REBUILT_BALANCES_SQL})
+    SELECT r.account, r.balance AS rebuilt_balance, a.balance AS current_balance
+    FROM rebuilt AS r
+    LEFT JOIN accounts AS a ON a.id = r.account
+    WHERE a.balance IS DISTINCT FROM r.balance
+"""
+REBUILD_BALANCES_SQL = f"""
+    WITH rebuilt AS ({REBUILT_BALANCES_SQL})
+    UPDATE accounts AS a
+    SET balance = r.balance, version = a.version + 1, updated_at = CURRENT_TIMESTAMP
+    FROM rebuilt AS r
+    WHERE a.id = r.account AND a.balance <> r.balance
+    RETURNING a.id, a.balance, a.version
+"""
+
+
+async def record_transfer(conn, request: TransferRequest, from_balance: int, to_balance: int):
+    """이체 1건 기록 (호출하는 쪽 트랜잭션 안에서)"""
+    insert_transfer = await prepare_statement(conn, INSERT_TRANSFER_SQL)
+    await insert_transfer.fetch(request.from_account, request.to_account, request.amount, from_balance, to_balance)
+
+
+async def record_transfers(conn, rows: Sequence[JournalRow]):
+    """여러 건을 다중 행 INSERT 한 문장으로 기록 (호출하는 쪽 트랜잭션 안에서)"""
+    if not rows:
+        return
+    insert_transfers = await prepare_statement(conn, INSERT_TRANSFERS_SQL)
+    await insert_transfers.fetch(*(list(column) for column in zip(*rows)))
+
+
+def journal_rows(transfers: List[TransferRequest], outcomes) -> List[JournalRow]:
+    """apply_transfers 결과 중 성공한 건만 저널 행으로"""
+    return [
+        (transfer.from_account, transfer.to_account, transfer.amount, from_balance, to_balance)
+        for transfer, (success, _, from_balance, to_balance) in zip(transfers, outcomes)
+        if success
+    ]
+
+
+def encode_cursor(created_at: datetime, transfer_id: int) -> str:
+    return base64.urlsafe_b64encode(f"{created_at.isoformat()}|{transfer_id}".encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        created_at, transfer_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), int(transfer_id)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="잘못된 커서입니다.")
+
+
+class TransferJournal:
+    """DB 1개의 이체 저널 조회 / 잔액 복원"""
+
+    def __init__(self, db: Database, cache: BalanceCache):
+        self.db = db
+        self.cache = cache
+
+    async def query(self, account: Optional[str] = None, cursor: Optional[str] = None, limit: int = 100) -> dict:
+        """최신순 이체 목록 (키셋 페이지네이션)
+        OFFSET 대신 마지막 행의 (created_at, id) 다음부터 읽어서 깊은 페이지도 일정한 비용
+        """
+        conditions = []
+        args = []
+        if cursor:
+            created_at, transfer_id = decode_cursor(cursor)
+            args.extend([created_at, transfer_id])
+            conditions.append(f"(created_at, id) < (${len(args) - 1}, ${len(args)})")
+        if account:
+            args.append(account)
+            conditions.append(f"(from_account = ${len(args)} OR to_account = ${len(args)})")
+        args.append(limit)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        query = (
+            "SELECT id, created_at, from_account, to_account, amount, from_balance, to_balance "
+            f"FROM transfers {where} ORDER BY created_at DESC, id DESC LIMIT ${len(args)}"
+        )
+        async with self.db.get_connection() as conn:
+            rows = await conn.fetch(query, *args)
+
+        next_cursor = encode_cursor(rows[-1]['created_at'], rows[-1]['id']) if len(rows) == limit else None
+        return {
+            "transfers": [dict(row) for row in rows],
+            "count": len(rows),
+            "next_cursor": next_cursor
+        }
+
+    async def verify(self, sample: int = 20) -> dict:
+        """저널로 복원한 잔액과 현재 잔액 비교"""
+        async with self.db.get_connection() as conn:
+            rows = await conn.fetch(VERIFY_BALANCES_SQL)
+        return {
+            "mismatch_count": len(rows),
+            "mismatches": [dict(row) for row in rows[:sample]],
+            "consistent": not rows
+        }
+
+    async def rebuild(self) -> dict:
+        """저널로 복원한 잔액을 accounts에 반영 (저널에 없는 계좌는 그대로)"""
+        async with self.db.get_connection() as conn:
+            async with conn.transaction():
+                # 복원하는 동안 이체가 끼어들지 않도록 잠금 (조회는 가능)
+                await conn.execute("LOCK TABLE accounts IN SHARE ROW EXCLUSIVE MODE")
+                rows = await conn.fetch(REBUILD_BALANCES_SQL)
+        self.cache.put_rows(rows)
+        return {
+            "rebuilt_count": len(rows),
+            "rebuilt": {row['id']: row['balance'] for row in rows[:100]}
+        }
+
+
+pessimistic_journal = TransferJournal(pessimistic_db, pessimistic_cache)
+optimistic_journal = TransferJournal(optimistic_db, optimistic_cache)
+distributed_journal = TransferJournal(distributed_db, distributed_cache)
+advisory_journal = TransferJournal(advisory_db, advisory_cache)
+serializable_journal = TransferJournal(serializable_db, serializable_cache)
+
+
+# 기본 파티션에 행이 있는지만 확인 (전체 COUNT 없이 1행만)
+DEFAULT_PARTITION_HAS_ROWS_SQL = "SELECT EXISTS (SELECT 1 FROM transfers_default)"
+DEFAULT_PARTITION_RANGE_SQL = "SELECT min(created_at) AS oldest, max(created_at) AS newest FROM transfers_default"
+
+
+class JournalPartitionMaintainer:
+    """이체 저널 월별 파티션 유지 (백그라운드 주기 작업)
+    - 오래 떠 있는 프로세스에서도 항상 months_ahead 개월 뒤까지 파티션이 있도록 interval 마다 생성
+    - 기본 파티션에 행이 들어왔으면 경고 + 메트릭 (그 달 파티션은 더 이상 만들 수 없으므로 조용히 넘기지 않음)
+    """
+
+    def __init__(self, databases: Callable[[], Iterable[Database]], months_ahead: Optional[int] = None,
+                 interval: Optional[float] = None):
+        self.databases = databases
+        self.months_ahead = months_ahead if months_ahead is not None else int(
+            os.getenv("JOURNAL_PARTITION_MONTHS_AHEAD", "3"))
+        self.interval = interval if interval is not None else float(
+            os.getenv("JOURNAL_PARTITION_INTERVAL", "3600"))
+        self.status: Dict[str, dict] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    async def check(self, db: Database) -> dict:
+        """DB 1개: 파티션 생성 + 기본 파티션 확인"""
+        async with db.get_connection() as conn:
+            result = await ensure_journal_partitions(conn, self.months_ahead)
+            result["default_has_rows"] = await conn.fetchval(DEFAULT_PARTITION_HAS_ROWS_SQL)
+            if result["default_has_rows"]:
+                row = await conn.fetchrow(DEFAULT_PARTITION_RANGE_SQL)
+                result["default_range"] = {"oldest": row['oldest'], "newest": row['newest']}
+                journal_default_partition_alerts_total.labels(db.name).inc()
+                print(f"[경고] {db.name} 이체 저널 기본 파티션에 행이 있습니다: "
+                      f"{row['oldest']} ~ {row['newest']} (해당 월 파티션 생성 불가)")
+        result["checked_at"] = time.time()
+        return result
+
+    async def run_once(self) -> Dict[str, dict]:
+        for db in self.databases():
+            try:
+                self.status[db.name] = await self.check(db)
+            except Exception as e:
+                # 샤드 등 일부 DB가 내려가 있어도 나머지는 계속
+                self.status[db.name] = {"error": f"{type(e).__name__}: {e}", "checked_at": time.time()}
+                print(f"이체 저널 파티션 확인 실패 ({db.name}): {e}")
+        return self.status
+
+    async def _run(self):
+        while True:
+            await self.run_once()
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self.interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+journal_partitions = JournalPartitionMaintainer(
+    lambda: [pessimistic_db, optimistic_db, distributed_db, advisory_db, serializable_db, *shard_router.shards]
+)
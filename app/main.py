@@ -1,17 +1,61 @@
+import time
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from .views import pessimistic, optimistic, distributed
+from fastapi.responses import PlainTextResponse
+from .views import pessimistic, optimistic, distributed, advisory, serializable, ledger, sharded, monitoring
 from .models import TransferRequest, TransferResponse
+from .database import warmup, shutdown, warmup_stats, pessimistic_db, optimistic_db, distributed_db, advisory_db, serializable_db
+from .redis_lock import redis_lock
+from .metrics import render_metrics
+from .diagnostics import pessimistic_diagnostics
+from .scenarios.redis_ledger import ledger_writer
+from .sharding import shard_router
+from .redlock import redlock
+from .journal import journal_partitions
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """시작 시 커넥션 풀/Redis/Lua 스크립트를 한 번만 준비하고, 종료 시 정리"""
+    started = time.perf_counter()
+    await warmup()
+    await shard_router.warmup()
+    # 남은 2단계 커밋 PREPARE 트랜잭션 자동 복구 (시작 직후 1회 + 주기적으로)
+    sharded.service.start_recovery()
+    await redis_lock.load_scripts()
+    await ledger.service.load_scripts()
+    warmup_stats["startup_time"] = time.perf_counter() - started
+    print(f"시작 준비 완료: {warmup_stats}")
+    # 비관적락 락 대기/데드락 샘플러
+    pessimistic_diagnostics.start_sampler()
+    # 이체 저널 월별 파티션 유지 (앞으로 N개월 파티션 생성 + 기본 파티션 유입 경고)
+    journal_partitions.start()
+    # Redis 원장 스트림 -> distributed DB 배치 writer
+    ledger_writer.start()
+    yield
+    await ledger_writer.stop()
+    await pessimistic_diagnostics.stop_sampler()
+    await journal_partitions.stop()
+    await sharded.service.stop_recovery()
+    await shard_router.close()
+    await redlock.close()
+    await shutdown()
 
 app = FastAPI(
     title="은행계좌 이체 시스템 - 동시성 테스트",
     description="비관적락, 낙관적락, 분산락을 사용한 동시성 문제 해결 비교 시스템",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # 라우터 등록
 app.include_router(pessimistic.router)
 app.include_router(optimistic.router)
 app.include_router(distributed.router)
+app.include_router(advisory.router)
+app.include_router(serializable.router)
+app.include_router(ledger.router)
+app.include_router(sharded.router)
+app.include_router(monitoring.router)
 
 @app.get("/")
 async def root():
@@ -22,17 +66,45 @@ async def root():
         "available_methods": [
             "/pessimistic - 비관적락 방식 (PostgreSQL SELECT FOR UPDATE)",
             "/optimistic - 낙관적락 방식 (PostgreSQL Version Column)",
-            "/distributed - 분산락 방식 (Redis SET NX EX)"
+            "/distributed - 분산락 방식 (Redis SET NX EX)",
+            "/advisory - advisory 락 방식 (PostgreSQL pg_advisory_xact_lock)",
+            "/serializable - 격리 수준 방식 (SERIALIZABLE 트랜잭션 + 직렬화 실패 재시도)",
+            "/ledger - Redis 원장 방식 (Lua + Stream, DB는 비동기 반영)",
+            "/sharded - 샤딩 방식 (계좌별 샤드 DB, 다른 샤드 간 이체는 2단계 커밋)"
         ],
         "comparison": {
             "pessimistic": "데이터를 읽을 때 미리 락을 걸어서 충돌 방지",
             "optimistic": "데이터 변경 시점에 버전을 확인하여 충돌 감지",
-            "distributed": "Redis를 사용한 애플리케이션 레벨의 분산락"
+            "distributed": "Redis를 사용한 애플리케이션 레벨의 분산락",
+            "advisory": "계좌 id 해시 키로 DB advisory 락을 잡아서 Redis 없이 직렬화",
+            "serializable": "락 없이 읽고 쓰고, 충돌은 DB 격리 수준이 감지하면 재시도",
+            "ledger": "Redis에서 잔액 확인/이동을 원자적으로 처리하고 DB에는 배치로 반영",
+            "sharded": "계좌를 여러 DB에 나눠서 처리량을 수평 확장"
         },
+        "monitoring": [
+            "/monitoring/pools - 커넥션 풀 상태",
+            "/monitoring/cache - 잔액 캐시 적중/미스",
+            "/metrics - 프로메테우스 메트릭"
+        ],
         "docs": "/docs"
     }
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """프로메테우스 텍스트 포맷 메트릭 (락 대기, 트랜잭션, DB 왕복, 풀 대기, 충돌/재시도 횟수)"""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
 @app.get("/health")
 async def health_check():
-    """헬스체크"""
-    return {"status": "healthy"} 
\ No newline at end of file
+    """헬스체크 (시작 소요 시간, 첫 요청 커넥션 획득 시간 포함)"""
+    return {
+        "status": "healthy",
+        "startup": warmup_stats,
+        "first_acquire_latency": {
+            "pessimistic": pessimistic_db.first_acquire_latency,
+            "optimistic": optimistic_db.first_acquire_latency,
+            "distributed": distributed_db.first_acquire_latency,
+            "advisory": advisory_db.first_acquire_latency,
+            "serializable": serializable_db.first_acquire_latency
+        }
+    } 
\ No newline at end of file
@@ -0,0 +1,230 @@
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from typing import Dict, List, Sequence, Tuple
+
+# 프로메테우스 텍스트 포맷 메트릭 (외부 라이브러리 없이)
+# 핫패스 부담을 줄이기 위해
+# - 라벨 조합별 시계열(child)은 모듈 로드 시 미리 만들어두고 호출부에서 참조만 보관
+# - observe/inc는 미리 할당한 버킷 리스트에 bisect + 정수 증가만 수행 (호출마다 dict/객체 생성 없음)
+# - 시간 측정은 단조 시계(time.perf_counter) 기준
+
+STRATEGIES = ("pessimistic", "optimistic", "distributed", "advisory", "serializable")
+
+# 지연시간 버킷 (초)
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# 횟수 버킷 (재시도/충돌 횟수)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55)
+
+now = time.perf_counter
+
+
+def _format_value(value) -> str:
+    if isinstance(value, float):
+        if value == float("inf"):
+            return "+Inf"
+        return repr(value)
+    return str(value)
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{value}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class HistogramChild:
+    """라벨 조합 1개의 히스토그램 (버킷 카운트는 누적이 아닌 구간별로 저장, 출력 시 누적)"""
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def since(self, started: float):
+        """started(perf_counter 값)부터 지금까지 걸린 시간 기록"""
+        self.observe(now() - started)
+
+
+class CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount: int = 1):
+        self.value += amount
+
+
+class _Family(ABC):
+    """메트릭 1개 (이름/설명 + 라벨 조합별 시계열), 종류별 시계열 생성/출력은 하위 클래스가 구현"""
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ("strategy",)):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+
+    @abstractmethod
+    def _new_child(self):
+        """라벨 조합 1개의 새 시계열"""
+
+    @abstractmethod
+    def _child_lines(self, values: Tuple[str, ...], child) -> List[str]:
+        """시계열 1개의 텍스트 포맷 출력 줄"""
+
+    def labels(self, *values: str):
+        """라벨 값에 해당하는 시계열 (모듈 로드 시 한 번 호출해서 참조를 보관해두고 사용)"""
+        child = self._children.get(values)
+        if child is None:
+            child = self._children[values] = self._new_child()
+        return child
+
+    def collect(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for values, child in sorted(self._children.items()):
+            lines.extend(self._child_lines(values, child))
+        return lines
+
+
+class Histogram(_Family):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, buckets: Tuple[float, ...] = LATENCY_BUCKETS,
+                 labelnames: Sequence[str] = ("strategy",)):
+        self.buckets = tuple(buckets)
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return HistogramChild(self.buckets)
+
+    def _child_lines(self, values, child: HistogramChild) -> List[str]:
+        names = self.labelnames + ("le",)
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), child.counts):
+            cumulative += count
+            labels = _format_labels(names, values + (_format_value(float(bound)),))
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = _format_labels(self.labelnames, values)
+        lines.append(f"{self.name}_sum{labels} {_format_value(child.sum)}")
+        lines.append(f"{self.name}_count{labels} {child.count}")
+        return lines
+
+
+class Counter(_Family):
+    kind = "counter"
+
+    def _new_child(self):
+        return CounterChild()
+
+    def _child_lines(self, values, child: CounterChild) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, values)} {child.value}"]
+
+
+class Registry:
+    def __init__(self):
+        self.families: List[_Family] = []
+
+    def register(self, family):
+        self.families.append(family)
+        return family
+
+    def render(self) -> str:
+        lines = []
+        for family in self.families:
+            lines.extend(family.collect())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+lock_wait_seconds = registry.register(Histogram(
+    "transfer_lock_wait_seconds",
+    "락 획득 대기 시간 (pessimistic: SELECT FOR UPDATE, distributed: Redis 락, advisory: pg_advisory_xact_lock)"
+))
+transaction_seconds = registry.register(Histogram(
+    "transfer_transaction_seconds",
+    "이체 트랜잭션 시작부터 커밋/롤백까지 걸린 시간"
+))
+db_round_trip_seconds = registry.register(Histogram(
+    "db_round_trip_seconds",
+    "prepared statement 1회 실행 왕복 시간"
+))
+pool_wait_seconds = registry.register(Histogram(
+    "db_pool_wait_seconds",
+    "커넥션 풀에서 커넥션을 얻기까지 대기한 시간"
+))
+optimistic_conflicts = registry.register(Histogram(
+    "optimistic_conflicts_per_transfer",
+    "이체 1건이 끝날 때까지 발생한 version 충돌 횟수",
+    buckets=COUNT_BUCKETS
+))
+optimistic_attempts_total = registry.register(Counter(
+    "optimistic_attempts_total",
+    "낙관적락 이체 시도 횟수 (result: committed / conflict / rejected / error)",
+    labelnames=("strategy", "result")
+))
+redis_lock_retries = registry.register(Histogram(
+    "redis_lock_retries",
+    "Redis 락 1회 획득에 필요했던 재시도 횟수",
+    buckets=COUNT_BUCKETS
+))
+redlock_acquire_seconds = registry.register(Histogram(
+    "redlock_acquire_seconds",
+    "Redlock 1회 획득 시도(전체 노드 병렬) 시간 (result: acquired / failed)",
+    labelnames=("result",)
+))
+redlock_node_errors_total = registry.register(Counter(
+    "redlock_node_errors_total",
+    "Redlock 노드 호출 실패/타임아웃 횟수",
+    labelnames=("node",)
+))
+serializable_attempts_total = registry.register(Counter(
+    "serializable_attempts_total",
+    "격리 수준 방식 이체 시도 횟수 (result: committed / serialization_failure / deadlock / rejected / error)",
+    labelnames=("isolation", "result")
+))
+journal_default_partition_alerts_total = registry.register(Counter(
+    "journal_default_partition_alerts_total",
+    "이체 저널 기본 파티션(transfers_default)에 행이 들어온 것을 발견한 횟수 (월별 파티션이 없는 기간)",
+    labelnames=("database",)
+))
+fence_rejections_total = registry.register(Counter(
+    "fence_rejections_total",
+    "펜싱 토큰이 더 최근 소유자보다 작아서 거부된 이체 쓰기 횟수 (backend: single / redlock)",
+    labelnames=("backend",)
+))
+
+# 라벨 조합 미리 생성 (스크레이프 결과에 0값으로라도 항상 노출)
+for _strategy in STRATEGIES:
+    transaction_seconds.labels(_strategy)
+    db_round_trip_seconds.labels(_strategy)
+    pool_wait_seconds.labels(_strategy)
+for _result in ("committed", "conflict", "rejected", "error"):
+    optimistic_attempts_total.labels("optimistic", _result)
+lock_wait_seconds.labels("pessimistic")
+lock_wait_seconds.labels("distributed")
+lock_wait_seconds.labels("advisory")
+optimistic_conflicts.labels("optimistic")
+redis_lock_retries.labels("distributed")
+redlock_acquire_seconds.labels("acquired")
+redlock_acquire_seconds.labels("failed")
+for _isolation in ("serializable", "repeatable_read"):
+    for _result in ("committed", "serialization_failure", "deadlock", "rejected", "error"):
+        serializable_attempts_total.labels(_isolation, _result)
+fence_rejections_total.labels("single")
+fence_rejections_total.labels("redlock")
+
+
+def render_metrics() -> str:
+    return registry.render()
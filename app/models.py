@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import Literal, Optional
 
 class TransferRequest(BaseModel):
     from_account: str = "account_a"
@@ -17,4 +17,17 @@ class TransferResponse(BaseModel):
 
 class AccountBalance(BaseModel):
     account_id: str
-    balance: int 
\ No newline at end of file
+    balance: int 
+
+# 계좌 잔액 분포 (app/seeding.py 참고)
+BalanceDistribution = Literal["fixed", "uniform", "pareto"]
+
+class StressTestParams(BaseModel):
+    """스트레스 테스트 파라미터 (쿼리 파라미터로 입력)"""
+    requests: int = Field(10, ge=1, le=10_000_000)      # 총 이체 요청 수
+    concurrency: int = Field(10, ge=1, le=10_000)       # 동시 실행 상한
+    accounts: int = Field(2, ge=2, le=10_000_000)       # 계좌 수
+    amount: int = Field(10000, ge=1)                    # 이체 금액
+    distribution: Literal["fixed", "uniform", "zipf"] = "fixed"  # 계좌 쌍 분포
+    skew: float = Field(1.1, gt=0)                      # zipf 분포 지수
+    balance_distribution: BalanceDistribution = "fixed" # 계좌별 초기 잔액 분포
@@ -0,0 +1,144 @@
+import asyncio
+import time
+from typing import List
+from .database import get_redis_client, get_redis_wait_client, redis_client
+
+# 모든 스크립트는 여러 키를 한 번에 다룸 (단일 락 = 키 1개짜리 리스트)
+
+# 락 획득: 모든 키가 비어있거나 이미 내 토큰일 때만 전부 SET PX (all or nothing)
+# 하나라도 다른 소유자가 있으면 아무것도 설정하지 않음 -> 부분 획득으로 인한 데드락 없음
+ACQUIRE_SCRIPT = """
+for i = 1, #KEYS do
+    local current = redis.call('GET', KEYS[i])
+    if current and current ~= ARGV[1] then
+        return 0
+    end
+end
+for i = 1, #KEYS do
+    redis.call('SET', KEYS[i], ARGV[1], 'PX', ARGV[2])
+end
+return 1
+"""
+
+# 락 해제: 내 토큰인 키만 DEL (compare-and-delete)
+# 만료 후 다른 소유자가 잡은 락을 지우는 문제 방지
+# KEYS[1..n] = 락 키, KEYS[n+1..2n] = 대기자 알림 리스트
+# 해제하면서 알림 리스트에 신호를 1개만 남김 -> BLPOP 대기자 1명만 깨움
+RELEASE_SCRIPT = """
+local n = #KEYS / 2
+local released = 0
+for i = 1, n do
+    if redis.call('GET', KEYS[i]) == ARGV[1] then
+        redis.call('DEL', KEYS[i])
+        redis.call('DEL', KEYS[n + i])
+        redis.call('RPUSH', KEYS[n + i], '1')
+        redis.call('PEXPIRE', KEYS[n + i], ARGV[2])
+        released = released + 1
+    end
+end
+return released
+"""
+
+# 락 연장: 내 토큰인 키만 PEXPIRE (compare-and-extend), 연장된 키 개수 반환
+EXTEND_SCRIPT = """
+local extended = 0
+for i = 1, #KEYS do
+    if redis.call('GET', KEYS[i]) == ARGV[1] then
+        redis.call('PEXPIRE', KEYS[i], ARGV[2])
+        extended = extended + 1
+    end
+end
+return extended
+"""
+
+
+# 대기자 알림 리스트 키 (락 키 패턴 transfer_lock:* 과 겹치지 않도록 접두어 분리)
+def signal_key(lock_key: str) -> str:
+    return f"lock_signal:{lock_key}"
+
+
+class RedisLockManager:
+    """Lua 스크립트(EVALSHA) 기반 Redis 락
+    획득 / 해제 / 연장 모두 키 개수와 상관없이 라운드트립 1회
+    """
+
+    def __init__(self):
+        self._client = None
+        self._acquire = None
+        self._release = None
+        self._extend = None
+        # BLPOP 동시 대기 수 = 대기 전용 풀 크기 (넘치면 커넥션 대신 슬롯을 기다림)
+        self._wait_slots = asyncio.Semaphore(redis_client.wait_pool_size)
+
+    async def load_scripts(self):
+        """스크립트 등록 + SCRIPT LOAD로 미리 적재 (이후 EVALSHA로만 호출)"""
+        client = await get_redis_client()
+        if self._client is client:
+            return
+        self._acquire = client.register_script(ACQUIRE_SCRIPT)
+        self._release = client.register_script(RELEASE_SCRIPT)
+        self._extend = client.register_script(EXTEND_SCRIPT)
+        for script in (ACQUIRE_SCRIPT, RELEASE_SCRIPT, EXTEND_SCRIPT):
+            await client.script_load(script)
+        self._client = client
+
+    async def acquire(self, lock_keys: List[str], lock_value: str, ttl_ms: int) -> bool:
+        """락 획득 시도 (1회, 전부 아니면 전무)"""
+        await self.load_scripts()
+        return bool(await self._acquire(keys=lock_keys, args=[lock_value, ttl_ms]))
+
+    async def release(self, lock_keys: List[str], lock_value: str, signal_ttl_ms: int = 10000) -> int:
+        """내 락만 해제 + 대기자에게 해제 신호, 해제된 키 개수 반환"""
+        await self.load_scripts()
+        return await self._release(
+            keys=lock_keys + [signal_key(key) for key in lock_keys],
+            args=[lock_value, signal_ttl_ms]
+        )
+
+    async def wait_for_release(self, lock_keys: List[str], timeout: float) -> bool:
+        """락 해제 신호를 BLPOP으로 대기 (폴링 없이 해제 즉시 깨어남)
+        여러 키 중 하나라도 해제되면 깨어남
+        TTL 만료로 풀리는 락은 신호가 없으므로 timeout으로 상한을 둠
+        BLPOP은 대기 전용 풀에서만 실행 -> 대기자가 많아도 획득/해제가 쓰는 공용 풀 커넥션을 차지하지 않음
+        대기 슬롯이 다 찼으면 timeout 동안 슬롯을 기다리다가 False (호출하는 쪽이 획득을 다시 시도)
+        """
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(self._wait_slots.acquire(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        try:
+            remaining = timeout - (time.monotonic() - started)
+            if remaining <= 0:
+                return False
+            client = await get_redis_wait_client()
+            return await client.blpop([signal_key(key) for key in lock_keys], timeout=remaining) is not None
+        finally:
+            self._wait_slots.release()
+
+    async def extend(self, lock_keys: List[str], lock_value: str, ttl_ms: int) -> bool:
+        """내 락일 때만 만료시간 연장 (모든 키가 연장되어야 성공)"""
+        await self.load_scripts()
+        return await self._extend(keys=lock_keys, args=[lock_value, ttl_ms]) == len(lock_keys)
+
+    def start_watchdog(self, lock_keys: List[str], lock_value: str, ttl_ms: int) -> asyncio.Task:
+        """락을 잡고 있는 동안 ttl/3 간격으로 만료시간을 연장하는 백그라운드 태스크
+        이체가 길어져도 락이 중간에 만료되지 않도록 함. 작업이 끝나면 cancel() 해야 함.
+        """
+        return asyncio.create_task(self._watchdog(lock_keys, lock_value, ttl_ms))
+
+    async def _watchdog(self, lock_keys: List[str], lock_value: str, ttl_ms: int):
+        interval = ttl_ms / 3 / 1000
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                if not await self.extend(lock_keys, lock_value, ttl_ms):
+                    # 이미 다른 소유자에게 넘어감 -> 더 연장하지 않음
+                    print(f"락 연장 실패 (소유권 없음): {lock_keys}")
+                    return
+            except Exception as e:
+                print(f"락 연장 실패: {e}")
+
+
+# 전역 락 매니저
+redis_lock = RedisLockManager()
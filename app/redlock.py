@@ -0,0 +1,128 @@
+import asyncio
+import os
+import time
+from typing import List, Optional
+import redis.asyncio as redis
+from .redis_lock import ACQUIRE_SCRIPT, RELEASE_SCRIPT, EXTEND_SCRIPT, signal_key
+from .metrics import redlock_acquire_seconds, redlock_node_errors_total
+
+# Redlock: 서로 독립된 Redis 노드 N개에 같은 락을 병렬로 잡고 과반(N/2 + 1)이 성공해야 획득
+# - 노드 1대가 죽거나 느려져도 과반만 살아 있으면 락을 계속 제공
+# - 노드마다 짧은 타임아웃 (죽은 노드 때문에 획득이 TTL만큼 멈추지 않도록)
+# - 유효 시간 = TTL - 획득에 걸린 시간 - 시계 오차 보정 (TTL x drift_factor + 2ms)
+#   유효 시간 안에 작업을 끝내야 하며, 획득 실패 시 일부 노드에 잡힌 락도 전부 병렬 해제
+# 단일 노드 락과 같은 Lua 스크립트(전부 아니면 전무, compare-and-delete)를 노드마다 실행
+# 펜싱 토큰은 노드에서 발급하지 않음 (노드별 카운터는 서로 어긋나고, 영속화 없이 재시작하면 0부터 다시 시작)
+# -> 획득 후 distributed DB 시퀀스 하나에서 발급 (app/scenarios/distributed.py)
+
+REDLOCK_URLS = [
+    url.strip() for url in os.getenv(
+        "REDLOCK_URLS",
+        "redis://redlock-1:6379,redis://redlock-2:6379,redis://redlock-3:6379"
+    ).split(",") if url.strip()
+]
+
+ACQUIRED = redlock_acquire_seconds.labels("acquired")
+FAILED = redlock_acquire_seconds.labels("failed")
+
+
+class RedlockNode:
+    """Redlock 노드 1개 (클라이언트 + 스크립트 + 호출 통계)"""
+
+    def __init__(self, index: int, url: str, timeout: float):
+        self.name = f"node_{index}"
+        self.url = url
+        self.timeout = timeout
+        self.client = redis.from_url(
+            url, decode_responses=True, socket_timeout=timeout, socket_connect_timeout=timeout
+        )
+        self._acquire = self.client.register_script(ACQUIRE_SCRIPT)
+        self._release = self.client.register_script(RELEASE_SCRIPT)
+        self._extend = self.client.register_script(EXTEND_SCRIPT)
+        self.errors = redlock_node_errors_total.labels(self.name)
+        self.last_error: Optional[str] = None
+
+    async def _call(self, script, keys: List[str], args: list) -> int:
+        """스크립트 1회 실행 (타임아웃/연결 실패는 0으로 취급하고 기록)"""
+        try:
+            return await asyncio.wait_for(script(keys=keys, args=args), self.timeout)
+        except Exception as e:
+            self.errors.inc()
+            self.last_error = f"{type(e).__name__}: {e}"
+            return 0
+
+    async def acquire(self, lock_keys: List[str], lock_value: str, ttl_ms: int) -> bool:
+        return bool(await self._call(self._acquire, lock_keys, [lock_value, ttl_ms]))
+
+    async def release(self, lock_keys: List[str], lock_value: str) -> int:
+        return await self._call(
+            self._release, lock_keys + [signal_key(key) for key in lock_keys], [lock_value, 10000]
+        )
+
+    async def extend(self, lock_keys: List[str], lock_value: str, ttl_ms: int) -> bool:
+        return await self._call(self._extend, lock_keys, [lock_value, ttl_ms]) == len(lock_keys)
+
+    async def close(self):
+        await self.client.close()
+
+
+class Redlock:
+    """Redis 노드 N개 과반 락"""
+
+    def __init__(self, urls: List[str], node_timeout: Optional[float] = None, drift_factor: float = 0.01):
+        # 노드 1개 호출 타임아웃 (초): TTL보다 훨씬 짧게
+        self.node_timeout = node_timeout or float(os.getenv("REDLOCK_NODE_TIMEOUT", "0.05"))
+        self.drift_factor = drift_factor
+        self.nodes = [RedlockNode(index, url, self.node_timeout) for index, url in enumerate(urls)]
+        self.quorum = len(self.nodes) // 2 + 1
+        self.acquired = 0
+        self.quorum_failures = 0
+
+    async def acquire(self, lock_keys: List[str], lock_value: str, ttl_ms: int) -> Optional[float]:
+        """모든 노드에 병렬로 획득 시도 (1회)
+        과반 성공 + 유효 시간이 남으면 유효 시간(ms) 반환, 아니면 잡힌 노드를 해제하고 None
+        """
+        started = time.perf_counter()
+        results = await asyncio.gather(*(node.acquire(lock_keys, lock_value, ttl_ms) for node in self.nodes))
+        elapsed = time.perf_counter() - started
+        validity_ms = ttl_ms - elapsed * 1000 - (ttl_ms * self.drift_factor + 2)
+        if sum(results) >= self.quorum and validity_ms > 0:
+            self.acquired += 1
+            ACQUIRED.observe(elapsed)
+            return validity_ms
+
+        self.quorum_failures += 1
+        FAILED.observe(elapsed)
+        # 응답이 늦게 도착해 잡혔을 수도 있으므로 실패로 본 노드까지 전부 해제
+        await self.release(lock_keys, lock_value)
+        return None
+
+    async def release(self, lock_keys: List[str], lock_value: str) -> int:
+        """모든 노드에서 병렬 해제 (내 토큰인 키만), 해제된 노드 수 반환"""
+        results = await asyncio.gather(*(node.release(lock_keys, lock_value) for node in self.nodes))
+        return sum(1 for released in results if released)
+
+    async def extend(self, lock_keys: List[str], lock_value: str, ttl_ms: int) -> bool:
+        """과반 노드에서 연장되면 성공"""
+        results = await asyncio.gather(*(node.extend(lock_keys, lock_value, ttl_ms) for node in self.nodes))
+        return sum(results) >= self.quorum
+
+    def stats(self) -> dict:
+        return {
+            "nodes": [
+                {"name": node.name, "url": node.url, "errors": node.errors.value, "last_error": node.last_error}
+                for node in self.nodes
+            ],
+            "quorum": self.quorum,
+            "node_timeout": self.node_timeout,
+            "drift_factor": self.drift_factor,
+            "acquired": self.acquired,
+            "quorum_failures": self.quorum_failures,
+        }
+
+    async def close(self):
+        for node in self.nodes:
+            await node.close()
+
+
+redlock = Redlock(REDLOCK_URLS)
@@ -0,0 +1,212 @@
+"""Redlock 노드 수별 획득 지연시간 벤치마크 + 노드 장애 하네스
+
+사용법:
+    python -m app.redlock_bench --nodes 1 3 5 --iterations 20000 --concurrency 100
+    python -m app.redlock_bench --nodes 3 5 --kill-at 0.5          # 절반쯤에서 노드 1대 강제 종료
+    python -m app.redlock_bench --urls redis://localhost:7001,redis://localhost:7002,redis://localhost:7003
+
+--urls 가 없으면 redis-server 프로세스를 노드 수만큼 로컬 포트(--base-port 부터)에 직접 띄움
+측정 단위: 획득 시도 1회(전체 노드 병렬) 시간, 획득 성공률, 과반 실패 횟수 (kill 전/후 구분)
+"""
+import argparse
+import asyncio
+import json
+import random
+import shutil
+import subprocess
+import sys
+import time
+from array import array
+from typing import Dict, List, Optional
+
+import redis.asyncio as redis
+
+from .redlock import Redlock
+
+PERCENTILES = [("p50", 50), ("p95", 95), ("p99", 99), ("p999", 99.9)]
+
+
+class RedisProcesses:
+    """로컬 redis-server 프로세스들 (영속성 없음)"""
+
+    def __init__(self, binary: str, base_port: int, count: int):
+        self.binary = binary
+        self.ports = [base_port + index for index in range(count)]
+        self.processes: List[subprocess.Popen] = []
+
+    @property
+    def urls(self) -> List[str]:
+        return [f"redis://127.0.0.1:{port}" for port in self.ports]
+
+    async def start(self):
+        for port in self.ports:
+            self.processes.append(subprocess.Popen(
+                [self.binary, "--port", str(port), "--bind", "127.0.0.1", "--save", "", "--appendonly", "no"],
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+            ))
+        for url in self.urls:
+            client = redis.from_url(url)
+            for _ in range(100):
+                try:
+                    await client.ping()
+                    break
+                except Exception:
+                    await asyncio.sleep(0.05)
+            else:
+                raise RuntimeError(f"redis-server 시작 실패: {url}")
+            await client.close()
+
+    def kill(self, index: int):
+        """노드 1대 강제 종료 (SIGKILL)"""
+        self.processes[index].kill()
+
+    def stop(self):
+        for process in self.processes:
+            if process.poll() is None:
+                process.terminate()
+        for process in self.processes:
+            process.wait()
+
+
+class Phase:
+    """구간 1개 (kill 전/후) 측정값"""
+
+    def __init__(self):
+        self.acquired = 0
+        self.failed = 0
+        self.latencies = array("d")
+
+    def report(self) -> dict:
+        ordered = sorted(self.latencies)
+        latency_ms = {}
+        if ordered:
+            last = len(ordered) - 1
+            for name, p in PERCENTILES:
+                latency_ms[name] = round(ordered[min(last, int(len(ordered) * p / 100))] * 1000, 3)
+            latency_ms["max"] = round(ordered[-1] * 1000, 3)
+            latency_ms["mean"] = round(sum(ordered) / len(ordered) * 1000, 3)
+        attempts = self.acquired + self.failed
+        return {
+            "attempts": attempts,
+            "acquired": self.acquired,
+            "failed": self.failed,
+            "success_rate": round(self.acquired / attempts, 4) if attempts else 0,
+            "latency_ms": latency_ms,
+        }
+
+
+async def run_nodes(urls: List[str], args, processes: Optional[RedisProcesses]) -> dict:
+    """노드 urls 로 iterations 회 획득/해제 (concurrency 개 워커, keys 개 락 키에 분산)"""
+    lock = Redlock(urls, node_timeout=args.node_timeout)
+    phases: Dict[str, Phase] = {"before_kill": Phase()}
+    current = [phases["before_kill"]]
+    kill_after = int(args.iterations * args.kill_at) if args.kill_at is not None else None
+    remaining = [args.iterations]
+    done = [0]
+    rng = random.Random(args.seed)
+
+    async def worker(worker_id: int):
+        while remaining[0] > 0:
+            remaining[0] -= 1
+            key = f"bench_lock:{rng.randrange(args.keys)}"
+            value = f"{worker_id}:{remaining[0]}"
+            phase = current[0]
+            started = time.perf_counter()
+            validity = await lock.acquire([key], value, args.ttl_ms)
+            phase.latencies.append(time.perf_counter() - started)
+            if validity is None:
+                phase.failed += 1
+                continue
+            phase.acquired += 1
+            await lock.release([key], value)
+
+            done[0] += 1
+            if kill_after is not None and done[0] == kill_after and processes is not None:
+                processes.kill(0)
+                phases["after_kill"] = Phase()
+                current[0] = phases["after_kill"]
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(index) for index in range(args.concurrency)))
+    elapsed = time.perf_counter() - started
+    stats = lock.stats()
+    await lock.close()
+    return {
+        "nodes": len(urls),
+        "quorum": lock.quorum,
+        "elapsed": round(elapsed, 3),
+        "throughput": round(args.iterations / elapsed, 2) if elapsed > 0 else 0,
+        "phases": {name: phase.report() for name, phase in phases.items()},
+        "node_errors": {node["name"]: node["errors"] for node in stats["nodes"]},
+    }
+
+
+def print_report(report: dict):
+    print(f"\n== 노드 {report['nodes']}대 (과반 {report['quorum']}) ==")
+    print(f"처리량: {report['throughput']}/s ({report['elapsed']}초)")
+    for name, phase in report["phases"].items():
+        latency = " ".join(f"{key}={value}" for key, value in phase["latency_ms"].items())
+        print(f"  [{name}] 시도 {phase['attempts']} / 성공률 {phase['success_rate']:.2%} / 지연(ms) {latency}")
+    errors = {name: count for name, count in report["node_errors"].items() if count}
+    if errors:
+        print(f"  노드 오류: {errors}")
+
+
+def parse_args(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Redlock 노드 수별 획득 지연시간 벤치마크")
+    parser.add_argument("--nodes", type=int, nargs="+", default=[1, 3, 5], help="비교할 노드 수")
+    parser.add_argument("--urls", default=None, help="기존 Redis 노드 (쉼표 구분, 없으면 redis-server 직접 실행)")
+    parser.add_argument("--redis-server", default="redis-server", help="redis-server 실행 파일")
+    parser.add_argument("--base-port", type=int, default=7100)
+    parser.add_argument("--iterations", type=int, default=10000, help="노드 수마다 획득 시도 횟수")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--keys", type=int, default=100, help="락 키 개수 (적을수록 경합 증가)")
+    parser.add_argument("--ttl-ms", type=int, default=10000)
+    parser.add_argument("--node-timeout", type=float, default=0.05, help="노드 1개 호출 타임아웃 (초)")
+    parser.add_argument("--kill-at", type=float, default=None,
+                        help="성공 횟수가 iterations x 이 비율에 도달하면 첫 번째 노드를 강제 종료 (직접 실행 모드만)")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--json", default=None, help="JSON 결과 파일 경로 ('-'면 표준출력)")
+    return parser.parse_args(argv)
+
+
+async def main(argv: Optional[List[str]] = None):
+    args = parse_args(argv)
+    given_urls = [url.strip() for url in args.urls.split(",")] if args.urls else None
+    if given_urls is None and shutil.which(args.redis_server) is None:
+        sys.exit(f"{args.redis_server} 를 찾을 수 없습니다. --redis-server 또는 --urls 를 지정하세요.")
+
+    reports = []
+    for count in args.nodes:
+        processes = None
+        if given_urls is not None:
+            if count > len(given_urls):
+                print(f"노드 {count}대 건너뜀 (--urls 에 {len(given_urls)}개)")
+                continue
+            urls = given_urls[:count]
+        else:
+            processes = RedisProcesses(args.redis_server, args.base_port, count)
+            await processes.start()
+            urls = processes.urls
+        try:
+            report = await run_nodes(urls, args, processes)
+        finally:
+            if processes is not None:
+                processes.stop()
+        reports.append(report)
+        print_report(report)
+
+    output = {
+        "config": {key: value for key, value in vars(args).items() if key != "json"},
+        "results": reports,
+    }
+    if args.json == "-":
+        json.dump(output, sys.stdout, ensure_ascii=False, indent=2)
+        print()
+    elif args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(output, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
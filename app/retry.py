@@ -0,0 +1,161 @@
+import random
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, Optional
+
+# 재시도 대기시간 히스토그램 버킷 (ms)
+DELAY_BUCKETS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000]
+
+
+class ConflictRateEstimator:
+    """계좌별 충돌률 추정기 (EWMA)
+    시도마다 충돌이면 1, 성공이면 0을 반영해서 최근 충돌률을 추정
+    - 최근에 관찰한 max_accounts 개 계좌만 유지 (LRU, 계좌 수가 많아도 메모리 고정)
+    - 충돌률이 min_rate 아래로 감쇠하면 삭제 (기본값 0과 구분할 필요 없음)
+    """
+
+    def __init__(self, alpha: float = 0.2, max_accounts: int = 10000, min_rate: float = 0.01):
+        self.alpha = alpha
+        self.max_accounts = max_accounts
+        self.min_rate = min_rate
+        self.rates: "OrderedDict[str, float]" = OrderedDict()
+
+    def observe(self, account: str, conflicted: bool):
+        rate = self.rates.pop(account, 0.0)
+        rate += self.alpha * ((1.0 if conflicted else 0.0) - rate)
+        if rate < self.min_rate:
+            return
+        self.rates[account] = rate  # 가장 최근 위치로
+        if len(self.rates) > self.max_accounts:
+            self.rates.popitem(last=False)
+
+    def rate(self, account: str) -> float:
+        return self.rates.get(account, 0.0)
+
+    def clear(self):
+        self.rates.clear()
+
+
+class RetryPolicy(ABC):
+    """재시도 정책 기본 클래스 (next_delay 를 구현하지 않은 정책은 인스턴스 생성 시 TypeError)
+    횟수 대신 총 시간 예산(budget) 안에서 재시도, 정책별 충돌/재시도 히스토그램 집계
+    """
+    name = "base"
+
+    def __init__(self, base: float = 0.01, cap: float = 0.5, budget: float = 3.0,
+                 max_attempts: Optional[int] = None):
+        self.base = base                  # 첫 대기시간 (초)
+        self.cap = cap                    # 대기시간 상한 (초)
+        self.budget = budget              # 이체 1건당 총 시간 예산 (초)
+        self.max_attempts = max_attempts  # 시도 횟수 상한 (None이면 시간 예산만 사용)
+        self.reset_stats()
+
+    @abstractmethod
+    def next_delay(self, attempt: int, prev_delay: float, account: str) -> float:
+        """attempt번째 실패(1부터) 후 대기시간 (초)"""
+
+    def observe(self, account: str, conflicted: bool):
+        """시도 결과 반영 (적응형 정책에서 사용)"""
+
+    def reset_stats(self):
+        self.transfers = 0
+        self.exhausted = 0
+        self.conflict_histogram: Dict[int, int] = {}  # 이체 1건당 충돌 횟수 -> 이체 건수
+        self.delay_histogram = [0] * (len(DELAY_BUCKETS_MS) + 1)  # 재시도 대기시간 분포
+
+    def record_delay(self, delay: float):
+        delay_ms = delay * 1000
+        for i, bound in enumerate(DELAY_BUCKETS_MS):
+            if delay_ms <= bound:
+                self.delay_histogram[i] += 1
+                return
+        self.delay_histogram[-1] += 1
+
+    def record_transfer(self, conflicts: int, exhausted: bool):
+        self.transfers += 1
+        if exhausted:
+            self.exhausted += 1
+        self.conflict_histogram[conflicts] = self.conflict_histogram.get(conflicts, 0) + 1
+
+    def stats(self) -> dict:
+        labels = [f"<={bound}ms" for bound in DELAY_BUCKETS_MS] + [f">{DELAY_BUCKETS_MS[-1]}ms"]
+        return {
+            "policy": self.name,
+            "budget": self.budget,
+            "transfers": self.transfers,
+            "exhausted": self.exhausted,
+            "conflicts_per_transfer": dict(sorted(self.conflict_histogram.items())),
+            "retry_delay_histogram": dict(zip(labels, self.delay_histogram)),
+        }
+
+
+class ExponentialBackoff(RetryPolicy):
+    """기존 방식: 0.01 * 2^attempt 고정 대기 (지터 없음, 최대 5회)"""
+    name = "exponential"
+
+    def __init__(self):
+        super().__init__(max_attempts=5)
+
+    def next_delay(self, attempt: int, prev_delay: float, account: str) -> float:
+        return self.base * (2 ** (attempt - 1))
+
+
+class FullJitter(RetryPolicy):
+    """Full Jitter: 0 ~ min(cap, base * 2^attempt) 사이 랜덤 대기
+    동시에 충돌한 요청들이 같은 시점에 다시 부딪히지 않도록 분산
+    """
+    name = "full_jitter"
+
+    def next_delay(self, attempt: int, prev_delay: float, account: str) -> float:
+        return random.uniform(0, min(self.cap, self.base * (2 ** (attempt - 1))))
+
+
+class DecorrelatedJitter(RetryPolicy):
+    """Decorrelated Jitter: base ~ 이전 대기시간 * 3 사이 랜덤 대기 (cap 이하)"""
+    name = "decorrelated"
+
+    def next_delay(self, attempt: int, prev_delay: float, account: str) -> float:
+        return min(self.cap, random.uniform(self.base, max(self.base, prev_delay) * 3))
+
+
+class AdaptiveJitter(RetryPolicy):
+    """적응형: Full Jitter 상한을 계좌 충돌률에 따라 조절
+    충돌률이 높은 계좌는 대기시간을 늘리고, 충돌이 줄면 다시 짧게
+    """
+    name = "adaptive"
+
+    def __init__(self):
+        self.estimator = ConflictRateEstimator()
+        super().__init__()
+
+    def reset_stats(self):
+        super().reset_stats()
+        # 이전 테스트의 계좌별 충돌률이 다음 테스트 대기시간에 섞이지 않도록 같이 초기화
+        self.estimator.clear()
+
+    def stats(self) -> dict:
+        return {**super().stats(), "tracked_accounts": len(self.estimator.rates)}
+
+    def observe(self, account: str, conflicted: bool):
+        self.estimator.observe(account, conflicted)
+
+    def next_delay(self, attempt: int, prev_delay: float, account: str) -> float:
+        # 충돌률 0 -> 0.5배, 충돌률 1 -> 4배
+        scale = 0.5 + 3.5 * self.estimator.rate(account)
+        return random.uniform(0, min(self.cap, self.base * scale * (2 ** (attempt - 1))))
+
+
+def create_retry_policies() -> Dict[str, RetryPolicy]:
+    """정책 이름 -> 새 인스턴스 (시나리오마다 따로 만들어 통계/충돌률 추정이 섞이지 않도록)"""
+    return {
+        policy.name: policy
+        for policy in (ExponentialBackoff(), FullJitter(), DecorrelatedJitter(), AdaptiveJitter())
+    }
+
+
+# 낙관적락 방식이 쓰는 정책 인스턴스 (통계는 정책별로 누적)
+RETRY_POLICIES: Dict[str, RetryPolicy] = create_retry_policies()
+
+
+def get_retry_policy(name: str) -> RetryPolicy:
+    return RETRY_POLICIES[name]
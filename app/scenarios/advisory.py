@@ -0,0 +1,249 @@
+import hashlib
+import time
+from typing import List, Optional
+from asyncpg.exceptions import DeadlockDetectedError, LockNotAvailableError
+from ..models import TransferRequest, TransferResponse
+from ..seeding import seed_accounts, page_balances
+from .batching import UPDATE_BALANCES_SQL
+from ..database import get_advisory_connection, prepare_statement, TimedTransaction
+from ..cache import advisory_cache
+from ..journal import record_transfer
+from ..metrics import lock_wait_seconds, transaction_seconds
+
+# advisory 락 방식
+# 행 락(FOR UPDATE) 대신 계좌 id를 해시한 64비트 키로 pg_advisory_xact_lock 을 잡고 이체
+# - Redis 같은 외부 의존 없이 DB 하나로 처리, 락은 트랜잭션 종료(커밋/롤백) 시 자동 해제
+# - 두 계좌의 키를 정렬된 순서로 한 문장에서 잡음 (락 순서 고정으로 데드락 방지, 라운드트립 1회)
+# - 락으로 보호되므로 잔액은 일반 SELECT 후 다중 행 UPDATE 1문장
+
+# 락 대기 방식
+# wait   : 락이 풀릴 때까지 대기 (pg_advisory_xact_lock)
+# try    : 잠겨 있으면 즉시 실패 (pg_try_advisory_xact_lock)
+# timeout: lock_timeout_ms 까지만 대기 후 실패 (SET LOCAL lock_timeout, 55P03)
+LOCK_WAIT_MODES = ("wait", "try", "timeout")
+LOCK_SQL = "SELECT pg_advisory_xact_lock($1), pg_advisory_xact_lock($2)"
+# 두 함수 모두 호출되도록 AND 대신 컬럼 2개로 받음 (실패해도 트랜잭션 롤백 시 같이 해제)
+TRY_LOCK_SQL = "SELECT pg_try_advisory_xact_lock($1) AS first, pg_try_advisory_xact_lock($2) AS second"
+SET_LOCK_TIMEOUT_SQL = "SELECT set_config('lock_timeout', $1, true)"
+SELECT_ACCOUNTS_SQL = "SELECT id, balance FROM accounts WHERE id = ANY($1::varchar[])"
+SELECT_BALANCES_SQL = "SELECT id, balance, version FROM accounts WHERE id = ANY($1::varchar[])"
+
+# 메트릭 시계열 (핫패스에서 라벨 조회하지 않도록 미리 보관)
+LOCK_WAIT = lock_wait_seconds.labels("advisory")
+TRANSACTION = transaction_seconds.labels("advisory")
+
+
+def lock_key(account: str) -> int:
+    """계좌 id -> advisory 락 키 (blake2b 8바이트, bigint 범위의 부호 있는 정수)"""
+    return int.from_bytes(hashlib.blake2b(account.encode(), digest_size=8).digest(), "big", signed=True)
+
+
+class AdvisoryLockTransferService:
+    def __init__(self):
+        self.initial_balances = {
+            "account_a": 100000,
+            "account_b": 100000
+        }
+        self.initial_balance = 100000  # 계좌별 초기 잔액
+        # 락 대기 방식 기본값 (요청마다 lock_wait / lock_timeout_ms 로 변경 가능)
+        self.lock_wait = "wait"
+        self.lock_timeout_ms = 1000
+        # 락 획득 실패 집계 (try / timeout)
+        self.counters = {
+            "try_failures": 0,
+            "lock_timeouts": 0,
+            "deadlocks": 0,
+        }
+
+    async def transfer(
+        self,
+        request: TransferRequest,
+        lock_wait: Optional[str] = None,
+        lock_timeout_ms: Optional[int] = None
+    ) -> TransferResponse:
+        """advisory 락 이체
+        lock_wait: wait(기본, 락이 풀릴 때까지 대기) / try(잠겨 있으면 즉시 실패)
+                   timeout(lock_timeout_ms 까지만 대기)
+        """
+        start_time = time.perf_counter()
+        lock_wait = lock_wait or self.lock_wait
+        lock_timeout_ms = lock_timeout_ms or self.lock_timeout_ms
+        # 키 순서로 정렬 (같은 키면 같은 락을 두 번 잡는 것이라 재진입으로 통과)
+        keys = sorted([lock_key(request.from_account), lock_key(request.to_account)])
+
+        async with get_advisory_connection() as conn:
+            try:
+                async with TimedTransaction(conn, TRANSACTION):
+                    ############################락 부분############################
+                    if lock_wait == "timeout":
+                        # 이 트랜잭션에서만 락 대기 상한 적용 (SET LOCAL, advisory 락 대기에도 적용됨)
+                        set_lock_timeout = await prepare_statement(conn, SET_LOCK_TIMEOUT_SQL)
+                        await set_lock_timeout.fetchval(f"{lock_timeout_ms}ms")
+
+                    lock_started = time.perf_counter()
+                    if lock_wait == "try":
+                        try_lock = await prepare_statement(conn, TRY_LOCK_SQL)
+                        locked = await try_lock.fetchrow(*keys)
+                        LOCK_WAIT.since(lock_started)
+                        if not (locked['first'] and locked['second']):
+                            self.counters["try_failures"] += 1
+                            return TransferResponse(
+                                success=False,
+                                message="락 획득 실패: 다른 이체가 계좌를 잠그고 있습니다. (try lock)",
+                                execution_time=time.perf_counter() - start_time
+                            )
+                    else:
+                        lock = await prepare_statement(conn, LOCK_SQL)
+                        await lock.fetchrow(*keys)
+                        LOCK_WAIT.since(lock_started)
+
+                    ############################읽는부분############################
+                    # advisory 락으로 보호되므로 일반 SELECT 사용 (두 계좌를 한 번에)
+                    select_accounts = await prepare_statement(conn, SELECT_ACCOUNTS_SQL)
+                    rows = await select_accounts.fetch([request.from_account, request.to_account])
+                    balances = {row['id']: row['balance'] for row in rows}
+
+                    if request.from_account not in balances or request.to_account not in balances:
+                        return TransferResponse(
+                            success=False,
+                            message="계좌를 찾을 수 없습니다.",
+                            execution_time=time.perf_counter() - start_time
+                        )
+
+                    # 잔액 확인
+                    if balances[request.from_account] < request.amount:
+                        return TransferResponse(
+                            success=False,
+                            message="잔액이 부족합니다.",
+                            from_balance=balances[request.from_account],
+                            to_balance=balances[request.to_account],
+                            execution_time=time.perf_counter() - start_time
+                        )
+
+                    ############################업데이트 부분############################
+                    new_from_balance = balances[request.from_account] - request.amount
+                    new_to_balance = balances[request.to_account] + request.amount
+
+                    # 두 계좌를 다중 행 UPDATE 한 문장으로
+                    update_balances = await prepare_statement(conn, UPDATE_BALANCES_SQL)
+                    updated = await update_balances.fetch(
+                        [request.from_account, request.to_account], [new_from_balance, new_to_balance]
+                    )
+                    versions = {row['id']: row['version'] for row in updated}
+
+                    # 이체 저널 (같은 트랜잭션이라 잔액 변경과 같이 커밋/롤백)
+                    await record_transfer(conn, request, new_from_balance, new_to_balance)
+
+                    response = TransferResponse(
+                        success=True,
+                        message="이체가 성공했습니다. (PostgreSQL advisory 락)",
+                        from_balance=new_from_balance,
+                        to_balance=new_to_balance,
+                        from_version=versions.get(request.from_account),
+                        to_version=versions.get(request.to_account),
+                        execution_time=time.perf_counter() - start_time
+                    )
+
+                # 커밋된 뒤에 잔액 캐시 갱신
+                advisory_cache.record_transfer(request, response)
+                return response
+
+            except LockNotAvailableError:
+                # lock_timeout 초과 (SQLSTATE 55P03)
+                self.counters["lock_timeouts"] += 1
+                return TransferResponse(
+                    success=False,
+                    message=f"락 획득 실패: lock_timeout({lock_timeout_ms}ms)을 초과했습니다.",
+                    execution_time=time.perf_counter() - start_time
+                )
+            except DeadlockDetectedError as e:
+                self.counters["deadlocks"] += 1
+                return TransferResponse(
+                    success=False,
+                    message=f"데드락 감지: {str(e)}",
+                    execution_time=time.perf_counter() - start_time
+                )
+            except Exception as e:
+                return TransferResponse(
+                    success=False,
+                    message=f"이체 중 오류가 발생했습니다: {str(e)}",
+                    execution_time=time.perf_counter() - start_time
+                )
+
+    async def initialize_accounts(self, account_count: int = 2, balance_distribution: str = "fixed",
+                                  seed: Optional[int] = None):
+        """테스트를 위한 계좌 초기화 함수
+        1. 기존 계좌/이체 저널 전체 비우기 (TRUNCATE)
+        2. 새로운 계좌 생성 & 초기화 값 입력
+        account_a: 100000, account_b: 100000
+        account_count가 2보다 크면 account_000000 ~ 형식으로 계좌 생성
+        balance_distribution 으로 계좌별 잔액 분포 선택 (총 잔액은 계좌 수 x 100000 으로 동일)
+        """
+        async with get_advisory_connection() as conn:
+            result = await seed_accounts(conn, account_count, self.initial_balance, balance_distribution, seed)
+        # version이 0부터 다시 시작하므로 캐시도 비움
+        advisory_cache.clear()
+        return result
+
+    async def get_balances(self, use_cache: bool = True, accounts: Optional[List[str]] = None):
+        """현재 잔액 조회 (기본은 잔액 캐시 경유, use_cache=False 면 DB 직접 조회)
+        accounts 를 주면 해당 계좌들, 없으면 account_a / account_b
+        """
+        accounts = accounts or ["account_a", "account_b"]
+        if use_cache:
+            cached = await advisory_cache.get_many(accounts, self._fetch_balances)
+            return {account: balance for account, (balance, _) in cached.items()}
+
+        rows = await self._fetch_balances(accounts)
+
+        balances = {}
+        for row in rows:
+            balances[row['id']] = row['balance']
+
+        return balances
+
+    @staticmethod
+    async def _fetch_balances(accounts):
+        async with get_advisory_connection() as conn:
+            select_balances = await prepare_statement(conn, SELECT_BALANCES_SQL)
+            return await select_balances.fetch(accounts)
+
+    async def list_balances(self, after: str = "", limit: int = 100):
+        """전체 계좌 잔액 목록 (계좌 id 순 키셋 페이지네이션, 캐시 거치지 않음)"""
+        async with get_advisory_connection() as conn:
+            return await page_balances(conn, after, limit)
+
+    async def get_balance_summary(self):
+        """전체 계좌 잔액 요약 (계좌 수, 총 잔액, 최소 잔액) - 정합성 확인용"""
+        async with get_advisory_connection() as conn:
+            row = await conn.fetchrow(
+                "SELECT COUNT(*) AS account_count, COALESCE(SUM(balance), 0) AS total_balance, "
+                "COALESCE(MIN(balance), 0) AS min_balance FROM accounts"
+            )
+            return dict(row)
+
+    async def get_lock_info(self):
+        """현재 잡혀 있거나 대기 중인 advisory 락 (pg_locks, 디버깅용)"""
+        async with get_advisory_connection() as conn:
+            rows = await conn.fetch("""
+                SELECT l.pid, l.granted, (l.classid::bigint << 32) | l.objid::bigint AS lock_key,
+                       now() - a.xact_start AS xact_age
+                FROM pg_locks AS l
+                JOIN pg_stat_activity AS a ON a.pid = l.pid
+                WHERE l.locktype = 'advisory' AND l.database = (SELECT oid FROM pg_database WHERE datname = current_database())
+                ORDER BY l.granted DESC, xact_age DESC
+            """)
+        return {
+            "held": sum(1 for row in rows if row['granted']),
+            "waiting": sum(1 for row in rows if not row['granted']),
+            "locks": [
+                {
+                    "pid": row['pid'],
+                    "granted": row['granted'],
+                    "lock_key": row['lock_key'],
+                    "xact_age": row['xact_age'].total_seconds() if row['xact_age'] else None
+                }
+                for row in rows
+            ],
+            "counters": dict(self.counters)
+        }
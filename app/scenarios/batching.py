@@ -0,0 +1,125 @@
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from ..models import TransferRequest, TransferResponse
+
+# 여러 이체를 한 번에 처리하는 공통 도구 (그룹 커밋 / 벌크 이체)
+
+# 잠근 계좌들의 잔액을 한 번에 반영하는 SQL
+SELECT_ACCOUNTS_FOR_UPDATE_SQL = """
+    SELECT id, balance FROM accounts
+    WHERE id = ANY($1::varchar[])
+    ORDER BY id
+    FOR UPDATE
+"""
+UPDATE_BALANCES_SQL = """
+    UPDATE accounts AS a
+    SET balance = u.balance, version = a.version + 1, updated_at = CURRENT_TIMESTAMP
+    FROM unnest($1::varchar[], $2::integer[]) AS u(id, balance)
+    WHERE a.id = u.id
+    RETURNING a.id, a.balance, a.version
+"""
+
+
+def involved_accounts(transfers: List[TransferRequest]) -> List[str]:
+    """이체들에 등장하는 계좌 (정렬 - 락 순서 고정으로 데드락 방지)"""
+    accounts = set()
+    for transfer in transfers:
+        accounts.add(transfer.from_account)
+        accounts.add(transfer.to_account)
+    return sorted(accounts)
+
+
+def apply_transfers(
+    balances: Dict[str, int],
+    transfers: List[TransferRequest]
+) -> Tuple[List[Tuple[bool, str, Optional[int], Optional[int]]], Dict[str, int]]:
+    """이체들을 들어온 순서대로 메모리에서 적용 (잔액 부족이면 그 건만 실패)
+    balances를 직접 갱신하고, (건별 결과, 변경된 계좌 잔액)을 반환
+    건별 결과: (성공 여부, 메시지, 처리 후 출금 계좌 잔액, 처리 후 입금 계좌 잔액)
+    """
+    outcomes = []
+    changed: Dict[str, int] = {}
+    for transfer in transfers:
+        if transfer.from_account not in balances or transfer.to_account not in balances:
+            outcomes.append((False, "계좌를 찾을 수 없습니다.", None, None))
+            continue
+        if balances[transfer.from_account] < transfer.amount:
+            outcomes.append((
+                False, "잔액이 부족합니다.",
+                balances[transfer.from_account], balances[transfer.to_account]
+            ))
+            continue
+        balances[transfer.from_account] -= transfer.amount
+        balances[transfer.to_account] += transfer.amount
+        changed[transfer.from_account] = balances[transfer.from_account]
+        changed[transfer.to_account] = balances[transfer.to_account]
+        outcomes.append((
+            True, "이체가 성공했습니다.",
+            balances[transfer.from_account], balances[transfer.to_account]
+        ))
+    return outcomes, changed
+
+
+class TransferBatcher:
+    """그룹 커밋 배처
+    들어온 이체를 max_wait초 동안 또는 max_batch건까지 모아서 commit_batch 한 번으로 처리
+    호출자는 각자 자기 TransferResponse를 받음
+    """
+
+    def __init__(
+        self,
+        commit_batch: Callable[[List[TransferRequest]], Awaitable[List[Tuple[bool, str, Optional[int], Optional[int]]]]],
+        max_batch: int = 100,
+        max_wait: float = 0.005
+    ):
+        self.commit_batch = commit_batch
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._pending: List[Tuple[TransferRequest, asyncio.Future, float]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks = set()
+
+    async def submit(self, request: TransferRequest) -> TransferResponse:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((request, future, time.perf_counter()))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.create_task(self._commit(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _commit(self, batch: List[Tuple[TransferRequest, asyncio.Future, float]]):
+        try:
+            outcomes = await self.commit_batch([request for request, _, _ in batch])
+        except Exception as e:
+            for _, future, start_time in batch:
+                if not future.done():
+                    future.set_result(TransferResponse(
+                        success=False,
+                        message=f"이체 중 오류가 발생했습니다: {str(e)}",
+                        execution_time=time.perf_counter() - start_time
+                    ))
+            return
+
+        for (_, future, start_time), (success, message, from_balance, to_balance) in zip(batch, outcomes):
+            if future.done():
+                continue
+            future.set_result(TransferResponse(
+                success=success,
+                message=f"{message} (배치 {len(batch)}건)" if success else message,
+                from_balance=from_balance,
+                to_balance=to_balance,
+                execution_time=time.perf_counter() - start_time
+            ))
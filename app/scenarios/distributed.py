@@ -1,8 +1,54 @@
 import asyncio
+import os
+import random
 import time
 import uuid
+from typing import List, Optional
 from ..models import TransferRequest, TransferResponse
-from ..database import get_redis_client, get_distributed_connection
+from ..seeding import seed_accounts, page_balances
+from ..database import get_redis_client, get_distributed_connection, prepare_statement, TimedTransaction
+from ..redis_lock import redis_lock
+from ..redlock import redlock
+from ..cache import distributed_cache
+from ..journal import record_transfer, record_transfers, journal_rows
+from ..metrics import lock_wait_seconds, transaction_seconds, redis_lock_retries, fence_rejections_total
+from .batching import apply_transfers, involved_accounts
+
+# 이체에 쓰는 고정 SQL (커넥션마다 PREPARE 해서 재사용)
+SELECT_ACCOUNT_SQL = "SELECT id, balance FROM accounts WHERE id = $1"
+# version은 잔액 캐시의 stale 감지용 (변경될 때마다 1 증가)
+# fence_token: 내 펜싱 토큰($3)이 마지막으로 기록된 토큰보다 클 때만 갱신 -> 아니면 0행 (RETURNING 없음)
+UPDATE_BALANCE_SQL = """
+    UPDATE accounts SET balance = $1, version = version + 1, fence_token = $3, updated_at = CURRENT_TIMESTAMP
+    WHERE id = $2 AND fence_token < $3
+    RETURNING version
+"""
+# 벌크 이체용 다중 행 UPDATE (batching.UPDATE_BALANCES_SQL + 펜싱 조건, 갱신된 행만 반환)
+UPDATE_BALANCES_SQL = """
+    UPDATE accounts AS a
+    SET balance = u.balance, version = a.version + 1, fence_token = $3, updated_at = CURRENT_TIMESTAMP
+    FROM unnest($1::varchar[], $2::integer[]) AS u(id, balance)
+    WHERE a.id = u.id AND a.fence_token < $3
+    RETURNING a.id, a.balance, a.version
+"""
+SELECT_ACCOUNTS_BULK_SQL = "SELECT id, balance FROM accounts WHERE id = ANY($1::varchar[])"
+# 펜싱 토큰 발급 (database.FENCE_TOKEN_SEQUENCE_SQL, 트랜잭션 롤백과 상관없이 단조 증가)
+NEXT_FENCE_TOKEN_SQL = "SELECT nextval('fence_token_seq')"
+SELECT_BALANCES_SQL = "SELECT id, balance, version FROM accounts WHERE id = ANY($1::varchar[])"
+
+# 메트릭 시계열 (핫패스에서 라벨 조회하지 않도록 미리 보관)
+LOCK_WAIT = lock_wait_seconds.labels("distributed")
+TRANSACTION = transaction_seconds.labels("distributed")
+LOCK_RETRIES = redis_lock_retries.labels("distributed")
+FENCE_REJECTIONS = {backend: fence_rejections_total.labels(backend) for backend in ("single", "redlock")}
+
+FENCE_REJECTED_MESSAGE = "펜싱 토큰 거부: 더 최근 락 소유자가 이미 계좌를 갱신해서 롤백했습니다."
+
+class _LockExpired(Exception):
+    """토큰 발급 직후 또는 커밋 직전에 락 유효 시간이 지난 것을 발견 (트랜잭션 롤백용)"""
+
+class _FenceRejected(Exception):
+    """내 펜싱 토큰보다 큰 토큰으로 이미 갱신된 계좌가 있음 (락이 만료된 뒤 늦게 쓰려던 소유자, 트랜잭션 롤백용)"""
 
 class DistributedLockTransferService:
     def __init__(self):
@@ -10,99 +56,214 @@ class DistributedLockTransferService:
             "account_a": 100000,
             "account_b": 100000
         }
-        self.lock_timeout = 10  # 락 타임아웃 (초)
+        self.initial_balance = 100000  # 계좌별 초기 잔액
+        # 락 타임아웃 (초): 펜싱 토큰이 늦은 쓰기를 막으므로 짧게 잡아도 잔액이 깨지지 않음
+        self.lock_timeout = float(os.getenv("DISTRIBUTED_LOCK_TTL", "10"))
+        self.lock_ttl_ms = int(self.lock_timeout * 1000)
         self.max_retries = 50   # 락 획득 재시도 횟수
         self.retry_delay = 0.1  # 재시도 간격 (초)
+        # 락 대기 방식
+        # poll  : SET NX를 retry_delay 간격으로 재시도
+        # notify: 해제 신호를 BLPOP으로 대기 (해제 즉시 깨어남)
+        self.wait_mode = "poll"
+        self.max_wait = self.max_retries * self.retry_delay  # notify 모드 최대 대기 시간 (초)
+        self.notify_timeout = 1.0  # BLPOP 1회 대기 상한 (TTL 만료로 풀린 락 대비)
+        # 락 범위
+        # single: 정렬된 첫 번째 계좌 하나만 락
+        # multi : 두 계좌 모두 락 (Lua 스크립트로 한 번에 전부 획득/해제)
+        self.lock_scope = "single"
+        # 락 저장소
+        # single : Redis 1대 (REDIS_URL)
+        # redlock: 독립된 Redis N대 과반 획득 (REDLOCK_URLS, 폴링 재시도만 지원)
+        self.lock_backend = "single"
+        self.fence_rejections = 0  # 펜싱 토큰 거부로 롤백한 횟수
     
-    async def transfer(self, request: TransferRequest) -> TransferResponse:
+    async def transfer(
+        self,
+        request: TransferRequest,
+        wait_mode: Optional[str] = None,
+        lock_scope: Optional[str] = None,
+        lock_backend: Optional[str] = None
+    ) -> TransferResponse:
         """Redis 분산락을 사용한 계좌 이체"""
-        start_time = time.time()
+        start_time = time.perf_counter()
         
         # 락 키 생성 (계좌 순서 정렬로 데드락 방지)
         accounts = sorted([request.from_account, request.to_account])
-        lock_key = f"transfer_lock:{accounts[0]}" # 출금계좌 기준으로 락 생성. 
+        if (lock_scope or self.lock_scope) == "multi":
+            # 계좌마다 락 1개씩 (정렬된 순서로 한 번에 전부 획득)
+            lock_keys = [f"transfer_lock:{account}" for account in accounts]
+        else:
+            lock_keys = [f"transfer_lock:{accounts[0]}"] # 출금계좌 기준으로 락 생성. 
         lock_value = str(uuid.uuid4())  # 고유한 락 값
         
+        if (lock_backend or self.lock_backend) == "redlock":
+            return await self._transfer_redlock(request, lock_keys, lock_value, start_time)
+        
         # 락 획득 시도
-        lock_acquired = await self._acquire_lock(lock_key, lock_value)
-        if not lock_acquired:
+        lock_started = time.perf_counter()
+        try:
+            if (wait_mode or self.wait_mode) == "notify":
+                lock_deadline = await self._acquire_lock_notify(lock_keys, lock_value)
+            else:
+                lock_deadline = await self._acquire_lock(lock_keys, lock_value)
+        except Exception as e:
+            return TransferResponse(
+                success=False,
+                message=f"락 획득 실패: Redis 오류 ({type(e).__name__}: {e})",
+                execution_time=time.perf_counter() - start_time
+            )
+        finally:
+            LOCK_WAIT.since(lock_started)
+        if not lock_deadline:
             return TransferResponse(
                 success=False,
-                message=f"락 획득 실패: 다른 이체 작업이 진행 중입니다. (최대 {self.max_retries}회 재시도)",
-                execution_time=time.time() - start_time
+                message=f"락 획득 실패: 다른 이체 작업이 진행 중입니다. (최대 {self.max_wait:.1f}초 대기)",
+                execution_time=time.perf_counter() - start_time
             )
         
+        # 이체가 길어져도 락이 만료되지 않도록 워치독으로 연장
+        watchdog = redis_lock.start_watchdog(lock_keys, lock_value, self.lock_ttl_ms)
         try:
             # 락 획득 성공 후 이체 로직 수행
-            return await self._perform_transfer(request, start_time)
+            return await self._perform_transfer(request, start_time, lock_deadline, "single")
         finally:
+            watchdog.cancel()
             # 락 해제
-            await self._release_lock(lock_key, lock_value)
+            await self._release_lock(lock_keys, lock_value)
     
-    async def _acquire_lock(self, lock_key: str, lock_value: str) -> bool:
-        """Redis 분산락 획득"""
-        redis = await get_redis_client()
+    async def _transfer_redlock(self, request: TransferRequest, lock_keys: List[str], lock_value: str,
+                                start_time: float) -> TransferResponse:
+        """Redlock으로 락을 잡고 이체 (유효 시간 안에 커밋하지 못하면 롤백)
+        펜싱 토큰은 단일 Redis 방식과 같은 DB 시퀀스에서 발급 (노드 카운터 사용 안 함)
+        """
+        lock_started = time.perf_counter()
+        try:
+            lock_deadline = await self._acquire_redlock(lock_keys, lock_value)
+        except Exception as e:
+            lock_deadline = None
+            print(f"Redlock 획득 실패: {e}")
+        finally:
+            LOCK_WAIT.since(lock_started)
+        if lock_deadline is None:
+            return TransferResponse(
+                success=False,
+                message=f"락 획득 실패: 과반 노드({redlock.quorum}/{len(redlock.nodes)})에서 락을 잡지 못했습니다.",
+                execution_time=time.perf_counter() - start_time
+            )
+        
+        try:
+            return await self._perform_transfer(request, start_time, lock_deadline, "redlock", check_commit=True)
+        finally:
+            await redlock.release(lock_keys, lock_value)
+    
+    async def _acquire_redlock(self, lock_keys: List[str], lock_value: str) -> Optional[float]:
+        """Redlock 획득 (실패하면 지터를 준 간격으로 재시도 - 경쟁자들이 노드를 나눠 잡는 상황 완화)
+        성공하면 락 유효 기한 (time.monotonic 기준), 실패하면 None
+        """
+        for attempt in range(self.max_retries):
+            validity_ms = await redlock.acquire(lock_keys, lock_value, self.lock_ttl_ms)
+            if validity_ms is not None:
+                LOCK_RETRIES.observe(attempt)
+                return time.monotonic() + validity_ms / 1000
+            await asyncio.sleep(random.uniform(0, self.retry_delay))
         
+        LOCK_RETRIES.observe(self.max_retries)
+        return None
+    
+    def _lock_deadline(self, requested_at: float) -> float:
+        """획득 요청을 보낸 시각 기준 락이 확실히 유효한 기한 (TTL - 시계 오차 보정, Redlock과 같은 계산)"""
+        return requested_at + (self.lock_ttl_ms * (1 - redlock.drift_factor) - 2) / 1000
+    
+    async def _acquire_lock(self, lock_keys: List[str], lock_value: str) -> float:
+        """Redis 분산락 획득 (Lua 스크립트: 전부 아니면 전무 SET PX, 라운드트립 1회)
+        성공하면 락 유효 기한 (time.monotonic 기준), 실패하면 0
+        """
         for attempt in range(self.max_retries):
-            # SET key value NX EX seconds: 키가 존재하지 않으면 설정하고 만료시간 설정
-            result = await redis.set(
-                lock_key, 
-                lock_value, 
-                nx=True,  # not Exist = True => 레디스에 이 키가 없을때만 set
-                ex=self.lock_timeout  # Expire = 10초
-                
-            )
-            
-            if result:  # 락 획득 성공
-                return True
+            # 키가 존재하지 않으면 설정하고 만료시간 설정
+            requested_at = time.monotonic()
+            if await redis_lock.acquire(lock_keys, lock_value, self.lock_ttl_ms):  # 락 획득 성공
+                LOCK_RETRIES.observe(attempt)
+                return self._lock_deadline(requested_at)
             
             # 락 획득 실패 시 잠시 대기 후 재시도
             await asyncio.sleep(self.retry_delay)
         
-        return False  # 최대 재시도 횟수 초과
+        LOCK_RETRIES.observe(self.max_retries)
+        return 0  # 최대 재시도 횟수 초과
     
-    async def _release_lock(self, lock_key: str, lock_value: str):
-        """ 락 해제"""
-        redis = await get_redis_client()
+    async def _acquire_lock_notify(self, lock_keys: List[str], lock_value: str) -> float:
+        """Redis 분산락 획득 (해제 신호 대기 방식)
+        실패하면 고정 sleep 대신 BLPOP으로 해제 신호를 기다렸다가 바로 재시도
+        성공하면 락 유효 기한 (time.monotonic 기준), 실패하면 0
+        """
+        deadline = time.monotonic() + self.max_wait
         
-        try:
-            # 1. 현재 값 확인
-            current_value = await redis.get(lock_key)
+        retries = 0
+        while True:
+            requested_at = time.monotonic()
+            if await redis_lock.acquire(lock_keys, lock_value, self.lock_ttl_ms):
+                LOCK_RETRIES.observe(retries)
+                return self._lock_deadline(requested_at)
             
-            # 2. 자신이 설정한 락인지 확인
-            if current_value == lock_value:
-                # 3. 락 삭제
-                await redis.delete(lock_key)
-                print(f"락 해제 성공: {lock_key}")
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                LOCK_RETRIES.observe(retries)
+                return 0  # 최대 대기 시간 초과
+            
+            retries += 1
+            await redis_lock.wait_for_release(lock_keys, min(remaining, self.notify_timeout))
+    
+    async def _release_lock(self, lock_keys: List[str], lock_value: str):
+        """ 락 해제 (Lua 스크립트: 값 비교 + DEL을 원자적으로, 라운드트립 1회)"""
+        try:
+            # 자신이 설정한 락일 때만 삭제
+            released = await redis_lock.release(lock_keys, lock_value, self.lock_ttl_ms)
+            if released == len(lock_keys):
+                print(f"락 해제 성공: {lock_keys}")
             else:
-                print(f"다른 락 값, 해제하지 않음: {lock_key}")
+                print(f"다른 락 값, 일부 해제하지 않음: {lock_keys}")
                 
         except Exception as e:
             print(f"락 해제 실패: {e}")
     
-    async def _perform_transfer(self, request: TransferRequest, start_time: float) -> TransferResponse:
-        """실제 이체 로직 수행 (락 보호 하에서 실행)"""
+    @staticmethod
+    async def _issue_fence_token(conn, lock_deadline: float) -> int:
+        """DB 시퀀스에서 펜싱 토큰 발급, 발급 시점에 락이 아직 유효해야 사용
+        락을 유효하게 잡고 있는 동안 발급한 토큰만 쓰므로 나중 소유자의 토큰이 항상 더 큼
+        (발급 전에 멈췄다가 락이 만료된 소유자는 여기서 롤백, 발급 후에 멈춘 소유자는 UPDATE 조건에서 거부)
+        """
+        next_fence_token = await prepare_statement(conn, NEXT_FENCE_TOKEN_SQL)
+        fence_token = await next_fence_token.fetchval()
+        if time.monotonic() > lock_deadline:
+            raise _LockExpired()
+        return fence_token
+    
+    async def _perform_transfer(self, request: TransferRequest, start_time: float, lock_deadline: float,
+                                lock_backend: str, check_commit: bool = False) -> TransferResponse:
+        """실제 이체 로직 수행 (락 보호 하에서 실행)
+        트랜잭션 시작 시 펜싱 토큰 발급 (lock_deadline 이 지났으면 롤백)
+        UPDATE는 토큰이 계좌에 기록된 토큰보다 클 때만 반영 (락 만료 후 늦게 쓰는 소유자 차단)
+        check_commit 이면 커밋 직전에도 lock_deadline 을 확인 (워치독 연장이 없는 Redlock)
+        """
         async with get_distributed_connection() as conn:
             try:
                 # 트랜잭션 시작
-                async with conn.transaction():
+                async with TimedTransaction(conn, TRANSACTION):
+                    fence_token = await self._issue_fence_token(conn, lock_deadline)
+                    
                     ############################읽는부분############################
                     # 분산락으로 보호되므로 일반 SELECT 사용
-                    from_account_data = await conn.fetchrow(
-                        "SELECT id, balance FROM accounts WHERE id = $1",
-                        request.from_account
-                    )
+                    select_account = await prepare_statement(conn, SELECT_ACCOUNT_SQL)
+                    from_account_data = await select_account.fetchrow(request.from_account)
                     
-                    to_account_data = await conn.fetchrow(
-                        "SELECT id, balance FROM accounts WHERE id = $1",
-                        request.to_account
-                    )
+                    to_account_data = await select_account.fetchrow(request.to_account)
                     
                     if not from_account_data or not to_account_data:
                         return TransferResponse(
                             success=False,
                             message="계좌를 찾을 수 없습니다.",
-                            execution_time=time.time() - start_time
+                            execution_time=time.perf_counter() - start_time
                         )
                     
                     # 잔액 확인
@@ -112,85 +273,215 @@ class DistributedLockTransferService:
                             message="잔액이 부족합니다.",
                             from_balance=from_account_data['balance'],
                             to_balance=to_account_data['balance'],
-                            execution_time=time.time() - start_time
+                            execution_time=time.perf_counter() - start_time
                         )
                     
                     ############################업데이트 부분############################
                     new_from_balance = from_account_data['balance'] - request.amount
                     new_to_balance = to_account_data['balance'] + request.amount
                     
-                    # 분산락으로 보호되므로 일반 UPDATE 사용
-                    await conn.execute(
-                        "UPDATE accounts SET balance = $1, updated_at = CURRENT_TIMESTAMP WHERE id = $2",
-                        new_from_balance, request.from_account
-                    )
+                    # 분산락 + 펜싱 토큰 조건부 UPDATE (더 최근 소유자가 이미 썼으면 0행 -> 롤백)
+                    update_balance = await prepare_statement(conn, UPDATE_BALANCE_SQL)
+                    from_version = await update_balance.fetchval(new_from_balance, request.from_account, fence_token)
+                    to_version = await update_balance.fetchval(new_to_balance, request.to_account, fence_token)
+                    if from_version is None or to_version is None:
+                        raise _FenceRejected()
                     
-                    await conn.execute(
-                        "UPDATE accounts SET balance = $1, updated_at = CURRENT_TIMESTAMP WHERE id = $2",
-                        new_to_balance, request.to_account
-                    )
+                    # 이체 저널 (같은 트랜잭션이라 잔액 변경과 같이 커밋/롤백)
+                    await record_transfer(conn, request, new_from_balance, new_to_balance)
                     
-                    return TransferResponse(
+                    # 락이 이미 풀렸을 수 있으면 커밋하지 않음 (다른 소유자와 동시에 쓰는 것 방지)
+                    if check_commit and time.monotonic() > lock_deadline:
+                        raise _LockExpired()
+                    
+                    response = TransferResponse(
                         success=True,
                         message="이체가 성공했습니다. (Redis 분산락 사용 - Python 방식)",
                         from_balance=new_from_balance,
                         to_balance=new_to_balance,
-                        execution_time=time.time() - start_time
+                        from_version=from_version,
+                        to_version=to_version,
+                        execution_time=time.perf_counter() - start_time
                     )
-                    
+                
+                # 커밋된 뒤에 잔액 캐시 갱신 (아직 락을 잡고 있어서 순서 보장)
+                distributed_cache.record_transfer(request, response)
+                return response
+            
+            except _LockExpired:
+                return TransferResponse(
+                    success=False,
+                    message="락 유효 시간 초과: 커밋하지 않고 롤백했습니다.",
+                    execution_time=time.perf_counter() - start_time
+                )
+            except _FenceRejected:
+                self.fence_rejections += 1
+                FENCE_REJECTIONS[lock_backend].inc()
+                return TransferResponse(
+                    success=False,
+                    message=FENCE_REJECTED_MESSAGE,
+                    execution_time=time.perf_counter() - start_time
+                )
             except Exception as e:
                 return TransferResponse(
                     success=False,
                     message=f"이체 중 오류가 발생했습니다: {str(e)}",
-                    execution_time=time.time() - start_time
+                    execution_time=time.perf_counter() - start_time
                 )
     
-    async def initialize_accounts(self):
+    async def transfer_bulk(self, transfers, wait_mode: Optional[str] = None):
+        """벌크 이체 (집합 단위 실행)
+        관련 계좌 전부의 락을 한 번에 획득 -> 일괄 조회 -> 순서대로 적용 -> 다중 행 UPDATE
+        """
+        accounts = involved_accounts(transfers)
+        lock_keys = [f"transfer_lock:{account}" for account in accounts]
+        lock_value = str(uuid.uuid4())
+        
+        lock_started = time.perf_counter()
+        try:
+            if (wait_mode or self.wait_mode) == "notify":
+                lock_deadline = await self._acquire_lock_notify(lock_keys, lock_value)
+            else:
+                lock_deadline = await self._acquire_lock(lock_keys, lock_value)
+        except Exception as e:
+            message = f"락 획득 실패: Redis 오류 ({type(e).__name__}: {e})"
+            return [(False, message, None, None)] * len(transfers)
+        finally:
+            LOCK_WAIT.since(lock_started)
+        if not lock_deadline:
+            message = f"락 획득 실패: 다른 이체 작업이 진행 중입니다. (최대 {self.max_wait:.1f}초 대기)"
+            return [(False, message, None, None)] * len(transfers)
+        
+        watchdog = redis_lock.start_watchdog(lock_keys, lock_value, self.lock_ttl_ms)
+        try:
+            async with get_distributed_connection() as conn:
+                updated = []
+                try:
+                    async with TimedTransaction(conn, TRANSACTION):
+                        fence_token = await self._issue_fence_token(conn, lock_deadline)
+                        
+                        # 분산락으로 보호되므로 일반 SELECT 사용
+                        select_accounts = await prepare_statement(conn, SELECT_ACCOUNTS_BULK_SQL)
+                        rows = await select_accounts.fetch(accounts)
+                        balances = {row['id']: row['balance'] for row in rows}
+                        
+                        outcomes, changed = apply_transfers(balances, transfers)
+                        
+                        if changed:
+                            update_balances = await prepare_statement(conn, UPDATE_BALANCES_SQL)
+                            updated = await update_balances.fetch(
+                                list(changed.keys()), list(changed.values()), fence_token
+                            )
+                            # 한 계좌라도 더 최근 소유자가 썼으면 묶음 전체 롤백
+                            if len(updated) != len(changed):
+                                raise _FenceRejected()
+                            await record_transfers(conn, journal_rows(transfers, outcomes))
+                except _LockExpired:
+                    message = "락 유효 시간 초과: 커밋하지 않고 롤백했습니다."
+                    return [(False, message, None, None)] * len(transfers)
+                except _FenceRejected:
+                    self.fence_rejections += 1
+                    FENCE_REJECTIONS["single"].inc()
+                    return [(False, FENCE_REJECTED_MESSAGE, None, None)] * len(transfers)
+                distributed_cache.put_rows(updated)
+                return outcomes
+        finally:
+            watchdog.cancel()
+            await self._release_lock(lock_keys, lock_value)
+    
+    async def initialize_accounts(self, account_count: int = 2, balance_distribution: str = "fixed",
+                                  seed: Optional[int] = None):
         """테스트를 위한 계좌 초기화 함수
-        1. 기존 계좌값 전체 삭제
+        1. 기존 계좌/이체 저널 전체 비우기 (TRUNCATE)
         2. 새로운 계좌 생성 & 초기화 값 입력
         account_a: 100000, account_b: 100000
+        account_count가 2보다 크면 account_000000 ~ 형식으로 계좌 생성
+        balance_distribution 으로 계좌별 잔액 분포 선택 (총 잔액은 계좌 수 x 100000 으로 동일)
         """
         async with get_distributed_connection() as conn:
-            # 기존 계좌 삭제
-            await conn.execute("DELETE FROM accounts")
-            
-            # 새 계좌 생성
-            await conn.execute(
-                "INSERT INTO accounts (id, balance) VALUES ($1, $2), ($3, $4)",
-                "account_a", self.initial_balances["account_a"],
-                "account_b", self.initial_balances["account_b"]
-            )
-            
-            return self.initial_balances
+            result = await seed_accounts(conn, account_count, self.initial_balance, balance_distribution, seed)
+        # version이 0부터 다시 시작하므로 캐시도 비움
+        distributed_cache.clear()
+        return result
     
-    async def get_balances(self):
-        """현재 잔액 조회"""
+    async def get_balances(self, use_cache: bool = True, accounts: Optional[List[str]] = None):
+        """현재 잔액 조회 (기본은 잔액 캐시 경유, use_cache=False 면 DB 직접 조회)
+        accounts 를 주면 해당 계좌들, 없으면 account_a / account_b
+        """
+        accounts = accounts or ["account_a", "account_b"]
+        if use_cache:
+            cached = await distributed_cache.get_many(accounts, self._fetch_balances)
+            return {account: balance for account, (balance, _) in cached.items()}
+        
+        rows = await self._fetch_balances(accounts)
+        
+        balances = {}
+        for row in rows:
+            balances[row['id']] = row['balance']
+        
+        return balances
+    
+    @staticmethod
+    async def _fetch_balances(accounts):
         async with get_distributed_connection() as conn:
-            rows = await conn.fetch(
-                "SELECT id, balance FROM accounts WHERE id IN ('account_a', 'account_b')"
-            )
-            
-            balances = {}
-            for row in rows:
-                balances[row['id']] = row['balance']
-            
-            return balances
+            select_balances = await prepare_statement(conn, SELECT_BALANCES_SQL)
+            return await select_balances.fetch(accounts)
     
-    async def get_lock_info(self):
-        """현재 락 상태 조회 (디버깅용)"""
+    async def get_lock_info(self, prefix: str = "", cursor: int = 0, limit: int = 100, max_scans: int = 20):
+        """현재 락 상태 조회 (디버깅용)
+        KEYS 대신 SCAN 커서로 조금씩 훑어서 Redis를 막지 않음
+        - prefix  : 계좌 id 접두사 필터 (transfer_lock:{prefix}*)
+        - cursor  : 이전 응답의 next_cursor (0이면 처음부터)
+        - limit   : 한 페이지 최대 락 개수 (SCAN COUNT 힌트로도 사용)
+        - max_scans: 한 번에 보내는 SCAN 호출 상한 (락이 드문드문 있어도 응답 시간 제한)
+        TTL/GET은 페이지 단위로 파이프라인 1회에 조회
+        반환: (락 정보, 다음 커서 - 0이면 끝)
+        """
         redis = await get_redis_client()
+        match = f"transfer_lock:{prefix}*"
         
-        # 모든 transfer_lock 키 조회
-        lock_keys = await redis.keys("transfer_lock:*")
+        lock_keys = []
+        for _ in range(max_scans):
+            cursor, keys = await redis.scan(cursor=cursor, match=match, count=limit)
+            lock_keys.extend(keys)
+            if cursor == 0 or len(lock_keys) >= limit:
+                break
         
         lock_info = {}
-        for key in lock_keys:
-            ttl = await redis.ttl(key)
-            value = await redis.get(key)
-            lock_info[key] = {
-                "value": value,
-                "ttl": ttl
-            }
-        
-        return lock_info 
\ No newline at end of file
+        if lock_keys:
+            pipe = redis.pipeline(transaction=False)
+            for key in lock_keys:
+                pipe.pttl(key)
+                pipe.get(key)
+            results = await pipe.execute()
+            for key, ttl_ms, value in zip(lock_keys, results[0::2], results[1::2]):
+                if value is None:
+                    continue  # SCAN 이후 해제/만료된 락
+                lock_info[key] = {
+                    "value": value,
+                    "ttl": ttl_ms / 1000 if ttl_ms >= 0 else ttl_ms
+                }
+        
+        return lock_info, cursor
+    
+    async def count_locks(self, prefix: str = "") -> int:
+        """현재 잡혀 있는 락 개수 (SCAN으로 끝까지 순회)"""
+        redis = await get_redis_client()
+        count = 0
+        async for _ in redis.scan_iter(match=f"transfer_lock:{prefix}*", count=1000):
+            count += 1
+        return count
+    
+    async def list_balances(self, after: str = "", limit: int = 100):
+        """전체 계좌 잔액 목록 (계좌 id 순 키셋 페이지네이션, 캐시 거치지 않음)"""
+        async with get_distributed_connection() as conn:
+            return await page_balances(conn, after, limit)
+    
+    async def get_balance_summary(self):
+        """전체 계좌 잔액 요약 (계좌 수, 총 잔액, 최소 잔액) - 정합성 확인용"""
+        async with get_distributed_connection() as conn:
+            row = await conn.fetchrow(
+                "SELECT COUNT(*) AS account_count, COALESCE(SUM(balance), 0) AS total_balance, "
+                "COALESCE(MIN(balance), 0) AS min_balance FROM accounts"
+            )
+            return dict(row)
@@ -1,7 +1,80 @@
 import asyncio
 import time
+from typing import List, Optional
 from ..models import TransferRequest, TransferResponse
-from ..database import get_optimistic_connection
+from ..seeding import seed_accounts, page_balances
+from ..database import get_optimistic_connection, prepare_statement, TimedTransaction
+from ..retry import get_retry_policy
+from ..cache import optimistic_cache
+from ..journal import record_transfer, record_transfers, journal_rows
+from ..metrics import transaction_seconds, optimistic_conflicts, optimistic_attempts_total
+from .batching import apply_transfers, involved_accounts
+
+# 이체에 쓰는 고정 SQL (커넥션마다 PREPARE 해서 재사용)
+SELECT_ACCOUNT_SQL = "SELECT id, balance, version FROM accounts WHERE id = $1"
+SELECT_ACCOUNTS_SQL = "SELECT id, balance, version FROM accounts WHERE id IN ($1, $2)"
+# version이 그대로일 때만 업데이트, 충돌이면 행이 반환되지 않음
+UPDATE_WITH_VERSION_SQL = """
+    UPDATE accounts SET balance = $1, version = version + 1, updated_at = CURRENT_TIMESTAMP
+    WHERE id = $2 AND version = $3
+    RETURNING version
+"""
+
+# 단일 문장 조건부 업데이트 (두 계좌 version 확인 + 업데이트를 한 번에)
+# 1. expected: 읽은 시점의 version과 변경량
+# 2. matched : version이 그대로인 행만 잠금 (문장 안에서만 잠깐 잠금)
+# 3. updated: 두 행 모두 일치할 때만 업데이트 -> 한쪽만 반영되고 롤백되는 일이 없음
+# 4. journal: 업데이트된 경우에만 처리 후 잔액으로 이체 저널 기록
+# 반환된 행 수가 2가 아니면 충돌
+CONDITIONAL_TRANSFER_SQL = """
+    WITH expected (id, delta, version) AS (
+        VALUES ($1::varchar, -$3::integer, $4::integer),
+               ($2::varchar, $3::integer, $5::integer)
+    ), matched AS (
+        SELECT a.id FROM accounts AS a
+        JOIN expected AS e ON a.id = e.id AND a.version = e.version
+        ORDER BY a.id
+        FOR UPDATE OF a
+    ), updated AS (
+        UPDATE accounts AS a
+        SET balance = a.balance + e.delta,
+            version = a.version + 1,
+            updated_at = CURRENT_TIMESTAMP
+        FROM expected AS e
+        WHERE a.id = e.id
+          AND a.version = e.version
+          AND (SELECT count(*) FROM matched) = 2
+        RETURNING a.id, a.balance, a.version
+    ), journal AS (
+        INSERT INTO transfers (from_account, to_account, amount, from_balance, to_balance)
+        SELECT $1, $2, $3, f.balance, t.balance
+        FROM updated AS f JOIN updated AS t ON f.id = $1 AND t.id = $2
+    )
+    SELECT id, balance, version FROM updated
+"""
+
+# 벌크 이체용: 관련 계좌 일괄 조회 / version 확인 다중 행 UPDATE
+SELECT_ACCOUNTS_BULK_SQL = "SELECT id, balance, version FROM accounts WHERE id = ANY($1::varchar[])"
+UPDATE_BALANCES_WITH_VERSION_SQL = """
+    UPDATE accounts AS a
+    SET balance = u.balance, version = a.version + 1, updated_at = CURRENT_TIMESTAMP
+    FROM unnest($1::varchar[], $2::integer[], $3::integer[]) AS u(id, balance, version)
+    WHERE a.id = u.id AND a.version = u.version
+    RETURNING a.id, a.balance, a.version
+"""
+
+# 메트릭 시계열 (핫패스에서 라벨 조회하지 않도록 미리 보관)
+TRANSACTION = transaction_seconds.labels("optimistic")
+CONFLICTS = optimistic_conflicts.labels("optimistic")
+ATTEMPTS_COMMITTED = optimistic_attempts_total.labels("optimistic", "committed")
+ATTEMPTS_CONFLICT = optimistic_attempts_total.labels("optimistic", "conflict")
+ATTEMPTS_REJECTED = optimistic_attempts_total.labels("optimistic", "rejected")
+ATTEMPTS_ERROR = optimistic_attempts_total.labels("optimistic", "error")
+
+class _ConflictRollback(Exception):
+    """트랜잭션 안에서 충돌 감지 시 롤백용 (응답을 담아서 밖으로 전달)"""
+    def __init__(self, response: TransferResponse):
+        self.response = response
 
 class OptimisticLockTransferService:
     def __init__(self):
@@ -9,59 +82,100 @@ class OptimisticLockTransferService:
             "account_a": 100000,
             "account_b": 100000
         }
-        self.max_retries = 5  # 재시도 최대 횟수
+        self.initial_balance = 100000  # 계좌별 초기 잔액
+        self.retry_policy = "adaptive"  # 기본 재시도 정책 (app/retry.py 참고)
+        # 이체 시도 방식
+        # default: SELECT 2회 + version 확인 UPDATE 2회
+        # cte    : SELECT 1회 + 두 계좌 조건부 UPDATE 1문장 (RETURNING)
+        self.mode = "default"
     
-    async def transfer(self, request: TransferRequest) -> TransferResponse:
-        """낙관적락을 사용한 계좌 이체 (재시도 로직 포함)"""
-        start_time = time.time()
+    async def transfer(
+        self,
+        request: TransferRequest,
+        retry_policy: Optional[str] = None,
+        mode: Optional[str] = None
+    ) -> TransferResponse:
+        """낙관적락을 사용한 계좌 이체 (재시도 로직 포함)
+        충돌 시 재시도 정책(retry_policy)에 따라 대기 후 재시도, 정책의 시간 예산을 넘기면 포기
+        """
+        start_time = time.perf_counter()
+        attempt_transfer = self._attempt_transfer_cte if (mode or self.mode) == "cte" else self._attempt_transfer
+        policy = get_retry_policy(retry_policy or self.retry_policy)
+        deadline = time.monotonic() + policy.budget
         
-        for attempt in range(self.max_retries):
+        attempt = 0
+        conflicts = 0
+        delay = 0.0
+        last_error = None
+        while True:
+            attempt += 1
             try:
-                result = await self._attempt_transfer(request, start_time, attempt + 1)
-                if result.success or result.message == "잔액이 부족합니다.":
+                result = await attempt_transfer(request, start_time, attempt)
+                if result.success or result.message in ("잔액이 부족합니다.", "계좌를 찾을 수 없습니다."):
+                    (ATTEMPTS_COMMITTED if result.success else ATTEMPTS_REJECTED).inc()
+                    CONFLICTS.observe(conflicts)
+                    # 커밋된 잔액/version으로 잔액 캐시 갱신
+                    optimistic_cache.record_transfer(request, result)
+                    policy.observe(request.from_account, False)
+                    policy.record_transfer(conflicts, exhausted=False)
                     return result
                 # 충돌 시 재시도
-                # 재시도 간격을 점점 늘려가면서 대기
-                # attempt=1 이면 0.02초, attempt=2 이면 0.04초, attempt=3 이면 0.08초...
-                # 이렇게 하면 동시 요청이 몰릴 때 충돌 가능성을 줄일 수 있음
-                await asyncio.sleep(0.01 * (2 ** attempt))  # 지수 백오프
+                ATTEMPTS_CONFLICT.inc()
+                conflicts += 1
+                last_error = None
+                policy.observe(request.from_account, True)
             except Exception as e:
-                if attempt == self.max_retries - 1:
-                    return TransferResponse(
-                        success=False,
-                        message=f"이체 중 오류가 발생했습니다: {str(e)}",
-                        execution_time=time.time() - start_time
-                    )
+                ATTEMPTS_ERROR.inc()
+                last_error = e
+            
+            if policy.max_attempts and attempt >= policy.max_attempts:
+                break
+            # 재시도 간격은 정책이 결정 (지터로 동시 요청들이 같은 시점에 다시 충돌하지 않도록 분산)
+            delay = policy.next_delay(attempt, delay, request.from_account)
+            if time.monotonic() + delay > deadline:
+                break  # 시간 예산 초과
+            policy.record_delay(delay)
+            await asyncio.sleep(delay)
+        
+        CONFLICTS.observe(conflicts)
+        policy.record_transfer(conflicts, exhausted=True)
+        if last_error is not None:
+            return TransferResponse(
+                success=False,
+                message=f"이체 중 오류가 발생했습니다: {str(last_error)}",
+                execution_time=time.perf_counter() - start_time
+            )
         
         return TransferResponse(
             success=False,
-            message=f"최대 재시도 횟수({self.max_retries})를 초과했습니다. 동시성 충돌이 지속되고 있습니다.",
-            execution_time=time.time() - start_time
+            message=f"재시도 한도({attempt}회 시도, 예산 {policy.budget}초)를 초과했습니다. 동시성 충돌이 지속되고 있습니다.",
+            execution_time=time.perf_counter() - start_time
         )
     
     async def _attempt_transfer(self, request: TransferRequest, start_time: float, attempt: int) -> TransferResponse:
         """단일 이체 시도"""
+        try:
+            return await self._attempt_transfer_in_transaction(request, start_time, attempt)
+        except _ConflictRollback as conflict:
+            return conflict.response
+    
+    async def _attempt_transfer_in_transaction(self, request: TransferRequest, start_time: float, attempt: int) -> TransferResponse:
         async with get_optimistic_connection() as conn:
             # 트랜잭션 시작
-            async with conn.transaction():
+            async with TimedTransaction(conn, TRANSACTION):
                 ############################읽는부분 (락 없음)############################
                 # 낙관적락: SELECT FOR UPDATE 사용하지 않음
                 # 대신 version 컬럼을 함께 조회
-                from_account_data = await conn.fetchrow(
-                    "SELECT id, balance, version FROM accounts WHERE id = $1",
-                    request.from_account
-                )
+                select_account = await prepare_statement(conn, SELECT_ACCOUNT_SQL)
+                from_account_data = await select_account.fetchrow(request.from_account)
                 
-                to_account_data = await conn.fetchrow(
-                    "SELECT id, balance, version FROM accounts WHERE id = $1",
-                    request.to_account
-                )
+                to_account_data = await select_account.fetchrow(request.to_account)
                 
                 if not from_account_data or not to_account_data:
                     return TransferResponse(
                         success=False,
                         message="계좌를 찾을 수 없습니다.",
-                        execution_time=time.time() - start_time
+                        execution_time=time.perf_counter() - start_time
                     )
                 
                 # 잔액 확인
@@ -73,7 +187,7 @@ class OptimisticLockTransferService:
                         to_balance=to_account_data['balance'],
                         from_version=from_account_data['version'],
                         to_version=to_account_data['version'],
-                        execution_time=time.time() - start_time
+                        execution_time=time.perf_counter() - start_time
                     )
                 
                 ############################업데이트 부분 ############################
@@ -83,13 +197,13 @@ class OptimisticLockTransferService:
                 # 낙관적락: UPDATE 시 version을 확인하여 충돌 감지
                 # from_account 업데이트 (version 확인)
                 # from_account의 버전 값이 우리 가 조회한 값과 같으면 버전업 하고 밸런스도 업데이트 해줘...
-                from_update_result = await conn.execute(
-                    "UPDATE accounts SET balance = $1, version = version + 1, updated_at = CURRENT_TIMESTAMP WHERE id = $2 AND version = $3",
+                update_with_version = await prepare_statement(conn, UPDATE_WITH_VERSION_SQL)
+                from_update_result = await update_with_version.fetchval(
                     new_from_balance, request.from_account, from_account_data['version']
                 )
                 
                 # 업데이트된 행이 없으면 충돌 발생
-                if from_update_result == "UPDATE 0":
+                if from_update_result is None:
                     return TransferResponse(
                         success=False,
                         message=f"동시성 충돌 감지 (출금 계좌) - 재시도 {attempt}회차",
@@ -97,26 +211,29 @@ class OptimisticLockTransferService:
                         to_balance=to_account_data['balance'],
                         from_version=from_account_data['version'],
                         to_version=to_account_data['version'],
-                        execution_time=time.time() - start_time
+                        execution_time=time.perf_counter() - start_time
                     )
                 
                 # to_account 업데이트 (version 확인)
-                to_update_result = await conn.execute(
-                    "UPDATE accounts SET balance = $1, version = version + 1, updated_at = CURRENT_TIMESTAMP WHERE id = $2 AND version = $3",
+                to_update_result = await update_with_version.fetchval(
                     new_to_balance, request.to_account, to_account_data['version']
                 )
                 
                 # 업데이트된 행이 없으면 충돌 발생
-                if to_update_result == "UPDATE 0":
-                    return TransferResponse(
+                # 출금 계좌 업데이트가 커밋되지 않도록 트랜잭션을 롤백하고 충돌 응답
+                if to_update_result is None:
+                    raise _ConflictRollback(TransferResponse(
                         success=False,
                         message=f"동시성 충돌 감지 (입금 계좌) - 재시도 {attempt}회차",
                         from_balance=from_account_data['balance'],
                         to_balance=to_account_data['balance'],
                         from_version=from_account_data['version'],
                         to_version=to_account_data['version'],
-                        execution_time=time.time() - start_time
-                    )
+                        execution_time=time.perf_counter() - start_time
+                    ))
+                
+                # 이체 저널 (같은 트랜잭션이라 충돌로 롤백되면 같이 취소)
+                await record_transfer(conn, request, new_from_balance, new_to_balance)
                 
                 # 성공 시 업데이트된 version 정보 포함
                 return TransferResponse(
@@ -126,41 +243,179 @@ class OptimisticLockTransferService:
                     to_balance=new_to_balance,
                     from_version=from_account_data['version'] + 1,  # 업데이트된 version
                     to_version=to_account_data['version'] + 1,     # 업데이트된 version
-                    execution_time=time.time() - start_time
+                    execution_time=time.perf_counter() - start_time
+                )
+    
+    async def _attempt_transfer_cte(self, request: TransferRequest, start_time: float, attempt: int) -> TransferResponse:
+        """단일 이체 시도 (조건부 단일 UPDATE 문장)
+        읽기 1회 + 쓰기 1회, 각 문장이 자체로 원자적이라 별도 트랜잭션 불필요
+        """
+        async with get_optimistic_connection() as conn:
+            ############################읽는부분 (락 없음)############################
+            select_accounts = await prepare_statement(conn, SELECT_ACCOUNTS_SQL)
+            rows = await select_accounts.fetch(request.from_account, request.to_account)
+            accounts = {row['id']: row for row in rows}
+            from_account_data = accounts.get(request.from_account)
+            to_account_data = accounts.get(request.to_account)
+            
+            if not from_account_data or not to_account_data:
+                return TransferResponse(
+                    success=False,
+                    message="계좌를 찾을 수 없습니다.",
+                    execution_time=time.perf_counter() - start_time
+                )
+            
+            # 잔액 확인
+            if from_account_data['balance'] < request.amount:
+                return TransferResponse(
+                    success=False,
+                    message="잔액이 부족합니다.",
+                    from_balance=from_account_data['balance'],
+                    to_balance=to_account_data['balance'],
+                    from_version=from_account_data['version'],
+                    to_version=to_account_data['version'],
+                    execution_time=time.perf_counter() - start_time
+                )
+            
+            ############################업데이트 부분 ############################
+            # 두 계좌 version이 모두 그대로일 때만 한 문장으로 업데이트
+            conditional_transfer = await prepare_statement(conn, CONDITIONAL_TRANSFER_SQL)
+            # 조건부 UPDATE 한 문장이 곧 트랜잭션
+            tx_started = time.perf_counter()
+            updated = await conditional_transfer.fetch(
+                request.from_account, request.to_account, request.amount,
+                from_account_data['version'], to_account_data['version']
+            )
+            TRANSACTION.since(tx_started)
+            
+            # 업데이트된 행이 2개가 아니면 충돌 발생 (이 경우 아무 행도 바뀌지 않음)
+            if len(updated) != 2:
+                return TransferResponse(
+                    success=False,
+                    message=f"동시성 충돌 감지 (조건부 업데이트) - 재시도 {attempt}회차",
+                    from_balance=from_account_data['balance'],
+                    to_balance=to_account_data['balance'],
+                    from_version=from_account_data['version'],
+                    to_version=to_account_data['version'],
+                    execution_time=time.perf_counter() - start_time
                 )
+            
+            # 잔액과 version은 RETURNING 결과 그대로 사용
+            result = {row['id']: row for row in updated}
+            return TransferResponse(
+                success=True,
+                message=f"이체가 성공했습니다. (재시도 {attempt}회차)",
+                from_balance=result[request.from_account]['balance'],
+                to_balance=result[request.to_account]['balance'],
+                from_version=result[request.from_account]['version'],
+                to_version=result[request.to_account]['version'],
+                execution_time=time.perf_counter() - start_time
+            )
+    
+    async def transfer_bulk(self, transfers, retry_policy: Optional[str] = None):
+        """벌크 이체 (집합 단위 실행)
+        관련 계좌 일괄 조회 -> 순서대로 적용 -> version 확인 다중 행 UPDATE
+        한 계좌라도 version이 바뀌었으면 전체 롤백 후 재시도 정책에 따라 다시 시도
+        """
+        policy = get_retry_policy(retry_policy or self.retry_policy)
+        deadline = time.monotonic() + policy.budget
+        attempt = 0
+        delay = 0.0
+        while True:
+            attempt += 1
+            try:
+                return await self._attempt_transfer_bulk(transfers)
+            except _ConflictRollback:
+                pass
+            if policy.max_attempts and attempt >= policy.max_attempts:
+                break
+            delay = policy.next_delay(attempt, delay, "bulk")
+            if time.monotonic() + delay > deadline:
+                break
+            await asyncio.sleep(delay)
+        message = f"재시도 한도({attempt}회 시도)를 초과했습니다. 동시성 충돌이 지속되고 있습니다."
+        return [(False, message, None, None)] * len(transfers)
+    
+    async def _attempt_transfer_bulk(self, transfers):
+        async with get_optimistic_connection() as conn:
+            updated = []
+            async with TimedTransaction(conn, TRANSACTION):
+                select_accounts = await prepare_statement(conn, SELECT_ACCOUNTS_BULK_SQL)
+                rows = await select_accounts.fetch(involved_accounts(transfers))
+                balances = {row['id']: row['balance'] for row in rows}
+                versions = {row['id']: row['version'] for row in rows}
+                
+                outcomes, changed = apply_transfers(balances, transfers)
+                
+                if changed:
+                    ids = list(changed.keys())
+                    update_balances = await prepare_statement(conn, UPDATE_BALANCES_WITH_VERSION_SQL)
+                    updated = await update_balances.fetch(
+                        ids, list(changed.values()), [versions[account] for account in ids]
+                    )
+                    # 하나라도 version이 달라졌으면 충돌 -> 롤백
+                    if len(updated) != len(ids):
+                        raise _ConflictRollback(None)
+                    await record_transfers(conn, journal_rows(transfers, outcomes))
+            optimistic_cache.put_rows(updated)
+            return outcomes
     
-    async def initialize_accounts(self):
+    async def initialize_accounts(self, account_count: int = 2, balance_distribution: str = "fixed",
+                                  seed: Optional[int] = None):
         """테스트를 위한 계좌 초기화 함수
-        1. 기존 계좌값 전체 삭제
+        1. 기존 계좌/이체 저널 전체 비우기 (TRUNCATE)
         2. 새로운 계좌 생성 & 초기화 값 입력
         account_a: 100000, account_b: 100000
+        account_count가 2보다 크면 account_000000 ~ 형식으로 계좌 생성
+        balance_distribution 으로 계좌별 잔액 분포 선택 (총 잔액은 계좌 수 x 100000 으로 동일)
         version: 0 (초기값)
         """
         async with get_optimistic_connection() as conn:
-            # 기존 계좌 삭제
-            await conn.execute("DELETE FROM accounts")
-            
-            # 새 계좌 생성 (version 0으로 초기화)
-            await conn.execute(
-                "INSERT INTO accounts (id, balance, version) VALUES ($1, $2, 0), ($3, $4, 0)",
-                "account_a", self.initial_balances["account_a"],
-                "account_b", self.initial_balances["account_b"]
-            )
-            
-            return self.initial_balances
+            result = await seed_accounts(conn, account_count, self.initial_balance, balance_distribution, seed)
+        # version이 0부터 다시 시작하므로 캐시도 비움
+        optimistic_cache.clear()
+        return result
+    
+    async def get_balances(self, use_cache: bool = True, accounts: Optional[List[str]] = None):
+        """현재 잔액 조회 (version 정보 포함)
+        기본은 잔액 캐시 경유, use_cache=False 면 DB 직접 조회
+        accounts 를 주면 해당 계좌들, 없으면 account_a / account_b
+        """
+        accounts = accounts or ["account_a", "account_b"]
+        if use_cache:
+            rows = await optimistic_cache.get_many(accounts, self._fetch_balances)
+            return {
+                account: {"balance": balance, "version": version}
+                for account, (balance, version) in rows.items()
+            }
+        
+        rows = await self._fetch_balances(accounts)
+        
+        balances = {}
+        for row in rows:
+            balances[row['id']] = {
+                "balance": row['balance'],
+                "version": row['version']
+            }
+        
+        return balances
+    
+    @staticmethod
+    async def _fetch_balances(accounts):
+        async with get_optimistic_connection() as conn:
+            select_accounts = await prepare_statement(conn, SELECT_ACCOUNTS_BULK_SQL)
+            return await select_accounts.fetch(accounts)
     
-    async def get_balances(self):
-        """현재 잔액 조회 (version 정보 포함)"""
+    async def list_balances(self, after: str = "", limit: int = 100):
+        """전체 계좌 잔액 목록 (계좌 id 순 키셋 페이지네이션, 캐시 거치지 않음)"""
         async with get_optimistic_connection() as conn:
-            rows = await conn.fetch(
-                "SELECT id, balance, version FROM accounts WHERE id IN ('account_a', 'account_b')"
+            return await page_balances(conn, after, limit)
+    
+    async def get_balance_summary(self):
+        """전체 계좌 잔액 요약 (계좌 수, 총 잔액, 최소 잔액) - 정합성 확인용"""
+        async with get_optimistic_connection() as conn:
+            row = await conn.fetchrow(
+                "SELECT COUNT(*) AS account_count, COALESCE(SUM(balance), 0) AS total_balance, "
+                "COALESCE(MIN(balance), 0) AS min_balance FROM accounts"
             )
-            
-            balances = {}
-            for row in rows:
-                balances[row['id']] = {
-                    "balance": row['balance'],
-                    "version": row['version']
-                }
-            
-            return balances 
\ No newline at end of file
+            return dict(row)
@@ -1,7 +1,114 @@
 import asyncio
 import time
+from typing import List, Optional
+from asyncpg.exceptions import DeadlockDetectedError, LockNotAvailableError
 from ..models import TransferRequest, TransferResponse
-from ..database import get_pessimistic_connection
+from ..seeding import seed_accounts, page_balances
+from .batching import (
+    TransferBatcher, apply_transfers, involved_accounts,
+    SELECT_ACCOUNTS_FOR_UPDATE_SQL, UPDATE_BALANCES_SQL
+)
+from ..database import get_pessimistic_connection, prepare_statement, TimedTransaction
+from ..cache import pessimistic_cache
+from ..journal import record_transfer, record_transfers, journal_rows
+from ..metrics import lock_wait_seconds, transaction_seconds
+from ..diagnostics import pessimistic_diagnostics
+
+# 이체에 쓰는 고정 SQL (커넥션마다 PREPARE 해서 재사용)
+SELECT_FOR_UPDATE_SQL = "SELECT id, balance FROM accounts WHERE id = $1 FOR UPDATE"
+SELECT_ACCOUNT_SQL = "SELECT id, balance FROM accounts WHERE id = $1"
+# 락 대기 방식별 SELECT FOR UPDATE
+# wait / timeout: 락이 풀릴 때까지 대기 (timeout은 SET LOCAL lock_timeout 으로 상한)
+# nowait        : 잠겨 있으면 즉시 에러 (55P03)
+# skip_locked   : 잠긴 행은 결과에서 빠짐
+LOCK_WAIT_MODES = ("wait", "timeout", "nowait", "skip_locked")
+SELECT_FOR_UPDATE_SQLS = {
+    "wait": SELECT_FOR_UPDATE_SQL,
+    "timeout": SELECT_FOR_UPDATE_SQL,
+    "nowait": SELECT_FOR_UPDATE_SQL + " NOWAIT",
+    "skip_locked": SELECT_FOR_UPDATE_SQL + " SKIP LOCKED",
+}
+SET_LOCK_TIMEOUT_SQL = "SELECT set_config('lock_timeout', $1, true)"
+# version은 잔액 캐시의 stale 감지용 (변경될 때마다 1 증가)
+UPDATE_BALANCE_SQL = """
+    UPDATE accounts SET balance = $1, version = version + 1, updated_at = CURRENT_TIMESTAMP
+    WHERE id = $2
+    RETURNING version
+"""
+SELECT_BALANCES_SQL = "SELECT id, balance, version FROM accounts WHERE id = ANY($1::varchar[])"
+
+# 단일 라운드트립 이체 SQL
+# 1. locked : 두 계좌를 id 순서로 FOR UPDATE (기존과 동일한 정렬 락 순서)
+# 2. checked: 잠근 행에서 출금/입금 계좌 잔액 확인
+# 3. updated: 잔액이 충분할 때만 두 계좌를 한 번에 UPDATE
+# 4. journal: 두 계좌가 다 바뀌었을 때만 처리 후 잔액으로 이체 저널 기록
+# 락 획득 ~ 업데이트 ~ 커밋까지 한 문장(암묵적 트랜잭션)으로 끝나서 락 보유 시간이 RTT 1회로 줄어듦
+ATOMIC_TRANSFER_SQL = """
+    WITH locked AS (
+        SELECT id, balance FROM accounts
+        WHERE id IN ($1, $2)
+        ORDER BY id
+        FOR UPDATE
+    ), checked AS (
+        SELECT
+            (SELECT balance FROM locked WHERE id = $1) AS from_balance,
+            (SELECT balance FROM locked WHERE id = $2) AS to_balance
+    ), updated AS (
+        UPDATE accounts AS a
+        SET balance = CASE WHEN a.id = $1 THEN a.balance - $3 ELSE a.balance + $3 END,
+            version = a.version + 1,
+            updated_at = CURRENT_TIMESTAMP
+        FROM checked AS c
+        WHERE a.id IN ($1, $2)
+          AND c.to_balance IS NOT NULL
+          AND c.from_balance >= $3
+        RETURNING a.id, a.balance, a.version
+    ), journal AS (
+        INSERT INTO transfers (from_account, to_account, amount, from_balance, to_balance)
+        SELECT $1, $2, $3, f.balance, t.balance
+        FROM updated AS f JOIN updated AS t ON f.id = $1 AND t.id = $2
+    )
+    SELECT
+        c.from_balance,
+        c.to_balance,
+        (SELECT balance FROM updated WHERE id = $1) AS new_from_balance,
+        (SELECT balance FROM updated WHERE id = $2) AS new_to_balance,
+        (SELECT version FROM updated WHERE id = $1) AS new_from_version,
+        (SELECT version FROM updated WHERE id = $2) AS new_to_version
+    FROM checked AS c
+"""
+
+# 메트릭 시계열 (핫패스에서 라벨 조회하지 않도록 미리 보관)
+LOCK_WAIT = lock_wait_seconds.labels("pessimistic")
+TRANSACTION = transaction_seconds.labels("pessimistic")
+
+async def commit_transfer_batch(transfers):
+    """여러 이체를 트랜잭션 하나로 처리 (그룹 커밋)
+    1. 관련 계좌 전부를 id 순서로 FOR UPDATE (한 문장)
+    2. 들어온 순서대로 잔액 확인하며 메모리에서 적용 (잔액 부족 건만 실패)
+    3. 변경된 잔액을 다중 행 UPDATE 한 문장으로 반영 + 성공한 이체를 저널에 다중 행 INSERT
+    4. 커밋 후 변경된 계좌의 잔액 캐시 갱신
+    """
+    async with get_pessimistic_connection() as conn:
+        updated = []
+        async with TimedTransaction(conn, TRANSACTION):
+            select_for_update = await prepare_statement(conn, SELECT_ACCOUNTS_FOR_UPDATE_SQL)
+            lock_started = time.perf_counter()
+            rows = await select_for_update.fetch(involved_accounts(transfers))
+            LOCK_WAIT.since(lock_started)
+            balances = {row['id']: row['balance'] for row in rows}
+            
+            outcomes, changed = apply_transfers(balances, transfers)
+            
+            if changed:
+                update_balances = await prepare_statement(conn, UPDATE_BALANCES_SQL)
+                updated = await update_balances.fetch(list(changed.keys()), list(changed.values()))
+                await record_transfers(conn, journal_rows(transfers, outcomes))
+        pessimistic_cache.put_rows(updated)
+        return outcomes
+
+# 그룹 커밋 배처 (최대 5ms 또는 100건씩 모아서 처리)
+transfer_batcher = TransferBatcher(commit_transfer_batch, max_batch=100, max_wait=0.005)
 
 class PessimisticLockTransferService:
     def __init__(self):
@@ -9,37 +116,68 @@ class PessimisticLockTransferService:
             "account_a": 100000,
             "account_b": 100000
         }
+        self.initial_balance = 100000  # 계좌별 초기 잔액
     
-    @staticmethod
-    async def transfer(request: TransferRequest) -> TransferResponse:
-        start_time = time.time()
+    # 락 대기 방식 기본값 (요청마다 lock_wait / lock_timeout_ms 로 변경 가능)
+    lock_wait = "wait"
+    lock_timeout_ms = 1000
+    
+    @classmethod
+    async def transfer(
+        cls,
+        request: TransferRequest,
+        lock_wait: Optional[str] = None,
+        lock_timeout_ms: Optional[int] = None
+    ) -> TransferResponse:
+        """비관적락 이체
+        lock_wait: wait(기본, 락이 풀릴 때까지 대기) / timeout(lock_timeout_ms 까지만 대기)
+                   nowait(잠겨 있으면 즉시 실패) / skip_locked(잠긴 행은 건너뛰고 실패 처리)
+        """
+        start_time = time.perf_counter()
+        lock_wait = lock_wait or cls.lock_wait
         
         async with get_pessimistic_connection() as conn:
             try:
                 # 트랜잭션 시작
-                async with conn.transaction(): # 트랜젝션 : 커밋하고 롤백 자동화
+                async with TimedTransaction(conn, TRANSACTION): # 트랜젝션 : 커밋하고 롤백 자동화 (+ 소요 시간 기록)
+                    if lock_wait == "timeout":
+                        # 이 트랜잭션에서만 락 대기 상한 적용 (SET LOCAL)
+                        set_lock_timeout = await prepare_statement(conn, SET_LOCK_TIMEOUT_SQL)
+                        await set_lock_timeout.fetchval(f"{lock_timeout_ms or cls.lock_timeout_ms}ms")
+                    
                     # 비관적락을 위한 SELECT FOR UPDATE 사용
                     # 계좌 순서를 정렬하여 데드락 방지 : 정렬안해두면 2개 요청이 동시에 accound_a와 account_b에 락을 걸었을때 데드락 발생
                     accounts = sorted([request.from_account, request.to_account])
 
                     ############################읽는부분############################        
                     # 첫 번째 계좌 잠금 # 업데이트를 할 수 있음을 가정하고 쿼리..
-                    row1 = await conn.fetchrow(
-                        "SELECT id, balance FROM accounts WHERE id = $1 FOR UPDATE",
-                        accounts[0]
-                    )
+                    select_for_update = await prepare_statement(conn, SELECT_FOR_UPDATE_SQLS[lock_wait])
+                    lock_started = time.perf_counter()
+                    row1 = await select_for_update.fetchrow(accounts[0])
+                    row1_locked = time.perf_counter()
+                    pessimistic_diagnostics.record_wait(accounts[0], row1_locked - lock_started)
                     
                     # 두 번째 계좌 잠금
-                    row2 = await conn.fetchrow(
-                        "SELECT id, balance FROM accounts WHERE id = $1 FOR UPDATE",
-                        accounts[1]
-                    )
+                    row2 = await select_for_update.fetchrow(accounts[1])
+                    pessimistic_diagnostics.record_wait(accounts[1], time.perf_counter() - row1_locked)
+                    LOCK_WAIT.since(lock_started)
                     
                     if not row1 or not row2:
+                        if lock_wait == "skip_locked":
+                            # 행이 없는 게 아니라 다른 트랜잭션이 잠가서 건너뛴 것인지 확인
+                            select_account = await prepare_statement(conn, SELECT_ACCOUNT_SQL)
+                            missing = accounts[0] if not row1 else accounts[1]
+                            if await select_account.fetchrow(missing):
+                                pessimistic_diagnostics.counters["skip_locked_failures"] += 1
+                                return TransferResponse(
+                                    success=False,
+                                    message=f"락 획득 실패: 다른 이체가 {missing} 계좌를 잠그고 있습니다. (SKIP LOCKED)",
+                                    execution_time=time.perf_counter() - start_time
+                                )
                         return TransferResponse(
                             success=False,
                             message="계좌를 찾을 수 없습니다.",
-                            execution_time=time.time() - start_time
+                            execution_time=time.perf_counter() - start_time
                         )
                     
                     # 실제 계좌 정보 구분
@@ -53,7 +191,7 @@ class PessimisticLockTransferService:
                             message="잔액이 부족합니다.",
                             from_balance=from_account_data['balance'],
                             to_balance=to_account_data['balance'],
-                            execution_time=time.time() - start_time
+                            execution_time=time.perf_counter() - start_time
                         )
                     
                     
@@ -61,61 +199,165 @@ class PessimisticLockTransferService:
                     new_from_balance = from_account_data['balance'] - request.amount
                     new_to_balance = to_account_data['balance'] + request.amount
                     
-                    await conn.execute(
-                        "UPDATE accounts SET balance = $1, updated_at = CURRENT_TIMESTAMP WHERE id = $2",
-                        new_from_balance, request.from_account
-                    )
+                    update_balance = await prepare_statement(conn, UPDATE_BALANCE_SQL)
+                    from_version = await update_balance.fetchval(new_from_balance, request.from_account)
+                    to_version = await update_balance.fetchval(new_to_balance, request.to_account)
                     
-                    await conn.execute(
-                        "UPDATE accounts SET balance = $1, updated_at = CURRENT_TIMESTAMP WHERE id = $2",
-                        new_to_balance, request.to_account
-                    )
+                    # 이체 저널 (같은 트랜잭션이라 잔액 변경과 같이 커밋/롤백)
+                    await record_transfer(conn, request, new_from_balance, new_to_balance)
                     
-                    return TransferResponse(
+                    response = TransferResponse(
                         success=True,
                         message="이체가 성공했습니다.",
                         from_balance=new_from_balance,
                         to_balance=new_to_balance,
-                        execution_time=time.time() - start_time
+                        from_version=from_version,
+                        to_version=to_version,
+                        execution_time=time.perf_counter() - start_time
                     )
-                    
+                
+                # 커밋된 뒤에 잔액 캐시 갱신
+                pessimistic_cache.record_transfer(request, response)
+                return response
+            
+            except LockNotAvailableError:
+                # lock_timeout 초과 또는 NOWAIT (SQLSTATE 55P03)
+                if lock_wait == "nowait":
+                    pessimistic_diagnostics.counters["nowait_failures"] += 1
+                    message = "락 획득 실패: 다른 이체가 계좌를 잠그고 있습니다. (NOWAIT)"
+                else:
+                    pessimistic_diagnostics.counters["lock_timeouts"] += 1
+                    message = f"락 획득 실패: lock_timeout({lock_timeout_ms or cls.lock_timeout_ms}ms)을 초과했습니다."
+                return TransferResponse(
+                    success=False,
+                    message=message,
+                    execution_time=time.perf_counter() - start_time
+                )
+            except DeadlockDetectedError as e:
+                pessimistic_diagnostics.counters["deadlocks"] += 1
+                return TransferResponse(
+                    success=False,
+                    message=f"데드락 감지: {str(e)}",
+                    execution_time=time.perf_counter() - start_time
+                )
+            except Exception as e:
+                return TransferResponse(
+                    success=False,
+                    message=f"이체 중 오류가 발생했습니다: {str(e)}",
+                    execution_time=time.perf_counter() - start_time
+                )
+
+    @staticmethod
+    async def transfer_atomic(request: TransferRequest) -> TransferResponse:
+        """단일 라운드트립 이체 (락 + 잔액 확인 + 업데이트를 한 문장으로 실행)"""
+        start_time = time.perf_counter()
+        
+        async with get_pessimistic_connection() as conn:
+            try:
+                atomic_transfer = await prepare_statement(conn, ATOMIC_TRANSFER_SQL)
+                # 한 문장이 곧 트랜잭션 (락 대기 시간은 분리해서 잴 수 없어서 트랜잭션 시간에 포함)
+                tx_started = time.perf_counter()
+                row = await atomic_transfer.fetchrow(
+                    request.from_account, request.to_account, request.amount
+                )
+                TRANSACTION.since(tx_started)
+                
+                if row['from_balance'] is None or row['to_balance'] is None:
+                    return TransferResponse(
+                        success=False,
+                        message="계좌를 찾을 수 없습니다.",
+                        execution_time=time.perf_counter() - start_time
+                    )
+                
+                # 업데이트된 행이 없으면 잔액 부족
+                if row['new_from_balance'] is None:
+                    return TransferResponse(
+                        success=False,
+                        message="잔액이 부족합니다.",
+                        from_balance=row['from_balance'],
+                        to_balance=row['to_balance'],
+                        execution_time=time.perf_counter() - start_time
+                    )
+                
+                response = TransferResponse(
+                    success=True,
+                    message="이체가 성공했습니다. (단일 라운드트립)",
+                    from_balance=row['new_from_balance'],
+                    to_balance=row['new_to_balance'],
+                    from_version=row['new_from_version'],
+                    to_version=row['new_to_version'],
+                    execution_time=time.perf_counter() - start_time
+                )
+                pessimistic_cache.record_transfer(request, response)
+                return response
+                
             except Exception as e:
                 return TransferResponse(
                     success=False,
                     message=f"이체 중 오류가 발생했습니다: {str(e)}",
-                    execution_time=time.time() - start_time
+                    execution_time=time.perf_counter() - start_time
                 )
 
+    @staticmethod
+    async def transfer_batched(request: TransferRequest) -> TransferResponse:
+        """그룹 커밋 이체 (핫 계좌 처리량 개선용)
+        몇 ms 동안 모인 이체를 트랜잭션 하나로 처리, 잔액 확인은 들어온 순서대로 하므로 마이너스 잔액 없음
+        """
+        return await transfer_batcher.submit(request)
 
+    @staticmethod
+    async def transfer_bulk(transfers):
+        """벌크 이체 (집합 단위 실행): 관련 계좌 일괄 FOR UPDATE -> 순서대로 적용 -> 다중 행 UPDATE"""
+        return await commit_transfer_batch(transfers)
 
-    async def initialize_accounts(self):
-        """테스트를 위한 계좌 초기화 함수 반드시 아래 값이 나와야 함..
-        1. 기존 계좌값 전체 삭제
+    async def initialize_accounts(self, account_count: int = 2, balance_distribution: str = "fixed",
+                                  seed: Optional[int] = None):
+        """테스트를 위한 계좌 초기화 함수
+        1. 기존 계좌/이체 저널 전체 비우기 (TRUNCATE)
         2. 새로운 계좌 생성 & 초기화 값 입력
         account_a: 100000, account_b: 100000
+        account_count가 2보다 크면 account_000000 ~ 형식으로 계좌 생성
+        balance_distribution 으로 계좌별 잔액 분포 선택 (총 잔액은 계좌 수 x 100000 으로 동일)
         """
         async with get_pessimistic_connection() as conn:
-            # 기존 계좌 삭제
-            await conn.execute("DELETE FROM accounts")
-            
-            # 새 계좌 생성
-            await conn.execute(
-                "INSERT INTO accounts (id, balance) VALUES ($1, $2), ($3, $4)",
-                "account_a", self.initial_balances["account_a"],
-                "account_b", self.initial_balances["account_b"]
-            )
-            
-            return self.initial_balances
+            result = await seed_accounts(conn, account_count, self.initial_balance, balance_distribution, seed)
+        # version이 0부터 다시 시작하므로 캐시도 비움
+        pessimistic_cache.clear()
+        return result
+    
+    async def get_balances(self, use_cache: bool = True, accounts: Optional[List[str]] = None):
+        """현재 잔액 조회 (기본은 잔액 캐시 경유, use_cache=False 면 DB 직접 조회)
+        accounts 를 주면 해당 계좌들, 없으면 account_a / account_b
+        """
+        accounts = accounts or ["account_a", "account_b"]
+        if use_cache:
+            cached = await pessimistic_cache.get_many(accounts, self._fetch_balances)
+            return {account: balance for account, (balance, _) in cached.items()}
+        
+        rows = await self._fetch_balances(accounts)
+        
+        balances = {}
+        for row in rows:
+            balances[row['id']] = row['balance']
+        
+        return balances
     
-    async def get_balances(self):
-        """현재 잔액 조회"""
+    @staticmethod
+    async def _fetch_balances(accounts):
+        async with get_pessimistic_connection() as conn:
+            select_balances = await prepare_statement(conn, SELECT_BALANCES_SQL)
+            return await select_balances.fetch(accounts)
+    
+    async def list_balances(self, after: str = "", limit: int = 100):
+        """전체 계좌 잔액 목록 (계좌 id 순 키셋 페이지네이션, 캐시 거치지 않음)"""
         async with get_pessimistic_connection() as conn:
-            rows = await conn.fetch(
-                "SELECT id, balance FROM accounts WHERE id IN ('account_a', 'account_b')"
+            return await page_balances(conn, after, limit)
+    
+    async def get_balance_summary(self):
+        """전체 계좌 잔액 요약 (계좌 수, 총 잔액, 최소 잔액) - 정합성 확인용"""
+        async with get_pessimistic_connection() as conn:
+            row = await conn.fetchrow(
+                "SELECT COUNT(*) AS account_count, COALESCE(SUM(balance), 0) AS total_balance, "
+                "COALESCE(MIN(balance), 0) AS min_balance FROM accounts"
             )
-            
-            balances = {}
-            for row in rows:
-                balances[row['id']] = row['balance']
-            
-            return balances
\ No newline at end of file
+            return dict(row)
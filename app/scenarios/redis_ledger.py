@@ -0,0 +1,343 @@
+import asyncio
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+from redis.exceptions import ResponseError
+from ..models import TransferRequest, TransferResponse
+from ..database import get_redis_client, get_distributed_connection, prepare_statement, TimedTransaction
+from ..cache import distributed_cache
+from ..journal import record_transfers
+from ..metrics import transaction_seconds
+from .batching import UPDATE_BALANCES_SQL
+from .distributed import DistributedLockTransferService
+
+# Redis 원장 방식
+# 잔액은 Redis 해시(ledger:balances)에 두고, 잔액 확인 + 이동 + 이체 기록을 Lua 스크립트 하나로 원자적으로 처리
+# Redis는 스크립트를 한 번에 하나씩 실행하므로 별도 락이 필요 없음
+# 커밋된 이체는 Redis Stream(ledger:transfers)에 쌓이고, 백그라운드 writer가 배치로 distributed DB accounts 에 반영
+
+BALANCES_KEY = "ledger:balances"
+STREAM_KEY = "ledger:transfers"
+WRITER_GROUP = "ledger-writer"
+
+# 이체: 두 계좌 존재 확인 -> 잔액 확인 -> HINCRBY 2회 -> XADD (처리 후 잔액을 같이 기록)
+# 반환: {-1} 계좌 없음 / {0, 출금 잔액, 입금 잔액} 잔액 부족 / {1, 출금 잔액, 입금 잔액, 스트림 id} 성공
+TRANSFER_SCRIPT = """
+local from_balance = redis.call('HGET', KEYS[1], ARGV[1])
+local to_balance = redis.call('HGET', KEYS[1], ARGV[2])
+if not from_balance or not to_balance then
+    return {-1}
+end
+local amount = tonumber(ARGV[3])
+if tonumber(from_balance) < amount then
+    return {0, tonumber(from_balance), tonumber(to_balance)}
+end
+from_balance = redis.call('HINCRBY', KEYS[1], ARGV[1], -amount)
+to_balance = redis.call('HINCRBY', KEYS[1], ARGV[2], amount)
+local id = redis.call('XADD', KEYS[2], '*',
+    'from', ARGV[1], 'to', ARGV[2], 'amount', ARGV[3],
+    'from_balance', from_balance, 'to_balance', to_balance)
+return {1, from_balance, to_balance, id}
+"""
+
+# writer 배치 트랜잭션 시간 (메트릭)
+WRITER_TRANSACTION = transaction_seconds.labels("ledger")
+
+# 반영한 마지막 스트림 id (database.LEDGER_OFFSET_TABLE_SQL), 배치 트랜잭션 안에서 잠그고 읽음
+SELECT_OFFSET_SQL = "SELECT last_ms, last_seq FROM ledger_writer_offsets WHERE stream = $1 FOR UPDATE"
+UPSERT_OFFSET_SQL = """
+    INSERT INTO ledger_writer_offsets (stream, last_ms, last_seq) VALUES ($1, $2, $3)
+    ON CONFLICT (stream) DO UPDATE SET last_ms = EXCLUDED.last_ms, last_seq = EXCLUDED.last_seq
+"""
+
+
+def parse_stream_id(entry_id: str) -> Tuple[int, int]:
+    """스트림 id "밀리초-순번" -> 비교 가능한 (밀리초, 순번)"""
+    ms, seq = entry_id.split("-")
+    return int(ms), int(seq)
+
+
+class LedgerWriter:
+    """ledger:transfers 스트림 -> distributed DB accounts 배치 반영 (consumer group)
+    스트림 항목에는 처리 후 잔액(절대값)이 들어 있어서, 배치 안에서는 계좌별 마지막 값만 다중 행 UPDATE 1회로 반영
+    같은 트랜잭션에서 배치의 이체들을 저널(transfers)에 다중 행 INSERT (스트림 순서 = 저널 id 순서)
+    같은 트랜잭션에서 반영한 마지막 스트림 id 를 기록 -> XACK 전에 죽어서 다시 전달된 항목은 건너뜀 (재처리해도 저널 중복 없음)
+    반영 후 XACK + XDEL 이라서 스트림 길이 = 아직 DB에 반영되지 않은 이체 수
+    """
+
+    def __init__(self, batch_size: Optional[int] = None, block_ms: int = 1000):
+        self.batch_size = batch_size or int(os.getenv("LEDGER_WRITER_BATCH_SIZE", "500"))
+        self.block_ms = block_ms
+        self.consumer = f"writer-{os.getpid()}"
+        self.generation = 0  # 초기화할 때마다 증가 (초기화 이전에 읽은 항목은 버림)
+        self.apply_lock = asyncio.Lock()
+        self.batches = 0
+        self.applied = 0
+        self.errors = 0
+        self.skipped = 0  # 이미 반영된 id 라서 건너뛴 재전달 항목 수
+        self.last_batch_size = 0
+        self._task: Optional[asyncio.Task] = None
+
+    async def ensure_group(self):
+        client = await get_redis_client()
+        try:
+            await client.xgroup_create(STREAM_KEY, WRITER_GROUP, id="0", mkstream=True)
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    async def _run(self):
+        client = await get_redis_client()
+        await self.ensure_group()
+        read_pending = True  # 시작하면 이전에 읽고 반영하지 못한 항목부터
+        while True:
+            generation = self.generation
+            try:
+                response = await client.xreadgroup(
+                    WRITER_GROUP, self.consumer, {STREAM_KEY: "0" if read_pending else ">"},
+                    count=self.batch_size, block=None if read_pending else self.block_ms
+                )
+                entries = response[0][1] if response else []
+                if read_pending and not entries:
+                    read_pending = False
+                    continue
+                if entries:
+                    await self.apply(entries, generation)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.errors += 1
+                print(f"원장 writer 반영 실패: {e}")
+                read_pending = True
+                await asyncio.sleep(1)
+                try:
+                    await self.ensure_group()
+                except Exception:
+                    pass
+
+    async def apply(self, entries, generation: int):
+        """스트림 항목 배치를 DB에 반영하고 XACK + XDEL"""
+        client = await get_redis_client()
+        ids = [entry_id for entry_id, _ in entries]
+        # pending 목록에 남아 있지만 이미 삭제된 항목(fields 없음)은 제외, 스트림 id 순서 그대로
+        pending = [(parse_stream_id(entry_id), fields) for entry_id, fields in entries if fields]
+
+        async with self.apply_lock:
+            if generation != self.generation:
+                return  # 읽는 사이 초기화됨
+            if pending:
+                async with get_distributed_connection() as conn:
+                    async with TimedTransaction(conn, WRITER_TRANSACTION):
+                        select_offset = await prepare_statement(conn, SELECT_OFFSET_SQL)
+                        offset = await select_offset.fetchrow(STREAM_KEY)
+                        last_id = (offset['last_ms'], offset['last_seq']) if offset else (0, 0)
+                        latest, journal = self._collect(pending, last_id)
+                        self.skipped += len(pending) - len(journal)
+                        updated = []
+                        if journal:
+                            update_balances = await prepare_statement(conn, UPDATE_BALANCES_SQL)
+                            updated = await update_balances.fetch(list(latest.keys()), list(latest.values()))
+                            await record_transfers(conn, journal)
+                            upsert_offset = await prepare_statement(conn, UPSERT_OFFSET_SQL)
+                            await upsert_offset.fetch(STREAM_KEY, *pending[-1][0])
+                distributed_cache.put_rows(updated)
+            await client.xack(STREAM_KEY, WRITER_GROUP, *ids)
+            await client.xdel(STREAM_KEY, *ids)
+        self.batches += 1
+        self.applied += len(ids)
+        self.last_batch_size = len(ids)
+
+    @staticmethod
+    def _collect(pending, last_id: Tuple[int, int]):
+        """last_id 이후 항목만 (계좌별 마지막 잔액, 저널 행)으로 모음"""
+        latest: Dict[str, int] = {}
+        journal = []
+        for entry_id, fields in pending:
+            if entry_id <= last_id:
+                continue  # 이미 반영된 항목 (XACK 전에 죽어서 다시 전달됨)
+            from_balance = int(fields["from_balance"])
+            to_balance = int(fields["to_balance"])
+            latest[fields["from"]] = from_balance
+            latest[fields["to"]] = to_balance
+            journal.append((fields["from"], fields["to"], int(fields["amount"]), from_balance, to_balance))
+        return latest, journal
+
+    async def flush(self, timeout: float = 30.0) -> bool:
+        """스트림이 전부 DB에 반영될 때까지 대기 (timeout 초과 시 False)"""
+        client = await get_redis_client()
+        deadline = time.monotonic() + timeout
+        while await client.xlen(STREAM_KEY) > 0:
+            if time.monotonic() >= deadline:
+                return False
+            await asyncio.sleep(0.05)
+        return True
+
+    async def stats(self) -> dict:
+        client = await get_redis_client()
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "consumer": self.consumer,
+            "batch_size": self.batch_size,
+            "batches": self.batches,
+            "applied": self.applied,
+            "last_batch_size": self.last_batch_size,
+            "errors": self.errors,
+            "skipped": self.skipped,
+            "backlog": await client.xlen(STREAM_KEY),
+        }
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+ledger_writer = LedgerWriter()
+
+
+class RedisLedgerTransferService:
+    def __init__(self):
+        self.initial_balance = 100000  # 계좌별 초기 잔액
+        # DB 초기화는 분산락 방식과 같은 distributed DB accounts 테이블을 사용
+        self.db_service = DistributedLockTransferService()
+        self._client = None
+        self._transfer = None
+
+    async def load_scripts(self):
+        """스크립트 등록 + SCRIPT LOAD로 미리 적재 (이후 EVALSHA로만 호출)"""
+        client = await get_redis_client()
+        if self._client is client:
+            return
+        self._transfer = client.register_script(TRANSFER_SCRIPT)
+        await client.script_load(TRANSFER_SCRIPT)
+        self._client = client
+
+    async def transfer(self, request: TransferRequest) -> TransferResponse:
+        """Redis 원장 이체 (Lua 스크립트 1회, 라운드트립 1회)"""
+        start_time = time.perf_counter()
+        try:
+            await self.load_scripts()
+            result = await self._transfer(
+                keys=[BALANCES_KEY, STREAM_KEY],
+                args=[request.from_account, request.to_account, request.amount]
+            )
+        except Exception as e:
+            return TransferResponse(
+                success=False,
+                message=f"이체 중 오류가 발생했습니다: {str(e)}",
+                execution_time=time.perf_counter() - start_time
+            )
+
+        if result[0] == -1:
+            return TransferResponse(
+                success=False,
+                message="계좌를 찾을 수 없습니다.",
+                execution_time=time.perf_counter() - start_time
+            )
+        if result[0] == 0:
+            return TransferResponse(
+                success=False,
+                message="잔액이 부족합니다.",
+                from_balance=result[1],
+                to_balance=result[2],
+                execution_time=time.perf_counter() - start_time
+            )
+        return TransferResponse(
+            success=True,
+            message="이체가 성공했습니다. (Redis 원장)",
+            from_balance=result[1],
+            to_balance=result[2],
+            execution_time=time.perf_counter() - start_time
+        )
+
+    async def initialize_accounts(self, account_count: int = 2, balance_distribution: str = "fixed",
+                                  seed: Optional[int] = None):
+        """계좌 초기화
+        1. 진행 중인 writer 배치를 막고 스트림/원장 삭제 (초기화 이전 이체는 버림)
+        2. distributed DB accounts 초기화 (분산락 방식과 동일)
+        3. DB 잔액을 Redis 원장으로 적재
+        """
+        client = await get_redis_client()
+        async with ledger_writer.apply_lock:
+            ledger_writer.generation += 1
+            await client.delete(STREAM_KEY, BALANCES_KEY)
+            await ledger_writer.ensure_group()
+            result = await self.db_service.initialize_accounts(account_count, balance_distribution, seed)
+
+            async with get_distributed_connection() as conn:
+                # 스트림을 새로 만들었으므로 반영 위치도 처음부터
+                await conn.execute("DELETE FROM ledger_writer_offsets WHERE stream = $1", STREAM_KEY)
+                rows = await conn.fetch("SELECT id, balance FROM accounts")
+            for start in range(0, len(rows), 10000):
+                chunk = rows[start:start + 10000]
+                await client.hset(BALANCES_KEY, mapping={row['id']: row['balance'] for row in chunk})
+        return result
+
+    async def get_balances(self, accounts: Optional[List[str]] = None):
+        """Redis 원장 잔액 조회"""
+        client = await get_redis_client()
+        accounts = accounts or ["account_a", "account_b"]
+        values = await client.hmget(BALANCES_KEY, accounts)
+        return {account: int(value) for account, value in zip(accounts, values) if value is not None}
+
+    async def list_balances(self, cursor: int = 0, limit: int = 100):
+        """Redis 원장 전체 잔액 목록 (HSCAN 커서 페이지, 순서 없음 - next_cursor 가 0이면 끝)"""
+        client = await get_redis_client()
+        cursor, page = await client.hscan(BALANCES_KEY, cursor=cursor, count=limit)
+        return {
+            "balances": {account: int(balance) for account, balance in page.items()},
+            "count": len(page),
+            "next_cursor": cursor
+        }
+
+    async def _scan_balances(self) -> Dict[str, int]:
+        client = await get_redis_client()
+        balances = {}
+        async for account, balance in client.hscan_iter(BALANCES_KEY, count=1000):
+            balances[account] = int(balance)
+        return balances
+
+    async def get_balance_summary(self):
+        """Redis 원장 잔액 요약 (계좌 수, 총 잔액, 최소 잔액) - 정합성 확인용"""
+        balances = await self._scan_balances()
+        return {
+            "account_count": len(balances),
+            "total_balance": sum(balances.values()),
+            "min_balance": min(balances.values(), default=0)
+        }
+
+    async def reconcile(self, timeout: float = 30.0, sample: int = 20) -> dict:
+        """Redis 원장과 distributed DB accounts 비교
+        writer가 스트림을 다 반영할 때까지 기다린 뒤 계좌별 잔액이 같은지 확인
+        """
+        drained = await ledger_writer.flush(timeout)
+        ledger = await self._scan_balances()
+        async with get_distributed_connection() as conn:
+            rows = await conn.fetch("SELECT id, balance FROM accounts")
+        database = {row['id']: row['balance'] for row in rows}
+
+        mismatches = []
+        for account in ledger.keys() | database.keys():
+            if ledger.get(account) != database.get(account):
+                mismatches.append({
+                    "account": account,
+                    "ledger": ledger.get(account),
+                    "database": database.get(account)
+                })
+        return {
+            "drained": drained,
+            "ledger_total": sum(ledger.values()),
+            "database_total": sum(database.values()),
+            "account_count": len(ledger),
+            "mismatch_count": len(mismatches),
+            "mismatches": mismatches[:sample],
+            "consistent": drained and not mismatches
+        }
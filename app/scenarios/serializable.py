@@ -0,0 +1,288 @@
+import asyncio
+import time
+from typing import Dict, List, Optional
+from asyncpg.exceptions import DeadlockDetectedError, SerializationError
+from ..models import TransferRequest, TransferResponse
+from ..seeding import seed_accounts, page_balances
+from .batching import UPDATE_BALANCES_SQL
+from ..database import get_serializable_connection, prepare_statement, TimedTransaction
+from ..retry import create_retry_policies
+from ..cache import serializable_cache
+from ..journal import record_transfer
+from ..metrics import transaction_seconds, serializable_attempts_total
+
+# 격리 수준 방식
+# 락/version 없이 평범한 읽기 -> 잔액 확인 -> 쓰기를 SERIALIZABLE(또는 REPEATABLE READ) 트랜잭션으로 실행
+# 동시 실행 결과가 어떤 직렬 순서와도 맞지 않으면 PostgreSQL이 한쪽을 40001(직렬화 실패)로 중단시킴
+# -> 재시도 정책(app/retry.py)의 지터 대기 후 트랜잭션 전체를 다시 실행 (시간 예산 + 시도 횟수 상한)
+# 40P01(데드락)도 같은 방식으로 재시도
+#
+# 격리 수준
+# serializable   : SSI (읽은 데이터에 대한 쓰기 의존성까지 검사)
+# repeatable_read: 스냅샷 격리 (같은 행을 동시에 갱신할 때만 40001)
+ISOLATION_LEVELS = ("serializable", "repeatable_read")
+SELECT_ACCOUNTS_SQL = "SELECT id, balance FROM accounts WHERE id IN ($1, $2)"
+SELECT_BALANCES_SQL = "SELECT id, balance, version FROM accounts WHERE id = ANY($1::varchar[])"
+
+# 메트릭 시계열 (핫패스에서 라벨 조회하지 않도록 미리 보관)
+TRANSACTION = transaction_seconds.labels("serializable")
+ATTEMPTS = {
+    isolation: {
+        result: serializable_attempts_total.labels(isolation, result)
+        for result in ("committed", "serialization_failure", "deadlock", "rejected", "error")
+    }
+    for isolation in ISOLATION_LEVELS
+}
+
+
+class IsolationStats:
+    """격리 수준별 시도/결과 집계 (직렬화 실패율 계산용)"""
+
+    def __init__(self):
+        self.attempts = 0
+        self.committed = 0
+        self.rejected = 0               # 잔액 부족 / 계좌 없음 (재시도 안 함)
+        self.serialization_failures = 0
+        self.deadlocks = 0
+        self.errors = 0
+        self.transfers = 0
+        self.exhausted = 0              # 재시도 한도 초과로 포기한 이체
+        self.retries_histogram: Dict[int, int] = {}  # 이체 1건당 재시도 횟수 -> 이체 건수
+
+    def record_transfer(self, retries: int, exhausted: bool):
+        self.transfers += 1
+        if exhausted:
+            self.exhausted += 1
+        self.retries_histogram[retries] = self.retries_histogram.get(retries, 0) + 1
+
+    def snapshot(self) -> dict:
+        return {
+            "attempts": self.attempts,
+            "committed": self.committed,
+            "rejected": self.rejected,
+            "serialization_failures": self.serialization_failures,
+            "deadlocks": self.deadlocks,
+            "errors": self.errors,
+            "transfers": self.transfers,
+            "exhausted": self.exhausted,
+            "retries_per_transfer": dict(sorted(self.retries_histogram.items())),
+        }
+
+
+def failure_rates(stats: dict) -> dict:
+    """집계(snapshot 또는 그 차이)로 실패율 계산
+    serialization_failure_rate: 시도 대비 40001 비율, exhausted_rate: 이체 대비 포기 비율
+    """
+    attempts = stats["attempts"]
+    return {
+        "serialization_failure_rate": round(stats["serialization_failures"] / attempts, 4) if attempts else 0,
+        "deadlock_rate": round(stats["deadlocks"] / attempts, 4) if attempts else 0,
+        "exhausted_rate": round(stats["exhausted"] / stats["transfers"], 4) if stats["transfers"] else 0,
+        "attempts_per_transfer": round(attempts / stats["transfers"], 3) if stats["transfers"] else 0,
+    }
+
+
+class SerializableTransferService:
+    def __init__(self):
+        self.initial_balances = {
+            "account_a": 100000,
+            "account_b": 100000
+        }
+        self.initial_balance = 100000  # 계좌별 초기 잔액
+        self.isolation = "serializable"  # 기본 격리 수준
+        self.retry_policy = "full_jitter"  # 기본 재시도 정책 (app/retry.py 참고)
+        self.max_attempts = 20  # 정책 시간 예산과 별개로 시도 횟수 상한
+        # 이 방식 전용 정책 인스턴스 (낙관적락의 대기시간 히스토그램/충돌률과 섞이지 않도록)
+        self.retry_policies = create_retry_policies()
+        self.stats = {isolation: IsolationStats() for isolation in ISOLATION_LEVELS}
+
+    async def transfer(
+        self,
+        request: TransferRequest,
+        isolation: Optional[str] = None,
+        retry_policy: Optional[str] = None
+    ) -> TransferResponse:
+        """격리 수준에 맡긴 계좌 이체 (직렬화 실패/데드락이면 지터 대기 후 재시도)"""
+        start_time = time.perf_counter()
+        isolation = isolation or self.isolation
+        stats = self.stats[isolation]
+        attempts = ATTEMPTS[isolation]
+        policy = self.retry_policies[retry_policy or self.retry_policy]
+        deadline = time.monotonic() + policy.budget
+        max_attempts = min(policy.max_attempts or self.max_attempts, self.max_attempts)
+
+        attempt = 0
+        retries = 0
+        delay = 0.0
+        last_error = None
+        while True:
+            attempt += 1
+            stats.attempts += 1
+            try:
+                result = await self._attempt_transfer(request, start_time, isolation, attempt)
+                if result.success:
+                    stats.committed += 1
+                    attempts["committed"].inc()
+                    # 커밋된 잔액/version으로 잔액 캐시 갱신
+                    serializable_cache.record_transfer(request, result)
+                else:
+                    stats.rejected += 1
+                    attempts["rejected"].inc()
+                policy.observe(request.from_account, False)
+                policy.record_transfer(retries, exhausted=False)
+                stats.record_transfer(retries, exhausted=False)
+                return result
+            except SerializationError as e:
+                stats.serialization_failures += 1
+                attempts["serialization_failure"].inc()
+                policy.observe(request.from_account, True)
+                last_error = e
+            except DeadlockDetectedError as e:
+                stats.deadlocks += 1
+                attempts["deadlock"].inc()
+                policy.observe(request.from_account, True)
+                last_error = e
+            except Exception as e:
+                # 재시도해도 같은 결과일 오류는 바로 실패
+                stats.errors += 1
+                attempts["error"].inc()
+                policy.record_transfer(retries, exhausted=False)
+                stats.record_transfer(retries, exhausted=False)
+                return TransferResponse(
+                    success=False,
+                    message=f"이체 중 오류가 발생했습니다: {str(e)}",
+                    execution_time=time.perf_counter() - start_time
+                )
+
+            if attempt >= max_attempts:
+                break
+            # 재시도 간격은 정책이 결정 (지터로 동시에 실패한 트랜잭션들이 같은 시점에 다시 부딪히지 않도록 분산)
+            delay = policy.next_delay(attempt, delay, request.from_account)
+            if time.monotonic() + delay > deadline:
+                break  # 시간 예산 초과
+            policy.record_delay(delay)
+            retries += 1
+            await asyncio.sleep(delay)
+
+        policy.record_transfer(retries, exhausted=True)
+        stats.record_transfer(retries, exhausted=True)
+        return TransferResponse(
+            success=False,
+            message=f"재시도 한도({attempt}회 시도, 예산 {policy.budget}초)를 초과했습니다. "
+                    f"직렬화 실패가 지속되고 있습니다. ({type(last_error).__name__})",
+            execution_time=time.perf_counter() - start_time
+        )
+
+    async def _attempt_transfer(self, request: TransferRequest, start_time: float, isolation: str,
+                                attempt: int) -> TransferResponse:
+        """단일 이체 시도 (락/version 확인 없음, 직렬화 실패는 예외로 전달 - 커밋 시점에 날 수도 있음)"""
+        async with get_serializable_connection() as conn:
+            async with TimedTransaction(conn, TRANSACTION, isolation=isolation):
+                ############################읽는부분 (락 없음)############################
+                select_accounts = await prepare_statement(conn, SELECT_ACCOUNTS_SQL)
+                rows = await select_accounts.fetch(request.from_account, request.to_account)
+                balances = {row['id']: row['balance'] for row in rows}
+
+                if request.from_account not in balances or request.to_account not in balances:
+                    return TransferResponse(
+                        success=False,
+                        message="계좌를 찾을 수 없습니다.",
+                        execution_time=time.perf_counter() - start_time
+                    )
+
+                # 잔액 확인
+                if balances[request.from_account] < request.amount:
+                    return TransferResponse(
+                        success=False,
+                        message="잔액이 부족합니다.",
+                        from_balance=balances[request.from_account],
+                        to_balance=balances[request.to_account],
+                        execution_time=time.perf_counter() - start_time
+                    )
+
+                ############################업데이트 부분############################
+                new_from_balance = balances[request.from_account] - request.amount
+                new_to_balance = balances[request.to_account] + request.amount
+
+                # 읽은 값으로 그대로 덮어씀 (동시 변경 감지는 격리 수준이 담당)
+                update_balances = await prepare_statement(conn, UPDATE_BALANCES_SQL)
+                updated = await update_balances.fetch(
+                    [request.from_account, request.to_account], [new_from_balance, new_to_balance]
+                )
+                versions = {row['id']: row['version'] for row in updated}
+
+                # 이체 저널 (같은 트랜잭션이라 직렬화 실패로 롤백되면 같이 취소)
+                await record_transfer(conn, request, new_from_balance, new_to_balance)
+
+            # 여기까지 오면 커밋 성공
+            return TransferResponse(
+                success=True,
+                message=f"이체가 성공했습니다. ({isolation}, 시도 {attempt}회차)",
+                from_balance=new_from_balance,
+                to_balance=new_to_balance,
+                from_version=versions.get(request.from_account),
+                to_version=versions.get(request.to_account),
+                execution_time=time.perf_counter() - start_time
+            )
+
+    def get_stats(self) -> dict:
+        """격리 수준별 시도/직렬화 실패 집계와 실패율, 재시도 정책별 대기시간 분포"""
+        return {
+            **{
+                isolation: {**stats.snapshot(), **failure_rates(stats.snapshot())}
+                for isolation, stats in self.stats.items()
+            },
+            "retry_policies": {name: policy.stats() for name, policy in self.retry_policies.items()}
+        }
+
+    async def initialize_accounts(self, account_count: int = 2, balance_distribution: str = "fixed",
+                                  seed: Optional[int] = None):
+        """테스트를 위한 계좌 초기화 함수
+        1. 기존 계좌/이체 저널 전체 비우기 (TRUNCATE)
+        2. 새로운 계좌 생성 & 초기화 값 입력
+        account_a: 100000, account_b: 100000
+        account_count가 2보다 크면 account_000000 ~ 형식으로 계좌 생성
+        balance_distribution 으로 계좌별 잔액 분포 선택 (총 잔액은 계좌 수 x 100000 으로 동일)
+        """
+        async with get_serializable_connection() as conn:
+            result = await seed_accounts(conn, account_count, self.initial_balance, balance_distribution, seed)
+        # version이 0부터 다시 시작하므로 캐시도 비움
+        serializable_cache.clear()
+        return result
+
+    async def get_balances(self, use_cache: bool = True, accounts: Optional[List[str]] = None):
+        """현재 잔액 조회 (기본은 잔액 캐시 경유, use_cache=False 면 DB 직접 조회)
+        accounts 를 주면 해당 계좌들, 없으면 account_a / account_b
+        """
+        accounts = accounts or ["account_a", "account_b"]
+        if use_cache:
+            cached = await serializable_cache.get_many(accounts, self._fetch_balances)
+            return {account: balance for account, (balance, _) in cached.items()}
+
+        rows = await self._fetch_balances(accounts)
+
+        balances = {}
+        for row in rows:
+            balances[row['id']] = row['balance']
+
+        return balances
+
+    @staticmethod
+    async def _fetch_balances(accounts):
+        async with get_serializable_connection() as conn:
+            select_balances = await prepare_statement(conn, SELECT_BALANCES_SQL)
+            return await select_balances.fetch(accounts)
+
+    async def list_balances(self, after: str = "", limit: int = 100):
+        """전체 계좌 잔액 목록 (계좌 id 순 키셋 페이지네이션, 캐시 거치지 않음)"""
+        async with get_serializable_connection() as conn:
+            return await page_balances(conn, after, limit)
+
+    async def get_balance_summary(self):
+        """전체 계좌 잔액 요약 (계좌 수, 총 잔액, 최소 잔액) - 정합성 확인용"""
+        async with get_serializable_connection() as conn:
+            row = await conn.fetchrow(
+                "SELECT COUNT(*) AS account_count, COALESCE(SUM(balance), 0) AS total_balance, "
+                "COALESCE(MIN(balance), 0) AS min_balance FROM accounts"
+            )
+            return dict(row)
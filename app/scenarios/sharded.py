@@ -0,0 +1,384 @@
+import asyncio
+import os
+import time
+import uuid
+from contextlib import AsyncExitStack
+from typing import Dict, List, Optional
+from ..models import TransferRequest, TransferResponse
+from ..workload import account_ids
+from ..seeding import seed_balances
+from ..database import prepare_statement, TimedTransaction
+from ..sharding import shard_router
+from ..journal import record_transfer
+from ..metrics import transaction_seconds
+from .batching import SELECT_ACCOUNTS_FOR_UPDATE_SQL, UPDATE_BALANCES_SQL
+
+# 샤딩 방식
+# 계좌는 일관된 해시로 여러 PostgreSQL DB(샤드)에 나뉘어 있음
+# - 두 계좌가 같은 샤드: 그 샤드에서 일반 트랜잭션 1개 (비관적락과 같은 FOR UPDATE)
+# - 다른 샤드: 2단계 커밋 (샤드마다 BEGIN -> FOR UPDATE -> UPDATE -> PREPARE TRANSACTION, 전부 성공하면 COMMIT PREPARED)
+#   첫 번째 참여 샤드(coordinator)의 트랜잭션에 shard_commits 행을 넣고 가장 먼저 커밋 -> 이 행이 커밋 결정 기록
+#   중간에 죽어서 남은 PREPARE 트랜잭션은 recover()가 이 기록을 보고 커밋/롤백
+#   (PREPARE 트랜잭션은 행 락을 계속 잡고 있으므로 백그라운드 작업이 SHARD_RECOVERY_INTERVAL 마다 자동 실행)
+
+SELECT_BALANCES_SQL = "SELECT id, balance, version FROM accounts WHERE id = ANY($1::varchar[])"
+INSERT_COMMIT_SQL = "INSERT INTO shard_commits (gid) VALUES ($1)"
+SELECT_COMMIT_SQL = "SELECT 1 FROM shard_commits WHERE gid = $1"
+PREPARED_XACTS_SQL = """
+    SELECT gid FROM pg_prepared_xacts
+    WHERE database = current_database()
+      AND gid LIKE 'xfer\\_%'
+      AND prepared < now() - make_interval(secs => $1)
+"""
+GID_PREFIX = "xfer_"
+
+# 메트릭 시계열
+TRANSACTION = transaction_seconds.labels("sharded")
+
+
+def make_gid(coordinator: int) -> str:
+    """2단계 커밋 트랜잭션 id (커밋 결정 기록이 있는 coordinator 샤드 번호 포함)"""
+    return f"{GID_PREFIX}{coordinator}_{uuid.uuid4().hex}"
+
+
+def gid_coordinator(gid: str) -> int:
+    return int(gid[len(GID_PREFIX):].split("_", 1)[0])
+
+
+class ShardedTransferService:
+    def __init__(self):
+        self.initial_balance = 100000  # 계좌별 초기 잔액
+        self.router = shard_router
+        self.counters = {
+            "local": 0,          # 같은 샤드 이체
+            "cross_shard": 0,    # 2단계 커밋 이체
+            "aborted": 0,        # PREPARE 전/중 실패로 롤백
+            "in_doubt": 0,       # coordinator 커밋 실패 (recover 대상)
+            "participant_commit_failures": 0,  # 커밋 결정 후 나머지 샤드 COMMIT PREPARED 실패 (recover 대상)
+            "recovered_commits": 0,
+            "recovered_rollbacks": 0,
+            "recovery_errors": 0,  # 자동 복구 실행 중 샤드 오류
+        }
+        # 남은 PREPARE 트랜잭션 자동 복구 간격 (초, 0이면 사용 안 함) / 복구 대상 최소 경과 시간 (초)
+        self.recovery_interval = float(os.getenv("SHARD_RECOVERY_INTERVAL", "30"))
+        self.recovery_min_age = float(os.getenv("SHARD_RECOVERY_MIN_AGE", "30"))
+        self.last_recovery: Optional[dict] = None
+        self._recovery: Optional[asyncio.Task] = None
+
+    async def transfer(self, request: TransferRequest) -> TransferResponse:
+        """샤드 이체 (같은 샤드면 로컬 트랜잭션, 다르면 2단계 커밋)"""
+        start_time = time.perf_counter()
+        from_shard = self.router.shard_for(request.from_account)
+        to_shard = self.router.shard_for(request.to_account)
+        try:
+            if from_shard == to_shard:
+                self.counters["local"] += 1
+                return await self._transfer_local(request, from_shard, start_time)
+            self.counters["cross_shard"] += 1
+            return await self._transfer_two_phase(request, from_shard, to_shard, start_time)
+        except Exception as e:
+            return TransferResponse(
+                success=False,
+                message=f"이체 중 오류가 발생했습니다: {str(e)}",
+                execution_time=time.perf_counter() - start_time
+            )
+
+    async def _transfer_local(self, request: TransferRequest, shard: int, start_time: float) -> TransferResponse:
+        async with self.router.shards[shard].get_connection() as conn:
+            async with TimedTransaction(conn, TRANSACTION):
+                # 두 계좌를 id 순서로 한 문장에 잠금
+                select_for_update = await prepare_statement(conn, SELECT_ACCOUNTS_FOR_UPDATE_SQL)
+                rows = await select_for_update.fetch([request.from_account, request.to_account])
+                balances = {row['id']: row['balance'] for row in rows}
+
+                rejected = self._check(request, balances, start_time)
+                if rejected:
+                    return rejected
+
+                new_from_balance = balances[request.from_account] - request.amount
+                new_to_balance = balances[request.to_account] + request.amount
+                update_balances = await prepare_statement(conn, UPDATE_BALANCES_SQL)
+                updated = await update_balances.fetch(
+                    [request.from_account, request.to_account], [new_from_balance, new_to_balance]
+                )
+                await record_transfer(conn, request, new_from_balance, new_to_balance)
+
+        versions = {row['id']: row['version'] for row in updated}
+        return TransferResponse(
+            success=True,
+            message=f"이체가 성공했습니다. (샤드 {shard} 로컬 트랜잭션)",
+            from_balance=new_from_balance,
+            to_balance=new_to_balance,
+            from_version=versions.get(request.from_account),
+            to_version=versions.get(request.to_account),
+            execution_time=time.perf_counter() - start_time
+        )
+
+    async def _transfer_two_phase(self, request: TransferRequest, from_shard: int, to_shard: int,
+                                  start_time: float) -> TransferResponse:
+        # 샤드 번호 순서로 커넥션 획득 / 락 / PREPARE / COMMIT (교차 이체끼리 락 순서 고정)
+        participants = sorted([from_shard, to_shard])
+        coordinator = participants[0]
+        account_of = {from_shard: request.from_account, to_shard: request.to_account}
+        gid = make_gid(coordinator)
+
+        async with AsyncExitStack() as stack:
+            conns = {}
+            for shard in participants:
+                conns[shard] = await stack.enter_async_context(self.router.shards[shard].get_connection())
+
+            tx_started = time.perf_counter()
+            begun: List[int] = []
+            prepared: List[int] = []
+            try:
+                ############################1단계: 잠금 + 반영 + PREPARE############################
+                balances: Dict[str, int] = {}
+                for shard in participants:
+                    await conns[shard].execute("BEGIN")
+                    begun.append(shard)
+                    select_for_update = await prepare_statement(conns[shard], SELECT_ACCOUNTS_FOR_UPDATE_SQL)
+                    for row in await select_for_update.fetch([account_of[shard]]):
+                        balances[row['id']] = row['balance']
+
+                rejected = self._check(request, balances, start_time)
+                if rejected:
+                    await self._abort(conns, begun, prepared, gid)
+                    return rejected
+
+                new_balances = {
+                    request.from_account: balances[request.from_account] - request.amount,
+                    request.to_account: balances[request.to_account] + request.amount,
+                }
+                versions = {}
+                for shard in participants:
+                    conn = conns[shard]
+                    update_balances = await prepare_statement(conn, UPDATE_BALANCES_SQL)
+                    for row in await update_balances.fetch([account_of[shard]], [new_balances[account_of[shard]]]):
+                        versions[row['id']] = row['version']
+                    # 저널은 양쪽 샤드에 같은 행을 기록 (각 샤드가 자기 계좌의 처리 후 잔액을 가짐)
+                    await record_transfer(
+                        conn, request, new_balances[request.from_account], new_balances[request.to_account]
+                    )
+                    if shard == coordinator:
+                        insert_commit = await prepare_statement(conn, INSERT_COMMIT_SQL)
+                        await insert_commit.fetch(gid)
+
+                for shard in participants:
+                    await conns[shard].execute(f"PREPARE TRANSACTION '{gid}'")
+                    begun.remove(shard)
+                    prepared.append(shard)
+            except Exception:
+                self.counters["aborted"] += 1
+                await self._abort(conns, begun, prepared, gid)
+                raise
+
+            ############################2단계: COMMIT PREPARED (coordinator 먼저)############################
+            try:
+                await conns[coordinator].execute(f"COMMIT PREPARED '{gid}'")
+            except Exception as e:
+                # 커밋 결정이 기록됐는지 알 수 없음 -> recover()가 정리
+                self.counters["in_doubt"] += 1
+                return TransferResponse(
+                    success=False,
+                    message=f"이체 결과 미확정 (2단계 커밋 {gid}, 복구 대기): {str(e)}",
+                    execution_time=time.perf_counter() - start_time
+                )
+            for shard in participants[1:]:
+                try:
+                    await conns[shard].execute(f"COMMIT PREPARED '{gid}'")
+                except Exception as e:
+                    # 커밋 결정은 이미 기록됨 -> 이체는 성공, 자동 복구(recover)가 마저 커밋
+                    self.counters["participant_commit_failures"] += 1
+                    print(f"COMMIT PREPARED 실패 (샤드 {shard}, {gid}): {e}")
+            TRANSACTION.since(tx_started)
+
+        return TransferResponse(
+            success=True,
+            message=f"이체가 성공했습니다. (샤드 {from_shard} -> {to_shard} 2단계 커밋)",
+            from_balance=new_balances[request.from_account],
+            to_balance=new_balances[request.to_account],
+            from_version=versions.get(request.from_account),
+            to_version=versions.get(request.to_account),
+            execution_time=time.perf_counter() - start_time
+        )
+
+    @staticmethod
+    def _check(request: TransferRequest, balances: Dict[str, int], start_time: float) -> Optional[TransferResponse]:
+        """계좌 존재 / 잔액 확인 (통과하면 None)"""
+        if request.from_account not in balances or request.to_account not in balances:
+            return TransferResponse(
+                success=False,
+                message="계좌를 찾을 수 없습니다.",
+                execution_time=time.perf_counter() - start_time
+            )
+        if balances[request.from_account] < request.amount:
+            return TransferResponse(
+                success=False,
+                message="잔액이 부족합니다.",
+                from_balance=balances[request.from_account],
+                to_balance=balances[request.to_account],
+                execution_time=time.perf_counter() - start_time
+            )
+        return None
+
+    @staticmethod
+    async def _abort(conns, begun: List[int], prepared: List[int], gid: str):
+        """진행 중인 트랜잭션은 ROLLBACK, 이미 PREPARE 된 샤드는 ROLLBACK PREPARED"""
+        for shard in begun:
+            try:
+                await conns[shard].execute("ROLLBACK")
+            except Exception as e:
+                print(f"ROLLBACK 실패 (샤드 {shard}): {e}")
+        for shard in prepared:
+            try:
+                await conns[shard].execute(f"ROLLBACK PREPARED '{gid}'")
+            except Exception as e:
+                print(f"ROLLBACK PREPARED 실패 (샤드 {shard}, {gid}): {e}")
+
+    async def recover(self, min_age: float = 30.0) -> dict:
+        """min_age초 넘게 남아 있는 PREPARE 트랜잭션 정리
+        coordinator 샤드에 아직 PREPARE 상태로 남아 있거나 커밋 기록이 없으면 롤백, 기록이 있으면 커밋
+        연결되지 않는 샤드가 있으면 그 샤드가 coordinator 인 트랜잭션은 결정할 수 없으므로 다음 실행으로 미룸
+        """
+        pending: Dict[int, List[str]] = {}
+        errors = []
+        for index, shard in enumerate(self.router.shards):
+            try:
+                async with shard.get_connection() as conn:
+                    pending[index] = [row['gid'] for row in await conn.fetch(PREPARED_XACTS_SQL, min_age)]
+            except Exception as e:
+                errors.append({"shard": index, "error": f"{type(e).__name__}: {e}"})
+
+        resolved = []
+        for index, gids in pending.items():
+            for gid in gids:
+                coordinator = gid_coordinator(gid)
+                if coordinator != index and coordinator not in pending:
+                    continue  # coordinator 상태를 모름
+                try:
+                    if coordinator == index or gid in pending[coordinator]:
+                        commit = False  # coordinator가 커밋하기 전에 멈춤 -> 아무도 커밋하지 않았음
+                    else:
+                        async with self.router.shards[coordinator].get_connection() as conn:
+                            commit = await conn.fetchval(SELECT_COMMIT_SQL, gid) is not None
+                    async with self.router.shards[index].get_connection() as conn:
+                        await conn.execute(f"{'COMMIT' if commit else 'ROLLBACK'} PREPARED '{gid}'")
+                except Exception as e:
+                    errors.append({"shard": index, "gid": gid, "error": f"{type(e).__name__}: {e}"})
+                    continue
+                self.counters["recovered_commits" if commit else "recovered_rollbacks"] += 1
+                resolved.append({"shard": index, "gid": gid, "action": "commit" if commit else "rollback"})
+        self.counters["recovery_errors"] += len(errors)
+        return {"resolved_count": len(resolved), "resolved": resolved, "errors": errors}
+
+    async def _run_recovery(self):
+        """recovery_interval 마다 recover() (시작 직후 1회 포함)"""
+        while True:
+            try:
+                result = await self.recover(self.recovery_min_age)
+                self.last_recovery = {"at": time.time(), **result}
+                if result["resolved_count"]:
+                    print(f"2단계 커밋 자동 복구: {result['resolved']}")
+            except Exception as e:
+                self.counters["recovery_errors"] += 1
+                print(f"2단계 커밋 자동 복구 실패: {e}")
+            await asyncio.sleep(self.recovery_interval)
+
+    def start_recovery(self):
+        if self.recovery_interval > 0 and self._recovery is None:
+            self._recovery = asyncio.create_task(self._run_recovery())
+
+    async def stop_recovery(self):
+        if self._recovery is not None:
+            self._recovery.cancel()
+            try:
+                await self._recovery
+            except asyncio.CancelledError:
+                pass
+            self._recovery = None
+
+    async def initialize_accounts(self, account_count: int = 2, balance_distribution: str = "fixed",
+                                  seed: Optional[int] = None):
+        """계좌 초기화: 계좌를 샤드별로 나눠서 각 샤드에 COPY (샤드끼리는 동시에)
+        남아 있는 2단계 커밋 트랜잭션은 락을 잡고 있으므로 먼저 롤백
+        """
+        ids = account_ids(account_count)
+        balances = seed_balances(account_count, self.initial_balance, balance_distribution, seed)
+        groups: Dict[int, List[int]] = {index: [] for index in range(len(self.router.shards))}
+        for position, account in enumerate(ids):
+            groups[self.router.shard_for(account)].append(position)
+
+        async def load(index: int, positions: List[int]):
+            async with self.router.shards[index].get_connection() as conn:
+                for row in await conn.fetch(PREPARED_XACTS_SQL, 0):
+                    await conn.execute(f"ROLLBACK PREPARED '{row['gid']}'")
+                async with conn.transaction():
+                    await conn.execute("TRUNCATE accounts, transfers, shard_commits")
+                    if positions:
+                        await conn.copy_records_to_table(
+                            "accounts",
+                            records=[(ids[position], balances[position]) for position in positions],
+                            columns=["id", "balance"]
+                        )
+
+        await asyncio.gather(*(load(index, positions) for index, positions in groups.items()))
+
+        if account_count == 2:
+            return dict(zip(ids, balances))
+        return {
+            "account_count": account_count,
+            "initial_balance": self.initial_balance,
+            "total_balance": account_count * self.initial_balance,
+            "balance_distribution": balance_distribution,
+            "shard_accounts": {f"shard_{index}": len(positions) for index, positions in groups.items()}
+        }
+
+    async def get_balances(self, accounts: Optional[List[str]] = None):
+        """현재 잔액 조회 (샤드별로 묶어서 동시에)"""
+        accounts = accounts or ["account_a", "account_b"]
+
+        async def fetch(index: int, shard_accounts: List[str]):
+            async with self.router.shards[index].get_connection() as conn:
+                select_balances = await prepare_statement(conn, SELECT_BALANCES_SQL)
+                return await select_balances.fetch(shard_accounts)
+
+        results = await asyncio.gather(*(
+            fetch(index, shard_accounts) for index, shard_accounts in self.router.group(accounts).items()
+        ))
+        return {row['id']: row['balance'] for rows in results for row in rows}
+
+    async def _shard_summaries(self) -> List[dict]:
+        async def summary(shard):
+            async with shard.get_connection() as conn:
+                row = await conn.fetchrow(
+                    "SELECT COUNT(*) AS account_count, COALESCE(SUM(balance), 0) AS total_balance, "
+                    "COALESCE(MIN(balance), 0) AS min_balance FROM accounts"
+                )
+                return dict(row)
+
+        return await asyncio.gather(*(summary(shard) for shard in self.router.shards))
+
+    async def get_balance_summary(self):
+        """전체 샤드 잔액 요약 (계좌 수, 총 잔액, 최소 잔액) - 정합성 확인용"""
+        summaries = await self._shard_summaries()
+        return {
+            "account_count": sum(summary["account_count"] for summary in summaries),
+            "total_balance": sum(summary["total_balance"] for summary in summaries),
+            "min_balance": min((summary["min_balance"] for summary in summaries if summary["account_count"]), default=0)
+        }
+
+    async def shard_info(self) -> dict:
+        """샤드별 계좌 수/총 잔액 + 이체 종류별 건수"""
+        summaries = await self._shard_summaries()
+        return {
+            "shards": {shard.name: summary for shard, summary in zip(self.router.shards, summaries)},
+            "default_accounts": {
+                account: f"shard_{self.router.shard_for(account)}" for account in ("account_a", "account_b")
+            },
+            "counters": dict(self.counters),
+            "recovery": {
+                "interval": self.recovery_interval,
+                "min_age": self.recovery_min_age,
+                "last": self.last_recovery
+            }
+        }
@@ -0,0 +1,116 @@
+import random
+from typing import Dict, List, Optional
+from .workload import account_ids
+
+# 계좌 초기화 (수백만 계좌 적재) + 계좌 목록 페이지 조회
+# - 기존 데이터는 DELETE 대신 TRUNCATE (행 단위 삭제/WAL 없이 테이블 파일 교체)
+# - fixed 분포는 generate_series로 DB 안에서 생성 (클라이언트 -> DB 전송 없음)
+# - 그 외 분포는 클라이언트에서 잔액을 만들어 COPY (copy_records_to_table) 로 청크 단위 적재
+# - 어떤 분포든 총 잔액은 계좌 수 x 평균 잔액으로 맞춤 (스트레스 테스트 정합성 확인 기준 유지)
+
+# 계좌 잔액 분포
+# fixed  : 모든 계좌가 같은 잔액 (기존 동작)
+# uniform: 0 ~ 평균의 2배 사이 균등 분포
+# pareto : 파레토 분포 (소수 계좌에 잔액이 몰림, 잔액 부족 실패가 현실적으로 섞임)
+BALANCE_DISTRIBUTIONS = ["fixed", "uniform", "pareto"]
+# 계좌 1개 초기 잔액 상한 (accounts.balance 는 INTEGER, 입금 받을 여유를 남기려고 최댓값의 절반)
+MAX_SEED_BALANCE = (2 ** 31 - 1) // 2
+
+# account_ids()와 같은 형식 (account_000000 ~, 백만 개 이상이면 자릿수 증가)
+GENERATE_ACCOUNTS_SQL = """
+    INSERT INTO accounts (id, balance)
+    SELECT 'account_' || lpad(i::text, greatest(6, length(i::text)), '0'), $2
+    FROM generate_series(0, $1 - 1) AS i
+"""
+PAGE_BALANCES_SQL = """
+    SELECT id, balance, version FROM accounts
+    WHERE id > $1
+    ORDER BY id
+    LIMIT $2
+"""
+
+
+def seed_balances(count: int, mean: int, distribution: str = "fixed", seed: Optional[int] = None) -> List[int]:
+    """계좌별 초기 잔액 (합계는 항상 count * mean)"""
+    if distribution not in BALANCE_DISTRIBUTIONS:
+        raise ValueError(f"알 수 없는 잔액 분포: {distribution}")
+    if distribution == "fixed":
+        return [mean] * count
+
+    rng = random.Random(seed)
+    if distribution == "uniform":
+        weights = [rng.random() for _ in range(count)]
+    else:
+        weights = [rng.paretovariate(1.16) for _ in range(count)]  # 80/20 법칙에 해당하는 지수
+
+    total = count * mean
+    cap = max(mean, MAX_SEED_BALANCE)
+    # 상한을 넘는 계좌는 상한으로 고정하고, 남은 잔액을 나머지 계좌에 가중치 비율로 다시 나눔
+    # (고정된 만큼 나머지 배율이 커지므로 새로 넘는 계좌가 없을 때까지 반복)
+    capped = set()
+    remaining = total
+    free_weight = sum(weights)
+    while True:
+        scale = remaining / free_weight
+        threshold = cap / scale
+        over = [i for i, weight in enumerate(weights) if weight > threshold and i not in capped]
+        if not over:
+            break
+        for i in over:
+            capped.add(i)
+            remaining -= cap
+            free_weight -= weights[i]
+    balances = [cap if i in capped else int(weight * scale) for i, weight in enumerate(weights)]
+
+    # 버림으로 생긴 차이(계좌 수 미만)는 상한에 여유가 있는 앞쪽 계좌부터
+    remainder = total - sum(balances)
+    for i in range(count):
+        if remainder <= 0:
+            break
+        added = min(remainder, cap - balances[i])
+        balances[i] += added
+        remainder -= added
+    return balances
+
+
+async def seed_accounts(conn, account_count: int, initial_balance: int, distribution: str = "fixed",
+                        seed: Optional[int] = None, chunk_size: int = 100_000) -> dict:
+    """accounts / transfers 를 비우고 account_count 개 계좌 적재 (트랜잭션 1개)
+    계좌가 2개면 account_a / account_b 잔액을, 그 이상이면 요약을 반환
+    """
+    async with conn.transaction():
+        await conn.execute("TRUNCATE accounts, transfers")
+
+        if distribution == "fixed" and account_count != 2:
+            await conn.execute(GENERATE_ACCOUNTS_SQL, account_count, initial_balance)
+        else:
+            ids = account_ids(account_count)
+            balances = seed_balances(account_count, initial_balance, distribution, seed)
+            for start in range(0, account_count, chunk_size):
+                await conn.copy_records_to_table(
+                    "accounts",
+                    records=zip(ids[start:start + chunk_size], balances[start:start + chunk_size]),
+                    columns=["id", "balance"]
+                )
+            if account_count == 2:
+                return dict(zip(ids, balances))
+
+    return {
+        "account_count": account_count,
+        "initial_balance": initial_balance,
+        "total_balance": account_count * initial_balance,
+        "balance_distribution": distribution
+    }
+
+
+async def page_balances(conn, after: str = "", limit: int = 100) -> dict:
+    """계좌 id 순 잔액 목록 (키셋 페이지네이션: 다음 페이지는 next_after 이후부터)"""
+    rows = await conn.fetch(PAGE_BALANCES_SQL, after, limit)
+    balances: Dict[str, dict] = {
+        row['id']: {"balance": row['balance'], "version": row['version']} for row in rows
+    }
+    return {
+        "balances": balances,
+        "count": len(rows),
+        "next_after": rows[-1]['id'] if len(rows) == limit else None
+    }
@@ -0,0 +1,194 @@
+import asyncio
+import json
+import time
+from typing import AsyncIterator, Awaitable, Callable, Dict, Tuple
+
+from .models import StressTestParams, TransferRequest, TransferResponse
+from .workload import OUTCOMES, AccountSampler, account_ids, classify
+
+# 지연시간 히스토그램 버킷 상한 (ms), 마지막 버킷은 그 이상 전부
+LATENCY_BUCKETS_MS = [0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000]
+
+
+class StressStats:
+    """스트레스 테스트 집계 (요청 수와 상관없이 메모리 일정)
+    결과 목록 대신 결과별 카운터 + 지연시간 히스토그램만 유지
+    """
+
+    def __init__(self):
+        self.outcomes: Dict[str, int] = {outcome: 0 for outcome in OUTCOMES}
+        self.latency_histogram = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.count = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+
+    def record(self, result: TransferResponse, latency: float):
+        self.count += 1
+        self.outcomes[classify(result.success, result.message)] += 1
+        self.total_latency += latency
+        if latency > self.max_latency:
+            self.max_latency = latency
+        latency_ms = latency * 1000
+        for i, bound in enumerate(LATENCY_BUCKETS_MS):
+            if latency_ms <= bound:
+                self.latency_histogram[i] += 1
+                return
+        self.latency_histogram[-1] += 1
+
+    def percentile(self, p: float) -> float:
+        """히스토그램 버킷 상한 기준 근사 백분위수 (ms)"""
+        target = self.count * p / 100
+        seen = 0
+        for i, bucket_count in enumerate(self.latency_histogram):
+            seen += bucket_count
+            if seen >= target and bucket_count:
+                return LATENCY_BUCKETS_MS[i] if i < len(LATENCY_BUCKETS_MS) else self.max_latency * 1000
+        return self.max_latency * 1000
+
+    @property
+    def success_count(self) -> int:
+        return self.outcomes["success"]
+
+    def summary(self, total_time: float) -> dict:
+        labels = [f"<={bound}ms" for bound in LATENCY_BUCKETS_MS] + [f">{LATENCY_BUCKETS_MS[-1]}ms"]
+        return {
+            "total_requests": self.count,
+            "success_count": self.success_count,
+            "failed_count": self.count - self.success_count,
+            "outcomes": self.outcomes,
+            "total_execution_time": total_time,
+            "throughput": self.count / total_time if total_time > 0 else 0,
+            "latency_ms": {
+                "mean": self.total_latency / self.count * 1000 if self.count else 0,
+                "p50": self.percentile(50),
+                "p95": self.percentile(95),
+                "p99": self.percentile(99),
+                "max": self.max_latency * 1000,
+                "histogram": dict(zip(labels, self.latency_histogram)),
+            },
+        }
+
+
+def build_sampler(params: StressTestParams) -> AccountSampler:
+    return AccountSampler(account_ids(params.accounts), params.distribution, params.skew)
+
+
+async def iter_stress(
+    transfer: Callable[[TransferRequest], Awaitable[TransferResponse]],
+    params: StressTestParams
+) -> AsyncIterator[Tuple[int, TransferRequest, TransferResponse, float]]:
+    """params.requests 건의 이체를 최대 params.concurrency 개씩 동시에 실행하고
+    끝나는 순서대로 (번호, 요청, 결과, 지연시간) 을 내보냄
+    세마포어로 동시 실행 수를 제한하고, 태스크는 슬롯이 빌 때마다 만들어서 메모리 일정 유지
+    슬롯은 이체가 끝날 때가 아니라 소비자가 결과를 꺼내갈 때 반납
+    -> 스트림을 느리게 읽는 클라이언트면 새 이체 생성도 같이 느려짐 (실행 중 + 대기 결과 <= concurrency)
+    """
+    sampler = build_sampler(params)
+    semaphore = asyncio.Semaphore(params.concurrency)
+    completed: asyncio.Queue = asyncio.Queue(maxsize=params.concurrency)
+    pending = set()
+
+    async def run_one(index: int, request: TransferRequest):
+        started = time.perf_counter()
+        try:
+            result = await transfer(request)
+        except Exception as e:
+            result = TransferResponse(success=False, message=f"이체 중 오류가 발생했습니다: {str(e)}")
+        await completed.put((index, request, result, time.perf_counter() - started))
+
+    def on_done(task: asyncio.Task):
+        pending.discard(task)
+
+    async def produce():
+        for index in range(params.requests):
+            await semaphore.acquire()
+            from_account, to_account = sampler.pair()
+            task = asyncio.create_task(run_one(index, TransferRequest(
+                from_account=from_account,
+                to_account=to_account,
+                amount=params.amount
+            )))
+            pending.add(task)
+            task.add_done_callback(on_done)
+
+    producer = asyncio.create_task(produce())
+    try:
+        for _ in range(params.requests):
+            item = await completed.get()
+            semaphore.release()
+            yield item
+    finally:
+        # 클라이언트가 스트림을 끊으면 남은 작업 정리
+        producer.cancel()
+        for task in list(pending):
+            task.cancel()
+
+
+async def run_stress(
+    transfer: Callable[[TransferRequest], Awaitable[TransferResponse]],
+    params: StressTestParams
+) -> StressStats:
+    """스트레스 테스트 실행 후 집계만 반환"""
+    stats = StressStats()
+    async for _, _, result, latency in iter_stress(transfer, params):
+        stats.record(result, latency)
+    return stats
+
+
+async def stream_stress(
+    transfer: Callable[[TransferRequest], Awaitable[TransferResponse]],
+    params: StressTestParams,
+    build_report: Callable[[StressStats, float], Awaitable[dict]]
+) -> AsyncIterator[str]:
+    """스트레스 테스트를 NDJSON으로 스트리밍
+    이체가 끝날 때마다 한 줄, 마지막에 전체 요약 한 줄 ({"summary": ...})
+    """
+    stats = StressStats()
+    start_time = time.perf_counter()
+    async for index, request, result, latency in iter_stress(transfer, params):
+        stats.record(result, latency)
+        yield json.dumps({
+            "index": index,
+            "from_account": request.from_account,
+            "to_account": request.to_account,
+            "outcome": classify(result.success, result.message),
+            "success": result.success,
+            "message": result.message,
+            "from_balance": result.from_balance,
+            "to_balance": result.to_balance,
+            "latency_ms": latency * 1000
+        }, ensure_ascii=False) + "\n"
+    report = await build_report(stats, time.perf_counter() - start_time)
+    yield json.dumps({"summary": report}, ensure_ascii=False, default=str) + "\n"
+
+
+def expected_fixed_balances(params: StressTestParams, success_count: int, initial_balance: int) -> Dict[str, int]:
+    """fixed 분포(첫 번째 -> 두 번째 계좌)일 때 성공 건수로 계산한 기대 잔액"""
+    from_account, to_account = account_ids(params.accounts)[:2]
+    return {
+        from_account: initial_balance - success_count * params.amount,
+        to_account: initial_balance + success_count * params.amount,
+    }
+
+
+def consistency_report(summary: dict, params: StressTestParams, initial_balance: int) -> dict:
+    """총 잔액 보존 + 마이너스 잔액 없음 확인"""
+    expected_total = params.accounts * initial_balance
+    return {
+        "account_count": summary["account_count"],
+        "total_balance": summary["total_balance"],
+        "expected_total_balance": expected_total,
+        "min_balance": summary["min_balance"],
+        "consistent": summary["total_balance"] == expected_total and summary["min_balance"] >= 0,
+    }
+
+
+def stress_report(stats: StressStats, total_time: float, params: StressTestParams,
+                  balance_summary: dict, initial_balance: int) -> dict:
+    """스트레스 테스트 공통 응답 (파라미터 + 집계 + 정합성)"""
+    report = {"params": params.model_dump()}
+    report.update(stats.summary(total_time))
+    report["consistency"] = consistency_report(balance_summary, params, initial_balance)
+    if params.distribution == "fixed" and params.balance_distribution == "fixed":
+        report["expected_balances"] = expected_fixed_balances(params, stats.success_count, initial_balance)
+    return report
@@ -0,0 +1,160 @@
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
+import time
+from typing import List, Literal, Optional
+from ..models import TransferRequest, TransferResponse, StressTestParams, BalanceDistribution
+from ..stress import run_stress, stream_stress, stress_report
+from ..scenarios.advisory import AdvisoryLockTransferService
+from ..journal import advisory_journal
+
+# advisory 락 전용 라우터 생성
+router = APIRouter(
+    prefix="/advisory",
+    tags=["Advisory Lock"],
+    responses={404: {"description": "Not found"}}
+)
+
+# 서비스 인스턴스 생성
+service = AdvisoryLockTransferService()
+
+# 락 대기 방식
+# wait   : 락이 풀릴 때까지 대기 (pg_advisory_xact_lock)
+# try    : 잠겨 있으면 즉시 실패 (pg_try_advisory_xact_lock)
+# timeout: lock_timeout_ms 까지만 대기 후 실패
+LockWait = Literal["wait", "try", "timeout"]
+
+@router.post("/transfer", response_model=TransferResponse)
+async def advisory_transfer(
+    request: TransferRequest,
+    lock_wait: LockWait = "wait",
+    lock_timeout_ms: Optional[int] = Query(None, ge=1)
+):
+    """PostgreSQL advisory 락을 사용한 계좌 이체 (계좌 id 해시 키를 정렬된 순서로 잠금)"""
+    return await service.transfer(request, lock_wait=lock_wait, lock_timeout_ms=lock_timeout_ms)
+
+@router.post("/initialize")
+async def initialize_accounts(
+    accounts: int = Query(2, ge=2, le=10_000_000),
+    balance_distribution: BalanceDistribution = "fixed",
+    seed: Optional[int] = None
+):
+    """계좌 초기화 (account_a: 100000, account_b: 100000)
+    accounts > 2 이면 account_000000 ~ 형식으로 계좌마다 100000
+    balance_distribution: 계좌별 잔액 분포 (fixed / uniform / pareto, 총 잔액은 같음), seed 로 재현 가능
+    """
+    balances = await service.initialize_accounts(accounts, balance_distribution, seed)
+    return {"message": "계좌가 초기화되었습니다.", "balances": balances}
+
+@router.get("/balances")
+async def get_balances(cache: bool = True, accounts: Optional[List[str]] = Query(None, max_length=1000)):
+    """현재 잔액 조회
+    기본은 잔액 캐시 경유 (이체 커밋 시 갱신), cache=false 면 DB 직접 조회
+    accounts=...&accounts=... 로 조회할 계좌 지정 (기본 account_a / account_b)
+    """
+    balances = await service.get_balances(use_cache=cache, accounts=accounts)
+    return {"balances": balances}
+
+@router.get("/accounts")
+async def list_accounts(after: str = "", limit: int = Query(100, ge=1, le=10000)):
+    """전체 계좌 잔액 목록 (계좌 id 순, 다음 페이지는 응답의 next_after 를 after 로 전달)"""
+    return await service.list_balances(after, limit)
+
+@router.post("/stress-test")
+async def stress_test(
+    params: StressTestParams = Depends(),
+    lock_wait: LockWait = "wait",
+    lock_timeout_ms: Optional[int] = Query(None, ge=1),
+    stream: bool = False
+):
+    """스트레스 테스트: 기본값은 10개의 동시 이체 요청 (각각 10000원)
+    requests / concurrency / accounts / amount / distribution 으로 규모 조절
+    lock_wait=try / timeout 이면 락을 오래 기다리지 않고 실패
+    stream=true 이면 이체가 끝날 때마다 NDJSON 한 줄씩 + 마지막에 요약 한 줄
+    기본값 최종 잔액 확인
+    account_a: 0원
+    account_b: 200000원
+    """
+
+    # 먼저 계좌 초기화
+    await service.initialize_accounts(params.accounts, params.balance_distribution)
+    counters_before = dict(service.counters)
+
+    async def transfer(request: TransferRequest) -> TransferResponse:
+        return await service.transfer(request, lock_wait=lock_wait, lock_timeout_ms=lock_timeout_ms)
+
+    async def build_report(stats, total_time):
+        report = stress_report(stats, total_time, params, await service.get_balance_summary(), service.initial_balance)
+        if params.accounts == 2:
+            # 최종 잔액 확인
+            report["final_balances"] = await service.get_balances(use_cache=False)
+        return {
+            "message": "advisory 락 스트레스 테스트 완료",
+            "lock_wait": lock_wait,
+            **report,
+            "lock_failures": {name: service.counters[name] - counters_before[name] for name in service.counters}
+        }
+
+    if stream:
+        return StreamingResponse(stream_stress(transfer, params, build_report), media_type="application/x-ndjson")
+
+    # 시작 시간 기록
+    start_time = time.perf_counter()
+
+    # 동시 실행 수를 concurrency로 제한해서 실행 (결과는 집계만 유지)
+    stats = await run_stress(transfer, params)
+
+    # 총 실행 시간 계산
+    total_time = time.perf_counter() - start_time
+
+    return await build_report(stats, total_time)
+
+@router.get("/lock-info")
+async def get_lock_info():
+    """현재 잡혀 있거나 대기 중인 advisory 락 (pg_locks), try / timeout 실패 누적 횟수"""
+    return await service.get_lock_info()
+
+@router.get("/transfers")
+async def list_transfers(
+    account: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000)
+):
+    """이체 저널 조회 (최신순, 키셋 페이지네이션)
+    account 를 주면 그 계좌가 출금/입금한 이체만, 다음 페이지는 응답의 next_cursor 를 cursor 로 전달
+    """
+    return await advisory_journal.query(account, cursor, limit)
+
+@router.get("/transfers/verify")
+async def verify_transfers():
+    """이체 저널로 복원한 계좌별 잔액과 현재 잔액 비교"""
+    return await advisory_journal.verify()
+
+@router.post("/transfers/rebuild")
+async def rebuild_balances():
+    """이체 저널로 잔액 스냅샷 복원 (계좌별 마지막 이체의 처리 후 잔액을 accounts 에 반영)"""
+    return await advisory_journal.rebuild()
+
+@router.get("/info")
+async def advisory_info():
+    """advisory 락 방식 정보"""
+    return {
+        "method": "Advisory Lock",
+        "database": "PostgreSQL",
+        "technique": "pg_advisory_xact_lock (계좌 id blake2b 64비트 키, 정렬된 순서)",
+        "lock_wait": {
+            "wait": "pg_advisory_xact_lock - 락이 풀릴 때까지 대기",
+            "try": "pg_try_advisory_xact_lock - 잠겨 있으면 즉시 실패",
+            "timeout": "SET LOCAL lock_timeout 까지만 대기"
+        },
+        "description": "행 락 대신 DB의 advisory 락으로 계좌를 잠그는 방식 (Redis 없이 트랜잭션 종료 시 자동 해제)",
+        "pros": [
+            "외부 락 저장소 불필요",
+            "트랜잭션이 끝나면 락 자동 해제 (만료/워치독 불필요)",
+            "두 계좌 락을 한 문장으로 획득"
+        ],
+        "cons": [
+            "같은 DB를 쓰는 트랜잭션끼리만 보호",
+            "락 대기 동안 커넥션 점유",
+            "해시 충돌 시 서로 다른 계좌가 같은 락을 공유"
+        ]
+    }
@@ -1,8 +1,13 @@
-from fastapi import APIRouter
-import asyncio
+from fastapi import APIRouter, Depends, Query, Request
+from fastapi.responses import StreamingResponse
 import time
-from ..models import TransferRequest, TransferResponse
+from typing import List, Literal, Optional
+from ..models import TransferRequest, TransferResponse, StressTestParams, BalanceDistribution
+from ..stress import run_stress, stream_stress, stress_report
+from ..bulk import bulk_response, parse_bulk_transfers
 from ..scenarios.distributed import DistributedLockTransferService
+from ..journal import distributed_journal
+from ..redlock import redlock
 
 # 분산락 전용 라우터 생성
 router = APIRouter(
@@ -14,90 +19,179 @@ router = APIRouter(
 # 서비스 인스턴스 생성
 service = DistributedLockTransferService()
 
+# 락 대기 방식 (벤치마크 비교용)
+# poll  : 고정 간격 SET NX 재시도
+# notify: 해제 신호 BLPOP 대기
+WaitMode = Literal["poll", "notify"]
+# 락 범위
+# single: 정렬된 첫 번째 계좌만 락
+# multi : 계좌마다 락 (전부 아니면 전무로 획득)
+LockScope = Literal["single", "multi"]
+# 락 저장소
+# single : Redis 1대
+# redlock: Redis N대 과반 획득 (REDLOCK_URLS)
+LockBackend = Literal["single", "redlock"]
+
 @router.post("/transfer", response_model=TransferResponse)
-async def distributed_transfer(request: TransferRequest):
-    """Redis 분산락을 사용한 계좌 이체"""
-    return await service.transfer(request)
+async def distributed_transfer(
+    request: TransferRequest,
+    wait_mode: WaitMode = "poll",
+    lock_scope: LockScope = "single",
+    lock_backend: LockBackend = "single"
+):
+    """Redis 분산락을 사용한 계좌 이체 (lock_backend=redlock 이면 Redis N대 과반 락)"""
+    return await service.transfer(request, wait_mode=wait_mode, lock_scope=lock_scope, lock_backend=lock_backend)
+
+@router.post("/transfers/bulk")
+async def bulk_transfer(
+    request: Request,
+    chunk_size: int = Query(1000, ge=1, le=100000),
+    stream: bool = True,
+    wait_mode: WaitMode = "poll"
+):
+    """벌크 이체: JSON 배열 또는 NDJSON(Content-Type: application/x-ndjson)으로 이체 목록 입력
+    chunk_size 건씩 집합 단위 SQL로 실행하고 건별 결과를 NDJSON으로 스트리밍 (마지막 줄은 요약)
+    stream=false 이면 전체 결과를 모아서 JSON 한 번에 반환
+    """
+    transfers = await parse_bulk_transfers(request)
+    
+    async def transfer_bulk(chunk):
+        return await service.transfer_bulk(chunk, wait_mode=wait_mode)
+    
+    return await bulk_response(transfer_bulk, transfers, chunk_size, stream)
 
 @router.post("/initialize")
-async def initialize_accounts():
-    """계좌 초기화 (account_a: 100000, account_b: 100000)"""
-    balances = await service.initialize_accounts()
+async def initialize_accounts(
+    accounts: int = Query(2, ge=2, le=10_000_000),
+    balance_distribution: BalanceDistribution = "fixed",
+    seed: Optional[int] = None
+):
+    """계좌 초기화 (account_a: 100000, account_b: 100000)
+    accounts > 2 이면 account_000000 ~ 형식으로 계좌마다 100000
+    balance_distribution: 계좌별 잔액 분포 (fixed / uniform / pareto, 총 잔액은 같음), seed 로 재현 가능
+    """
+    balances = await service.initialize_accounts(accounts, balance_distribution, seed)
     return {"message": "계좌가 초기화되었습니다.", "balances": balances}
 
 @router.get("/balances")
-async def get_balances():
-    """현재 잔액 조회"""
-    balances = await service.get_balances()
+async def get_balances(cache: bool = True, accounts: Optional[List[str]] = Query(None, max_length=1000)):
+    """현재 잔액 조회
+    기본은 잔액 캐시 경유 (이체 커밋 시 갱신), cache=false 면 DB 직접 조회
+    accounts=...&accounts=... 로 조회할 계좌 지정 (기본 account_a / account_b)
+    """
+    balances = await service.get_balances(use_cache=cache, accounts=accounts)
     return {"balances": balances}
 
+@router.get("/accounts")
+async def list_accounts(after: str = "", limit: int = Query(100, ge=1, le=10000)):
+    """전체 계좌 잔액 목록 (계좌 id 순, 다음 페이지는 응답의 next_after 를 after 로 전달)"""
+    return await service.list_balances(after, limit)
+
 @router.get("/lock-info")
-async def get_lock_info():
-    """현재 Redis 락 상태 조회 (디버깅용)"""
-    lock_info = await service.get_lock_info()
+async def get_lock_info(
+    prefix: str = "",
+    cursor: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=10000)
+):
+    """현재 Redis 락 상태 조회 (디버깅용)
+    SCAN 커서 페이지 단위로 조회, 응답의 next_cursor를 다음 요청의 cursor로 전달 (0이면 마지막 페이지)
+    prefix로 계좌 id 접두사 필터
+    """
+    lock_info, next_cursor = await service.get_lock_info(prefix=prefix, cursor=cursor, limit=limit)
     return {
         "message": "현재 Redis 락 상태",
         "locks": lock_info,
-        "lock_count": len(lock_info)
+        "lock_count": len(lock_info),
+        "next_cursor": next_cursor
     }
 
 @router.post("/stress-test")
-async def stress_test():
-    """스트레스 테스트: 10개의 동시 이체 요청 (각각 10000원)
+async def stress_test(
+    params: StressTestParams = Depends(),
+    wait_mode: WaitMode = "poll",
+    lock_scope: LockScope = "single",
+    lock_backend: LockBackend = "single",
+    stream: bool = False
+):
+    """스트레스 테스트: 기본값은 10개의 동시 이체 요청 (각각 10000원)
     Redis 분산락으로 동시성 제어
-    최종 잔액 확인:
+    requests / concurrency / accounts / amount / distribution 으로 규모 조절
+    wait_mode=notify 이면 폴링 대신 해제 신호 대기로 실행
+    lock_scope=multi 이면 계좌마다 락을 잡아서 실행
+    lock_backend=redlock 이면 REDLOCK_URLS 노드 과반 락으로 실행 (wait_mode는 poll로 동작)
+    stream=true 이면 이체가 끝날 때마다 NDJSON 한 줄씩 + 마지막에 요약 한 줄
+    기본값 최종 잔액 확인:
     account_a: 0원
     account_b: 200000원
     """
     
     # 먼저 계좌 초기화
-    await service.initialize_accounts()
-    
-    # 10개의 동시 이체 요청 생성
-    tasks = []
-    for i in range(10):
-        request = TransferRequest(
-            from_account="account_a",
-            to_account="account_b",
-            amount=10000
-        )
-        task = service.transfer(request)
-        tasks.append(task)
-    
-    # 시작 시간 기록
-    start_time = time.time()
+    await service.initialize_accounts(params.accounts, params.balance_distribution)
+    fence_rejections_before = service.fence_rejections
     
-    # 모든 이체 요청을 동시에 실행
-    results = await asyncio.gather(*tasks)
+    async def transfer(request: TransferRequest) -> TransferResponse:
+        return await service.transfer(request, wait_mode=wait_mode, lock_scope=lock_scope, lock_backend=lock_backend)
     
-    # 총 실행 시간 계산
-    total_time = time.time() - start_time
+    async def build_report(stats, total_time):
+        report = stress_report(stats, total_time, params, await service.get_balance_summary(), service.initial_balance)
+        if params.accounts == 2:
+            # 최종 잔액 확인
+            report["final_balances"] = await service.get_balances(use_cache=False)
+        
+        # 최종 락 상태 확인
+        final_lock_count = await service.count_locks()
+        
+        return {
+            "message": "Redis 분산락 스트레스 테스트 완료",
+            "wait_mode": wait_mode,
+            "lock_scope": lock_scope,
+            "lock_backend": lock_backend,
+            **report,
+            "lock_failure_count": stats.outcomes["lock_failure"],
+            "fence_rejection_count": service.fence_rejections - fence_rejections_before,
+            "lock_ttl_ms": service.lock_ttl_ms,
+            "final_lock_count": final_lock_count
+        }
     
-    # 최종 잔액 확인
-    final_balances = await service.get_balances()
+    if stream:
+        return StreamingResponse(stream_stress(transfer, params, build_report), media_type="application/x-ndjson")
     
-    # 성공/실패 통계
-    success_count = sum(1 for result in results if result.success)
-    failed_count = len(results) - success_count
+    # 시작 시간 기록
+    start_time = time.perf_counter()
     
-    # 락 관련 통계
-    lock_failure_count = sum(1 for result in results if "락 획득 실패" in result.message)
+    # 동시 실행 수를 concurrency로 제한해서 실행 (결과는 집계만 유지)
+    stats = await run_stress(transfer, params)
     
-    # 최종 락 상태 확인
-    final_lock_info = await service.get_lock_info()
+    # 총 실행 시간 계산
+    total_time = time.perf_counter() - start_time
     
-    return {
-        "message": "Redis 분산락 스트레스 테스트 완료",
-        "total_requests": len(results),
-        "success_count": success_count,
-        "failed_count": failed_count,
-        "lock_failure_count": lock_failure_count,
-        "total_execution_time": total_time,
-        "final_balances": final_balances,
-        "expected_balances": {"account_a": 0, "account_b": 200000},
-        "final_lock_count": len(final_lock_info),
-        "results": results
-    }
+    return await build_report(stats, total_time)
+
+@router.get("/redlock")
+async def redlock_info():
+    """Redlock 노드 목록/노드별 오류 횟수, 과반 수, 획득 성공/과반 실패 횟수"""
+    return redlock.stats()
+
+@router.get("/transfers")
+async def list_transfers(
+    account: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000)
+):
+    """이체 저널 조회 (최신순, 키셋 페이지네이션)
+    account 를 주면 그 계좌가 출금/입금한 이체만, 다음 페이지는 응답의 next_cursor 를 cursor 로 전달
+    """
+    return await distributed_journal.query(account, cursor, limit)
+
+@router.get("/transfers/verify")
+async def verify_transfers():
+    """이체 저널로 복원한 계좌별 잔액과 현재 잔액 비교"""
+    return await distributed_journal.verify()
+
+@router.post("/transfers/rebuild")
+async def rebuild_balances():
+    """이체 저널로 잔액 스냅샷 복원 (계좌별 마지막 이체의 처리 후 잔액을 accounts 에 반영)"""
+    return await distributed_journal.rebuild()
 
 @router.get("/info")
 async def distributed_info():
@@ -105,7 +199,15 @@ async def distributed_info():
     return {
         "method": "Distributed Lock",
         "technology": "Redis",
-        "technique": "SET NX EX (Redis Atomic Operations)",
+        "technique": "SET NX PX + Lua 스크립트 (EVALSHA)",
+        "lock_primitives": {
+            "acquire": "SET NX PX (내 토큰이면 재진입) + INCR 펜싱 토큰 - 라운드트립 1회",
+            "release": "GET 비교 + DEL을 Lua로 원자적으로 - 라운드트립 1회",
+            "extend": "GET 비교 + PEXPIRE (워치독이 ttl/3 간격으로 연장)",
+            "fencing": "UPDATE ... WHERE fence_token < 내 토큰 (락 만료 후 늦게 쓰는 이전 소유자는 0행 -> 롤백)"
+        },
+        "lock_ttl_ms": service.lock_ttl_ms,
+        "fence_rejections": service.fence_rejections,
         "description": "Redis를 사용한 분산락으로 동시성 문제를 해결하는 방식",
         "status": "✅ 구현 완료",
     } 
\ No newline at end of file
@@ -0,0 +1,135 @@
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
+import time
+from typing import List, Optional
+from ..models import TransferRequest, TransferResponse, StressTestParams, BalanceDistribution
+from ..stress import run_stress, stream_stress, stress_report
+from ..scenarios.redis_ledger import RedisLedgerTransferService, ledger_writer
+from ..journal import distributed_journal
+
+# Redis 원장 전용 라우터 생성
+router = APIRouter(
+    prefix="/ledger",
+    tags=["Redis Ledger"],
+    responses={404: {"description": "Not found"}}
+)
+
+# 서비스 인스턴스 생성
+service = RedisLedgerTransferService()
+
+@router.post("/transfer", response_model=TransferResponse)
+async def ledger_transfer(request: TransferRequest):
+    """Redis 원장 이체 (Lua 스크립트로 잔액 확인 + 이동 + 스트림 기록을 한 번에)"""
+    return await service.transfer(request)
+
+@router.post("/initialize")
+async def initialize_accounts(
+    accounts: int = Query(2, ge=2, le=10_000_000),
+    balance_distribution: BalanceDistribution = "fixed",
+    seed: Optional[int] = None
+):
+    """계좌 초기화 (distributed DB 초기화 후 Redis 원장으로 적재)
+    분산락 방식과 같은 distributed DB accounts 테이블을 사용하므로 두 방식을 동시에 돌리지 않음
+    balance_distribution: 계좌별 잔액 분포 (fixed / uniform / pareto, 총 잔액은 같음), seed 로 재현 가능
+    """
+    balances = await service.initialize_accounts(accounts, balance_distribution, seed)
+    return {"message": "계좌가 초기화되었습니다.", "balances": balances}
+
+@router.get("/balances")
+async def get_balances(accounts: Optional[List[str]] = Query(None, max_length=1000)):
+    """Redis 원장 잔액 조회 (accounts=...&accounts=... 로 계좌 지정, 기본 account_a / account_b)"""
+    balances = await service.get_balances(accounts)
+    return {"balances": balances}
+
+@router.get("/accounts")
+async def list_accounts(cursor: int = Query(0, ge=0), limit: int = Query(100, ge=1, le=10000)):
+    """Redis 원장 전체 잔액 목록 (HSCAN 커서, 다음 페이지는 응답의 next_cursor 를 cursor 로 전달)"""
+    return await service.list_balances(cursor, limit)
+
+@router.get("/reconcile")
+async def reconcile(timeout: float = Query(30.0, gt=0, le=300)):
+    """Redis 원장과 distributed DB 비교 (writer가 스트림을 다 반영할 때까지 대기 후)"""
+    return await service.reconcile(timeout)
+
+@router.get("/writer")
+async def writer_stats():
+    """스트림 -> DB 배치 writer 상태 (반영 건수, 배치 수, 남은 스트림 길이)"""
+    return await ledger_writer.stats()
+
+@router.post("/stress-test")
+async def stress_test(params: StressTestParams = Depends(), stream: bool = False):
+    """스트레스 테스트: 기본값은 10개의 동시 이체 요청 (각각 10000원)
+    requests / concurrency / accounts / amount / distribution 으로 규모 조절
+    끝나면 writer가 DB에 다 반영할 때까지 기다렸다가 Redis 원장과 DB를 대조 (reconciliation)
+    stream=true 이면 이체가 끝날 때마다 NDJSON 한 줄씩 + 마지막에 요약 한 줄
+    기본값 최종 잔액 확인:
+    account_a: 0원
+    account_b: 200000원
+    """
+
+    # 먼저 계좌 초기화
+    await service.initialize_accounts(params.accounts, params.balance_distribution)
+
+    async def build_report(stats, total_time):
+        report = stress_report(stats, total_time, params, await service.get_balance_summary(), service.initial_balance)
+        if params.accounts == 2:
+            # 최종 잔액 확인
+            report["final_balances"] = await service.get_balances()
+        return {
+            "message": "Redis 원장 스트레스 테스트 완료",
+            **report,
+            "reconciliation": await service.reconcile()
+        }
+
+    if stream:
+        return StreamingResponse(stream_stress(service.transfer, params, build_report), media_type="application/x-ndjson")
+
+    # 시작 시간 기록
+    start_time = time.perf_counter()
+
+    # 동시 실행 수를 concurrency로 제한해서 실행 (결과는 집계만 유지)
+    stats = await run_stress(service.transfer, params)
+
+    # 총 실행 시간 계산
+    total_time = time.perf_counter() - start_time
+
+    return await build_report(stats, total_time)
+
+@router.get("/transfers")
+async def list_transfers(
+    account: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000)
+):
+    """이체 저널 조회 (최신순, 키셋 페이지네이션)
+    writer가 DB에 반영한 이체만 보임 (distributed DB 저널)
+    account 를 주면 그 계좌가 출금/입금한 이체만, 다음 페이지는 응답의 next_cursor 를 cursor 로 전달
+    """
+    return await distributed_journal.query(account, cursor, limit)
+
+@router.get("/transfers/verify")
+async def verify_transfers():
+    """이체 저널로 복원한 계좌별 잔액과 현재 잔액 비교"""
+    return await distributed_journal.verify()
+
+@router.get("/info")
+async def ledger_info():
+    """Redis 원장 방식 정보"""
+    return {
+        "method": "Redis Ledger",
+        "technology": "Redis (Hash + Lua + Stream) -> PostgreSQL",
+        "technique": "잔액 확인/이동/기록을 Lua 스크립트 1회로 원자적으로 처리, 락 없음",
+        "write_path": {
+            "transfer": "EVALSHA 1회: HGET x2 -> HINCRBY x2 -> XADD ledger:transfers",
+            "writer": "XREADGROUP 배치 -> 계좌별 마지막 잔액만 다중 행 UPDATE 1회 -> XACK + XDEL"
+        },
+        "description": "잔액의 원본을 Redis에 두고 PostgreSQL에는 비동기로 반영하는 최고 처리량 방식",
+        "pros": [
+            "DB 락/트랜잭션 없이 이체 1건 = Redis 라운드트립 1회",
+            "DB 쓰기는 배치로 묶여서 계좌별 마지막 값만 반영"
+        ],
+        "cons": [
+            "DB는 스트림 반영 지연만큼 늦게 따라옴 (/ledger/reconcile 로 확인)",
+            "Redis 영속성(AOF/RDB) 설정에 따라 장애 시 최근 이체 유실 가능"
+        ]
+    }
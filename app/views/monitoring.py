@@ -0,0 +1,46 @@
+from fastapi import APIRouter
+from ..database import pessimistic_db, optimistic_db, distributed_db, advisory_db, serializable_db
+from ..cache import pessimistic_cache, optimistic_cache, distributed_cache, advisory_cache, serializable_cache
+from ..sharding import shard_router
+from ..journal import journal_partitions
+
+# 모니터링 전용 라우터 생성
+router = APIRouter(
+    prefix="/monitoring",
+    tags=["Monitoring"],
+    responses={404: {"description": "Not found"}}
+)
+
+@router.get("/pools")
+async def get_pool_stats():
+    """커넥션 풀 상태 조회 (설정, 사용 중/유휴 커넥션 수, 획득 대기 시간 분포)"""
+    return {
+        "pessimistic": pessimistic_db.pool_info(),
+        "optimistic": optimistic_db.pool_info(),
+        "distributed": distributed_db.pool_info(),
+        "advisory": advisory_db.pool_info(),
+        "serializable": serializable_db.pool_info(),
+        **shard_router.pool_info()
+    }
+
+@router.get("/cache")
+async def get_cache_stats():
+    """잔액 캐시 상태 조회 (적중/미스, 만료, 오래된 version 거부 횟수)"""
+    return {
+        "pessimistic": pessimistic_cache.stats(),
+        "optimistic": optimistic_cache.stats(),
+        "distributed": distributed_cache.stats(),
+        "advisory": advisory_cache.stats(),
+        "serializable": serializable_cache.stats()
+    }
+
+@router.get("/journal")
+async def get_journal_partitions(refresh: bool = False):
+    """이체 저널 파티션 상태 (DB별 마지막 확인 결과, refresh=true 면 지금 다시 확인)"""
+    if refresh:
+        await journal_partitions.run_once()
+    return {
+        "months_ahead": journal_partitions.months_ahead,
+        "interval": journal_partitions.interval,
+        "databases": journal_partitions.status
+    }
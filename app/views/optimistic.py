@@ -1,8 +1,13 @@
-from fastapi import APIRouter
-import asyncio
+from fastapi import APIRouter, Depends, Query, Request
+from fastapi.responses import StreamingResponse
 import time
-from ..models import TransferRequest, TransferResponse
+from typing import List, Literal, Optional
+from ..models import TransferRequest, TransferResponse, StressTestParams, BalanceDistribution
+from ..stress import run_stress, stream_stress, stress_report
+from ..bulk import bulk_response, parse_bulk_transfers
 from ..scenarios.optimistic import OptimisticLockTransferService
+from ..retry import get_retry_policy
+from ..journal import optimistic_journal
 
 # 낙관적락 전용 라우터 생성
 router = APIRouter(
@@ -14,78 +19,156 @@ router = APIRouter(
 # 서비스 인스턴스 생성
 service = OptimisticLockTransferService()
 
+# 재시도 정책 (app/retry.py)
+# exponential : 기존 방식 0.01 * 2^n 고정 대기, 최대 5회
+# full_jitter : 0 ~ 지수 상한 사이 랜덤 대기
+# decorrelated: 이전 대기시간 기반 랜덤 대기
+# adaptive    : 계좌 충돌률에 따라 상한 조절
+RetryPolicyName = Literal["exponential", "full_jitter", "decorrelated", "adaptive"]
+# 이체 시도 방식
+# default: SELECT 2회 + version 확인 UPDATE 2회
+# cte    : SELECT 1회 + 두 계좌 조건부 UPDATE 1문장 (RETURNING)
+TransferMode = Literal["default", "cte"]
+
 @router.post("/transfer", response_model=TransferResponse)
-async def optimistic_transfer(request: TransferRequest):
+async def optimistic_transfer(
+    request: TransferRequest,
+    retry_policy: RetryPolicyName = "adaptive",
+    mode: TransferMode = "default"
+):
     """낙관적락을 사용한 계좌 이체"""
-    return await service.transfer(request)
+    return await service.transfer(request, retry_policy=retry_policy, mode=mode)
+
+@router.post("/transfers/bulk")
+async def bulk_transfer(
+    request: Request,
+    chunk_size: int = Query(1000, ge=1, le=100000),
+    stream: bool = True,
+    retry_policy: RetryPolicyName = "adaptive"
+):
+    """벌크 이체: JSON 배열 또는 NDJSON(Content-Type: application/x-ndjson)으로 이체 목록 입력
+    chunk_size 건씩 집합 단위 SQL로 실행하고 건별 결과를 NDJSON으로 스트리밍 (마지막 줄은 요약)
+    stream=false 이면 전체 결과를 모아서 JSON 한 번에 반환
+    """
+    transfers = await parse_bulk_transfers(request)
+    
+    async def transfer_bulk(chunk):
+        return await service.transfer_bulk(chunk, retry_policy=retry_policy)
+    
+    return await bulk_response(transfer_bulk, transfers, chunk_size, stream)
 
 @router.post("/initialize")
-async def initialize_accounts():
-    """계좌 초기화 (account_a: 100000, account_b: 100000)"""
-    balances = await service.initialize_accounts()
+async def initialize_accounts(
+    accounts: int = Query(2, ge=2, le=10_000_000),
+    balance_distribution: BalanceDistribution = "fixed",
+    seed: Optional[int] = None
+):
+    """계좌 초기화 (account_a: 100000, account_b: 100000)
+    accounts > 2 이면 account_000000 ~ 형식으로 계좌마다 100000
+    balance_distribution: 계좌별 잔액 분포 (fixed / uniform / pareto, 총 잔액은 같음), seed 로 재현 가능
+    """
+    balances = await service.initialize_accounts(accounts, balance_distribution, seed)
     return {"message": "계좌가 초기화되었습니다.", "balances": balances}
 
 @router.get("/balances")
-async def get_balances():
-    """현재 잔액 조회 (version 정보 포함)"""
-    balances = await service.get_balances()
+async def get_balances(cache: bool = True, accounts: Optional[List[str]] = Query(None, max_length=1000)):
+    """현재 잔액 조회 (version 정보 포함)
+    기본은 잔액 캐시 경유 (이체 커밋 시 갱신), cache=false 면 DB 직접 조회
+    accounts=...&accounts=... 로 조회할 계좌 지정 (기본 account_a / account_b)
+    """
+    balances = await service.get_balances(use_cache=cache, accounts=accounts)
     return {"balances": balances}
 
+@router.get("/accounts")
+async def list_accounts(after: str = "", limit: int = Query(100, ge=1, le=10000)):
+    """전체 계좌 잔액 목록 (계좌 id 순, 다음 페이지는 응답의 next_after 를 after 로 전달)"""
+    return await service.list_balances(after, limit)
+
 @router.post("/stress-test")
-async def stress_test():
-    """스트레스 테스트: 10개의 동시 이체 요청 (각각 10000원)
+async def stress_test(
+    params: StressTestParams = Depends(),
+    retry_policy: RetryPolicyName = "adaptive",
+    mode: TransferMode = "default",
+    stream: bool = False
+):
+    """스트레스 테스트: 기본값은 10개의 동시 이체 요청 (각각 10000원)
     낙관적락 특성상 동시성 충돌이 발생할 수 있어 재시도 로직이 동작됩니다.
-    최종 잔액 확인:
+    requests / concurrency / accounts / amount / distribution 으로 규모 조절
+    retry_policy로 재시도 정책을 선택하고, 정책별 충돌/재시도 히스토그램을 함께 반환
+    stream=true 이면 이체가 끝날 때마다 NDJSON 한 줄씩 + 마지막에 요약 한 줄
+    기본값 최종 잔액 확인:
     account_a: 0원
     account_b: 200000원
     """
     
     # 먼저 계좌 초기화
-    await service.initialize_accounts()
-    
-    # 10개의 동시 이체 요청 생성
-    tasks = []
-    for i in range(10):
-        request = TransferRequest(
-            from_account="account_a",
-            to_account="account_b",
-            amount=10000
-        )
-        task = service.transfer(request)
-        tasks.append(task)
+    await service.initialize_accounts(params.accounts, params.balance_distribution)
+    policy = get_retry_policy(retry_policy)
+    policy.reset_stats()
     
-    # 시작 시간 기록
-    start_time = time.time()
+    async def transfer(request: TransferRequest) -> TransferResponse:
+        return await service.transfer(request, retry_policy=retry_policy, mode=mode)
     
-    # 모든 이체 요청을 동시에 실행
-    results = await asyncio.gather(*tasks)
+    async def build_report(stats, total_time):
+        report = stress_report(stats, total_time, params, await service.get_balance_summary(), service.initial_balance)
+        if params.accounts == 2:
+            # 최종 잔액 확인 (version 포함)
+            report["final_balances"] = await service.get_balances(use_cache=False)
+        if "expected_balances" in report:
+            # 성공한 이체마다 두 계좌 version이 1씩 증가
+            report["expected_balances"] = {
+                account: {"balance": balance, "version": stats.success_count}
+                for account, balance in report["expected_balances"].items()
+            }
+        
+        # 재시도 통계
+        retry_stats = policy.stats()
+        retry_count = sum(conflicts * count for conflicts, count in retry_stats["conflicts_per_transfer"].items())
+        
+        return {
+            "message": "낙관적락 스트레스 테스트 완료",
+            "retry_policy": retry_policy,
+            "mode": mode,
+            **report,
+            "retry_count": retry_count,
+            "conflict_count": stats.outcomes["conflict"],
+            "retry_stats": retry_stats
+        }
     
-    # 총 실행 시간 계산
-    total_time = time.time() - start_time
+    if stream:
+        return StreamingResponse(stream_stress(transfer, params, build_report), media_type="application/x-ndjson")
     
-    # 최종 잔액 확인
-    final_balances = await service.get_balances()
+    # 시작 시간 기록
+    start_time = time.perf_counter()
     
-    # 성공/실패 통계
-    success_count = sum(1 for result in results if result.success)
-    failed_count = len(results) - success_count
+    # 동시 실행 수를 concurrency로 제한해서 실행 (결과는 집계만 유지)
+    stats = await run_stress(transfer, params)
     
-    # 재시도 통계
-    retry_count = sum(1 for result in results if "재시도" in result.message)
-    conflict_count = sum(1 for result in results if "충돌" in result.message)
+    # 총 실행 시간 계산
+    total_time = time.perf_counter() - start_time
     
-    return {
-        "message": "낙관적락 스트레스 테스트 완료",
-        "total_requests": len(results),
-        "success_count": success_count,
-        "failed_count": failed_count,
-        "retry_count": retry_count,
-        "conflict_count": conflict_count,
-        "total_execution_time": total_time,
-        "final_balances": final_balances,
-        "expected_balances": {"account_a": {"balance": 0, "version": 10}, "account_b": {"balance": 200000, "version": 10}},
-        "results": results
-    }
+    return await build_report(stats, total_time)
+
+@router.get("/transfers")
+async def list_transfers(
+    account: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000)
+):
+    """이체 저널 조회 (최신순, 키셋 페이지네이션)
+    account 를 주면 그 계좌가 출금/입금한 이체만, 다음 페이지는 응답의 next_cursor 를 cursor 로 전달
+    """
+    return await optimistic_journal.query(account, cursor, limit)
+
+@router.get("/transfers/verify")
+async def verify_transfers():
+    """이체 저널로 복원한 계좌별 잔액과 현재 잔액 비교"""
+    return await optimistic_journal.verify()
+
+@router.post("/transfers/rebuild")
+async def rebuild_balances():
+    """이체 저널로 잔액 스냅샷 복원 (계좌별 마지막 이체의 처리 후 잔액을 accounts 에 반영)"""
+    return await optimistic_journal.rebuild()
 
 @router.get("/info")
 async def optimistic_info():
@@ -98,8 +181,9 @@ async def optimistic_info():
         "status": "✅ 구현 완료",
         "features": [
             "Version 컬럼을 사용한 충돌 감지",
-            "충돌 시 자동 재시도 (최대 5회)",
-            "지수 백오프 재시도 전략",
+            "충돌 시 자동 재시도 (시간 예산 내)",
+            "지터 백오프 재시도 정책 선택 (exponential / full_jitter / decorrelated / adaptive)",
+            "계좌별 충돌률에 따른 적응형 백오프",
             "락 대기 시간 없음"
         ],
         "pros": [
@@ -1,8 +1,13 @@
-from fastapi import APIRouter
-import asyncio
+from fastapi import APIRouter, Depends, Query, Request
+from fastapi.responses import StreamingResponse
 import time
-from ..models import TransferRequest, TransferResponse
+from typing import List, Literal, Optional
+from ..models import TransferRequest, TransferResponse, StressTestParams, BalanceDistribution
+from ..stress import run_stress, stream_stress, stress_report
+from ..bulk import bulk_response, parse_bulk_transfers
 from ..scenarios.pessimistic import PessimisticLockTransferService
+from ..diagnostics import pessimistic_diagnostics
+from ..journal import pessimistic_journal
 
 # 비관적락 전용 라우터 생성
 router = APIRouter(
@@ -14,72 +19,168 @@ router = APIRouter(
 # 서비스 인스턴스 생성
 service = PessimisticLockTransferService()
 
+# 이체 모드 (벤치마크 비교용)
+# default: SELECT FOR UPDATE 2회 + UPDATE 2회
+# atomic : 락/잔액확인/업데이트를 한 문장으로 (라운드트립 1회)
+# batch  : 몇 ms 동안 모인 이체를 트랜잭션 하나로 처리 (그룹 커밋)
+TransferMode = Literal["default", "atomic", "batch"]
+transfer_modes = {
+    "default": PessimisticLockTransferService.transfer,
+    "atomic": PessimisticLockTransferService.transfer_atomic,
+    "batch": PessimisticLockTransferService.transfer_batched,
+}
+
+# 락 대기 방식 (default 모드에만 적용)
+# wait       : 락이 풀릴 때까지 대기
+# timeout    : lock_timeout_ms 까지만 대기 후 실패
+# nowait     : 잠겨 있으면 즉시 실패 (FOR UPDATE NOWAIT)
+# skip_locked: 잠긴 행은 건너뛰고 실패 (FOR UPDATE SKIP LOCKED)
+LockWait = Literal["wait", "timeout", "nowait", "skip_locked"]
+
+def select_transfer(mode: str, lock_wait: LockWait, lock_timeout_ms: Optional[int]):
+    if mode != "default":
+        return transfer_modes[mode]
+    
+    async def transfer(request: TransferRequest) -> TransferResponse:
+        return await PessimisticLockTransferService.transfer(
+            request, lock_wait=lock_wait, lock_timeout_ms=lock_timeout_ms
+        )
+    return transfer
+
 @router.post("/transfer", response_model=TransferResponse)
-async def pessimistic_transfer(request: TransferRequest):
-    """비관적락을 사용한 계좌 이체"""
-    return await PessimisticLockTransferService.transfer(request)
+async def pessimistic_transfer(
+    request: TransferRequest,
+    mode: TransferMode = "default",
+    lock_wait: LockWait = "wait",
+    lock_timeout_ms: Optional[int] = Query(None, ge=1)
+):
+    """비관적락을 사용한 계좌 이체
+    lock_wait로 락 대기 방식 선택 (커넥션을 오래 붙잡지 않고 빠르게 실패시키기)
+    """
+    return await select_transfer(mode, lock_wait, lock_timeout_ms)(request)
+
+@router.post("/transfers/bulk")
+async def bulk_transfer(
+    request: Request,
+    chunk_size: int = Query(1000, ge=1, le=100000),
+    stream: bool = True
+):
+    """벌크 이체: JSON 배열 또는 NDJSON(Content-Type: application/x-ndjson)으로 이체 목록 입력
+    chunk_size 건씩 집합 단위 SQL로 실행하고 건별 결과를 NDJSON으로 스트리밍 (마지막 줄은 요약)
+    stream=false 이면 전체 결과를 모아서 JSON 한 번에 반환
+    """
+    transfers = await parse_bulk_transfers(request)
+    
+    return await bulk_response(PessimisticLockTransferService.transfer_bulk, transfers, chunk_size, stream)
 
 @router.post("/initialize")
-async def initialize_accounts():
-    """계좌 초기화 (account_a: 100000, account_b: 100000)"""
-    balances = await service.initialize_accounts()
+async def initialize_accounts(
+    accounts: int = Query(2, ge=2, le=10_000_000),
+    balance_distribution: BalanceDistribution = "fixed",
+    seed: Optional[int] = None
+):
+    """계좌 초기화 (account_a: 100000, account_b: 100000)
+    accounts > 2 이면 account_000000 ~ 형식으로 계좌마다 100000
+    balance_distribution: 계좌별 잔액 분포 (fixed / uniform / pareto, 총 잔액은 같음), seed 로 재현 가능
+    """
+    balances = await service.initialize_accounts(accounts, balance_distribution, seed)
     return {"message": "계좌가 초기화되었습니다.", "balances": balances}
 
 @router.get("/balances")
-async def get_balances():
-    """현재 잔액 조회"""
-    balances = await service.get_balances()
+async def get_balances(cache: bool = True, accounts: Optional[List[str]] = Query(None, max_length=1000)):
+    """현재 잔액 조회
+    기본은 잔액 캐시 경유 (이체 커밋 시 갱신), cache=false 면 DB 직접 조회
+    accounts=...&accounts=... 로 조회할 계좌 지정 (기본 account_a / account_b)
+    """
+    balances = await service.get_balances(use_cache=cache, accounts=accounts)
     return {"balances": balances}
 
+@router.get("/accounts")
+async def list_accounts(after: str = "", limit: int = Query(100, ge=1, le=10000)):
+    """전체 계좌 잔액 목록 (계좌 id 순, 다음 페이지는 응답의 next_after 를 after 로 전달)"""
+    return await service.list_balances(after, limit)
+
 @router.post("/stress-test")
-async def stress_test():
-    """스트레스 테스트: 10개의 동시 이체 요청 (각각 10000원)
-    일반 for 문으로 실행....
-    최종 잔액 확인
+async def stress_test(
+    params: StressTestParams = Depends(),
+    mode: TransferMode = "default",
+    lock_wait: LockWait = "wait",
+    lock_timeout_ms: Optional[int] = Query(None, ge=1),
+    stream: bool = False
+):
+    """스트레스 테스트: 기본값은 10개의 동시 이체 요청 (각각 10000원)
+    requests / concurrency / accounts / amount / distribution 으로 규모 조절
+    mode=atomic 이면 단일 라운드트립 이체로 실행
+    mode=batch 이면 그룹 커밋으로 실행
+    lock_wait=timeout / nowait / skip_locked 이면 락을 오래 기다리지 않고 실패 (default 모드)
+    stream=true 이면 이체가 끝날 때마다 NDJSON 한 줄씩 + 마지막에 요약 한 줄
+    기본값 최종 잔액 확인
     account_a: 0원
     account_b: 200000원
     """
     
     # 먼저 계좌 초기화
-    await service.initialize_accounts()
+    await service.initialize_accounts(params.accounts, params.balance_distribution)
+    transfer = select_transfer(mode, lock_wait, lock_timeout_ms)
     
-    # 10개의 동시 이체 요청 생성
-    tasks = []
-    for i in range(10):
-        request = TransferRequest(
-            from_account="account_a",
-            to_account="account_b",
-            amount=10000
+    async def build_report(stats, total_time):
+        report = stress_report(stats, total_time, params, await service.get_balance_summary(), service.initial_balance)
+        if params.accounts == 2:
+            # 최종 잔액 확인
+            report["final_balances"] = await service.get_balances(use_cache=False)
+        return {"message": "스트레스 테스트 완료", "mode": mode, "lock_wait": lock_wait, **report}
+    
+    if stream:
+        return StreamingResponse(
+            stream_stress(transfer, params, build_report),
+            media_type="application/x-ndjson"
         )
-        task = PessimisticLockTransferService.transfer(request)
-        tasks.append(task)
     
     # 시작 시간 기록
-    start_time = time.time()
+    start_time = time.perf_counter()
     
-    # 모든 이체 요청을 동시에 실행
-    results = await asyncio.gather(*tasks)
+    # 동시 실행 수를 concurrency로 제한해서 실행 (결과는 집계만 유지)
+    stats = await run_stress(transfer, params)
     
     # 총 실행 시간 계산
-    total_time = time.time() - start_time
-    
-    # 최종 잔액 확인
-    final_balances = await service.get_balances()
-    
-    # 성공/실패 통계
-    success_count = sum(1 for result in results if result.success)
-    failed_count = len(results) - success_count
+    total_time = time.perf_counter() - start_time
     
-    return {
-        "message": "스트레스 테스트 완료",
-        "total_requests": len(results),
-        "success_count": success_count,
-        "failed_count": failed_count,
-        "total_execution_time": total_time,
-        "final_balances": final_balances,
-        "expected_balances": {"account_a": 0, "account_b": 200000},
-        "results": results
-    }
+    return await build_report(stats, total_time)
+
+@router.get("/diagnostics/locks")
+async def lock_diagnostics():
+    """락 대기 진단 스냅샷
+    세션별 대기 상태와 막고 있는 pid(pg_blocking_pids), 대기 체인, 행 락 대기 중인 계좌,
+    데드락 누적 횟수(pg_stat_database), lock_timeout/NOWAIT/SKIP LOCKED 실패 횟수, 계좌별 락 대기 시간
+    """
+    return await pessimistic_diagnostics.snapshot()
+
+@router.get("/diagnostics/history")
+async def lock_diagnostics_history(limit: int = Query(60, ge=1, le=720)):
+    """백그라운드 샘플러가 주기적으로 기록한 락 대기/데드락/타임아웃 추이 (최근 limit개)"""
+    history = list(pessimistic_diagnostics.history)[-limit:]
+    return {"interval": pessimistic_diagnostics.interval, "samples": history}
+
+@router.get("/transfers")
+async def list_transfers(
+    account: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000)
+):
+    """이체 저널 조회 (최신순, 키셋 페이지네이션)
+    account 를 주면 그 계좌가 출금/입금한 이체만, 다음 페이지는 응답의 next_cursor 를 cursor 로 전달
+    """
+    return await pessimistic_journal.query(account, cursor, limit)
+
+@router.get("/transfers/verify")
+async def verify_transfers():
+    """이체 저널로 복원한 계좌별 잔액과 현재 잔액 비교"""
+    return await pessimistic_journal.verify()
+
+@router.post("/transfers/rebuild")
+async def rebuild_balances():
+    """이체 저널로 잔액 스냅샷 복원 (계좌별 마지막 이체의 처리 후 잔액을 accounts 에 반영)"""
+    return await pessimistic_journal.rebuild()
 
 @router.get("/info")
 async def pessimistic_info():
@@ -88,6 +189,17 @@ async def pessimistic_info():
         "method": "Pessimistic Lock",
         "database": "PostgreSQL",
         "technique": "SELECT FOR UPDATE",
+        "modes": {
+            "default": "SELECT FOR UPDATE 2회 + UPDATE 2회 (라운드트립 4회)",
+            "atomic": "CTE 한 문장으로 락/잔액확인/업데이트 (라운드트립 1회)",
+            "batch": "최대 5ms / 100건씩 모아서 트랜잭션 1개 + 다중 행 UPDATE 1회 (그룹 커밋)"
+        },
+        "lock_wait": {
+            "wait": "락이 풀릴 때까지 대기",
+            "timeout": "SET LOCAL lock_timeout 까지만 대기",
+            "nowait": "FOR UPDATE NOWAIT (잠겨 있으면 즉시 실패)",
+            "skip_locked": "FOR UPDATE SKIP LOCKED (잠긴 행은 건너뛰고 실패)"
+        },
         "description": "데이터를 읽을 때 미리 락을 걸어서 동시성 문제를 해결하는 방식",
         "pros": [
             "데이터 일관성 보장",
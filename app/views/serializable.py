@@ -0,0 +1,169 @@
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
+import time
+from typing import List, Literal, Optional
+from ..models import TransferRequest, TransferResponse, StressTestParams, BalanceDistribution
+from ..stress import run_stress, stream_stress, stress_report
+from ..scenarios.serializable import SerializableTransferService, failure_rates
+from ..journal import serializable_journal
+
+# 격리 수준 방식 전용 라우터 생성
+router = APIRouter(
+    prefix="/serializable",
+    tags=["Serializable Isolation"],
+    responses={404: {"description": "Not found"}}
+)
+
+# 서비스 인스턴스 생성
+service = SerializableTransferService()
+
+# 격리 수준
+# serializable   : SSI, 직렬 실행과 같은 결과가 아니면 40001
+# repeatable_read: 스냅샷 격리, 같은 행 동시 갱신 시 40001
+Isolation = Literal["serializable", "repeatable_read"]
+# 재시도 정책 (app/retry.py, 낙관적락과 같은 종류의 정책을 이 방식 전용 인스턴스로 사용)
+RetryPolicyName = Literal["exponential", "full_jitter", "decorrelated", "adaptive"]
+
+@router.post("/transfer", response_model=TransferResponse)
+async def serializable_transfer(
+    request: TransferRequest,
+    isolation: Isolation = "serializable",
+    retry_policy: RetryPolicyName = "full_jitter"
+):
+    """격리 수준에 맡긴 계좌 이체 (직렬화 실패 40001 / 데드락 40P01 이면 자동 재시도)"""
+    return await service.transfer(request, isolation=isolation, retry_policy=retry_policy)
+
+@router.post("/initialize")
+async def initialize_accounts(
+    accounts: int = Query(2, ge=2, le=10_000_000),
+    balance_distribution: BalanceDistribution = "fixed",
+    seed: Optional[int] = None
+):
+    """계좌 초기화 (account_a: 100000, account_b: 100000)
+    accounts > 2 이면 account_000000 ~ 형식으로 계좌마다 100000
+    balance_distribution: 계좌별 잔액 분포 (fixed / uniform / pareto, 총 잔액은 같음), seed 로 재현 가능
+    """
+    balances = await service.initialize_accounts(accounts, balance_distribution, seed)
+    return {"message": "계좌가 초기화되었습니다.", "balances": balances}
+
+@router.get("/balances")
+async def get_balances(cache: bool = True, accounts: Optional[List[str]] = Query(None, max_length=1000)):
+    """현재 잔액 조회
+    기본은 잔액 캐시 경유 (이체 커밋 시 갱신), cache=false 면 DB 직접 조회
+    accounts=...&accounts=... 로 조회할 계좌 지정 (기본 account_a / account_b)
+    """
+    balances = await service.get_balances(use_cache=cache, accounts=accounts)
+    return {"balances": balances}
+
+@router.get("/accounts")
+async def list_accounts(after: str = "", limit: int = Query(100, ge=1, le=10000)):
+    """전체 계좌 잔액 목록 (계좌 id 순, 다음 페이지는 응답의 next_after 를 after 로 전달)"""
+    return await service.list_balances(after, limit)
+
+@router.post("/stress-test")
+async def stress_test(
+    params: StressTestParams = Depends(),
+    isolation: Isolation = "serializable",
+    retry_policy: RetryPolicyName = "full_jitter",
+    stream: bool = False
+):
+    """스트레스 테스트: 기본값은 10개의 동시 이체 요청 (각각 10000원)
+    requests / concurrency / accounts / amount / distribution 으로 규모(경합 정도) 조절
+    isolation=repeatable_read 이면 스냅샷 격리로 실행
+    응답의 serialization 에 이번 테스트 동안의 시도/직렬화 실패 횟수와 실패율
+    stream=true 이면 이체가 끝날 때마다 NDJSON 한 줄씩 + 마지막에 요약 한 줄
+    기본값 최종 잔액 확인
+    account_a: 0원
+    account_b: 200000원
+    """
+
+    # 먼저 계좌 초기화
+    await service.initialize_accounts(params.accounts, params.balance_distribution)
+    before = service.stats[isolation].snapshot()
+    policy = service.retry_policies[retry_policy]
+    policy.reset_stats()
+
+    async def transfer(request: TransferRequest) -> TransferResponse:
+        return await service.transfer(request, isolation=isolation, retry_policy=retry_policy)
+
+    async def build_report(stats, total_time):
+        report = stress_report(stats, total_time, params, await service.get_balance_summary(), service.initial_balance)
+        if params.accounts == 2:
+            # 최종 잔액 확인
+            report["final_balances"] = await service.get_balances(use_cache=False)
+        after = service.stats[isolation].snapshot()
+        delta = {key: after[key] - before[key] for key in after if key != "retries_per_transfer"}
+        return {
+            "message": "격리 수준 스트레스 테스트 완료",
+            "isolation": isolation,
+            "retry_policy": retry_policy,
+            **report,
+            "serialization": {**delta, **failure_rates(delta)},
+            "retry_stats": policy.stats()
+        }
+
+    if stream:
+        return StreamingResponse(stream_stress(transfer, params, build_report), media_type="application/x-ndjson")
+
+    # 시작 시간 기록
+    start_time = time.perf_counter()
+
+    # 동시 실행 수를 concurrency로 제한해서 실행 (결과는 집계만 유지)
+    stats = await run_stress(transfer, params)
+
+    # 총 실행 시간 계산
+    total_time = time.perf_counter() - start_time
+
+    return await build_report(stats, total_time)
+
+@router.get("/stats")
+async def serialization_stats():
+    """격리 수준별 누적 시도/커밋/직렬화 실패/데드락 횟수, 실패율, 이체 1건당 재시도 횟수 분포
+    retry_policies: 이 방식 전용 재시도 정책별 대기시간 분포 (낙관적락 /optimistic 과 별도 집계)
+    """
+    return service.get_stats()
+
+@router.get("/transfers")
+async def list_transfers(
+    account: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000)
+):
+    """이체 저널 조회 (최신순, 키셋 페이지네이션)
+    account 를 주면 그 계좌가 출금/입금한 이체만, 다음 페이지는 응답의 next_cursor 를 cursor 로 전달
+    """
+    return await serializable_journal.query(account, cursor, limit)
+
+@router.get("/transfers/verify")
+async def verify_transfers():
+    """이체 저널로 복원한 계좌별 잔액과 현재 잔액 비교"""
+    return await serializable_journal.verify()
+
+@router.post("/transfers/rebuild")
+async def rebuild_balances():
+    """이체 저널로 잔액 스냅샷 복원 (계좌별 마지막 이체의 처리 후 잔액을 accounts 에 반영)"""
+    return await serializable_journal.rebuild()
+
+@router.get("/info")
+async def serializable_info():
+    """격리 수준 방식 정보"""
+    return {
+        "method": "Serializable Isolation",
+        "database": "PostgreSQL",
+        "technique": "SERIALIZABLE / REPEATABLE READ 트랜잭션 + 40001/40P01 자동 재시도",
+        "isolation": {
+            "serializable": "SSI - 동시 실행 결과가 직렬 실행과 다르면 한쪽을 40001로 중단",
+            "repeatable_read": "스냅샷 격리 - 같은 행을 동시에 갱신하면 나중 쪽이 40001"
+        },
+        "retry": "재시도 정책의 지터 대기 + 시간 예산, 최대 시도 횟수 제한",
+        "description": "락/version 없이 평범한 읽기-확인-쓰기를 DB 격리 수준에 맡기는 방식",
+        "pros": [
+            "애플리케이션 동시성 제어 코드 불필요",
+            "여러 행/조건에 걸친 불변식도 DB가 보장"
+        ],
+        "cons": [
+            "경합이 높으면 직렬화 실패와 재시도 급증",
+            "SSI 추적 비용 (predicate lock)",
+            "실패한 트랜잭션 작업이 전부 낭비"
+        ]
+    }
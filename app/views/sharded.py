@@ -0,0 +1,112 @@
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
+import time
+from typing import List, Optional
+from ..models import TransferRequest, TransferResponse, StressTestParams, BalanceDistribution
+from ..stress import run_stress, stream_stress, stress_report
+from ..scenarios.sharded import ShardedTransferService
+
+# 샤딩 전용 라우터 생성
+router = APIRouter(
+    prefix="/sharded",
+    tags=["Sharded (PostgreSQL)"],
+    responses={404: {"description": "Not found"}}
+)
+
+# 서비스 인스턴스 생성
+service = ShardedTransferService()
+
+@router.post("/transfer", response_model=TransferResponse)
+async def sharded_transfer(request: TransferRequest):
+    """샤드 이체 (같은 샤드면 로컬 트랜잭션, 다른 샤드면 PREPARE TRANSACTION 2단계 커밋)"""
+    return await service.transfer(request)
+
+@router.post("/initialize")
+async def initialize_accounts(
+    accounts: int = Query(2, ge=2, le=10_000_000),
+    balance_distribution: BalanceDistribution = "fixed",
+    seed: Optional[int] = None
+):
+    """계좌 초기화 (계좌를 일관된 해시로 샤드에 나눠서 적재)
+    balance_distribution: 계좌별 잔액 분포 (fixed / uniform / pareto, 총 잔액은 같음), seed 로 재현 가능
+    """
+    balances = await service.initialize_accounts(accounts, balance_distribution, seed)
+    return {"message": "계좌가 초기화되었습니다.", "balances": balances}
+
+@router.get("/balances")
+async def get_balances(accounts: Optional[List[str]] = Query(None, max_length=1000)):
+    """현재 잔액 조회 (accounts=...&accounts=... 로 계좌 지정, 기본 account_a / account_b)"""
+    balances = await service.get_balances(accounts)
+    return {"balances": balances}
+
+@router.get("/shards")
+async def shard_info():
+    """샤드별 계좌 수/총 잔액, 기본 계좌의 샤드 위치, 로컬/2단계 커밋/복구 건수"""
+    return await service.shard_info()
+
+@router.post("/recover")
+async def recover(min_age: float = Query(30.0, ge=0)):
+    """min_age초 넘게 남은 PREPARE 트랜잭션을 커밋 결정 기록(shard_commits)에 따라 커밋/롤백"""
+    return await service.recover(min_age)
+
+@router.post("/stress-test")
+async def stress_test(params: StressTestParams = Depends(), stream: bool = False):
+    """스트레스 테스트: 기본값은 10개의 동시 이체 요청 (각각 10000원)
+    requests / concurrency / accounts / amount / distribution 으로 규모 조절
+    계좌가 많을수록 다른 샤드 간 이체(2단계 커밋) 비율이 높아짐 (샤드 N개면 약 (N-1)/N)
+    stream=true 이면 이체가 끝날 때마다 NDJSON 한 줄씩 + 마지막에 요약 한 줄
+    """
+
+    # 먼저 계좌 초기화
+    await service.initialize_accounts(params.accounts, params.balance_distribution)
+    counters_before = dict(service.counters)
+
+    async def build_report(stats, total_time):
+        report = stress_report(stats, total_time, params, await service.get_balance_summary(), service.initial_balance)
+        if params.accounts == 2:
+            # 최종 잔액 확인
+            report["final_balances"] = await service.get_balances()
+        return {
+            "message": "샤딩 스트레스 테스트 완료",
+            **report,
+            "shard_transfers": {
+                name: value - counters_before[name] for name, value in service.counters.items()
+            }
+        }
+
+    if stream:
+        return StreamingResponse(stream_stress(service.transfer, params, build_report), media_type="application/x-ndjson")
+
+    # 시작 시간 기록
+    start_time = time.perf_counter()
+
+    # 동시 실행 수를 concurrency로 제한해서 실행 (결과는 집계만 유지)
+    stats = await run_stress(service.transfer, params)
+
+    # 총 실행 시간 계산
+    total_time = time.perf_counter() - start_time
+
+    return await build_report(stats, total_time)
+
+@router.get("/info")
+async def sharded_info():
+    """샤딩 방식 정보"""
+    return {
+        "method": "Sharded",
+        "database": f"PostgreSQL x {len(service.router.shards)}",
+        "technique": "일관된 해시 샤드 라우팅 + PREPARE TRANSACTION 2단계 커밋",
+        "write_path": {
+            "local": "같은 샤드: FOR UPDATE (id 순서) -> 다중 행 UPDATE -> COMMIT",
+            "cross_shard": "샤드 번호 순서로 BEGIN/FOR UPDATE/UPDATE/PREPARE -> coordinator부터 COMMIT PREPARED"
+        },
+        "description": "계좌를 여러 DB에 나눠서 DB 1대의 처리량 한계를 넘는 방식",
+        "pros": [
+            "같은 샤드 이체는 샤드끼리 독립적으로 처리 (샤드 수만큼 수평 확장)",
+            "샤드 추가 시 일관된 해시로 일부 계좌만 이동"
+        ],
+        "cons": [
+            "다른 샤드 간 이체는 2단계 커밋으로 라운드트립과 락 보유 시간 증가",
+            "중간 장애 시 PREPARE 트랜잭션이 락을 잡은 채 남음 (/sharded/recover 로 정리)",
+            "max_prepared_transactions 설정 필요"
+        ]
+    }
@@ -0,0 +1,76 @@
+import bisect
+import random
+from typing import List, Optional, Tuple
+
+# 부하 생성 공통 도구 (벤치마크 CLI / 스트레스 테스트에서 같이 사용)
+
+# 이체 결과 분류
+OUTCOMES = ["success", "insufficient", "conflict", "lock_failure", "deadlock", "not_found", "error"]
+
+
+def account_ids(count: int) -> List[str]:
+    """계좌 id 목록: 2개면 기존 account_a/account_b, 그 이상이면 account_000000 형식"""
+    if count == 2:
+        return ["account_a", "account_b"]
+    return [f"account_{i:06d}" for i in range(count)]
+
+
+def classify(success: bool, message: str) -> str:
+    """TransferResponse의 success/message로 결과 분류"""
+    if success:
+        return "success"
+    if "잔액이 부족" in message:
+        return "insufficient"
+    if "락 획득 실패" in message or "락 유효 시간 초과" in message or "펜싱 토큰 거부" in message:
+        return "lock_failure"
+    if "데드락" in message:
+        return "deadlock"
+    if "충돌" in message or "재시도 한도" in message:
+        return "conflict"
+    if "계좌를 찾을 수 없" in message:
+        return "not_found"
+    return "error"
+
+
+# 계좌 쌍 분포
+# fixed  : 항상 첫 번째 -> 두 번째 계좌 (기존 account_a -> account_b 패턴)
+# uniform: 균등 분포
+# zipf   : Zipf 분포 (skew가 클수록 소수 핫 계좌에 집중)
+DISTRIBUTIONS = ["fixed", "uniform", "zipf"]
+
+
+class AccountSampler:
+    """계좌 쌍 샘플러"""
+
+    def __init__(self, accounts: List[str], distribution: str = "uniform", skew: float = 1.1,
+                 seed: Optional[int] = None):
+        if distribution not in DISTRIBUTIONS:
+            raise ValueError(f"알 수 없는 분포: {distribution}")
+        if len(accounts) < 2:
+            raise ValueError("계좌가 2개 이상 필요합니다.")
+        self.accounts = accounts
+        self.distribution = distribution
+        self.random = random.Random(seed)
+        self.cumulative = None
+        if distribution == "zipf":
+            total = 0.0
+            self.cumulative = []
+            for rank in range(len(accounts)):
+                total += 1.0 / ((rank + 1) ** skew)
+                self.cumulative.append(total)
+
+    def sample(self) -> str:
+        if self.cumulative is None:
+            return self.accounts[self.random.randrange(len(self.accounts))]
+        point = self.random.random() * self.cumulative[-1]
+        return self.accounts[bisect.bisect_left(self.cumulative, point)]
+
+    def pair(self) -> Tuple[str, str]:
+        """서로 다른 (출금, 입금) 계좌 쌍"""
+        if self.distribution == "fixed":
+            return self.accounts[0], self.accounts[1]
+        from_account = self.sample()
+        to_account = self.sample()
+        while to_account == from_account:
+            to_account = self.sample()
+        return from_account, to_account
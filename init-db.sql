@@ -2,8 +2,13 @@
 CREATE DATABASE pessimistic;
 CREATE DATABASE optimistic;
 CREATE DATABASE distributed;
+CREATE DATABASE advisory;
+CREATE DATABASE serializable;
+CREATE DATABASE shard_0;
+CREATE DATABASE shard_1;
+CREATE DATABASE shard_2;
 
--- 각 데이터베이스에 계정 테이블 생성
+-- 각 데이터베이스에 계정 테이블 + 이체 저널 테이블 생성 (월별 파티션은 앱 시작 시 생성)
 \c pessimistic;
 CREATE TABLE accounts (
     id VARCHAR(50) PRIMARY KEY,
@@ -13,6 +18,20 @@ CREATE TABLE accounts (
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
+CREATE TABLE transfers (
+    id BIGSERIAL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT clock_timestamp(),
+    from_account VARCHAR(50) NOT NULL,
+    to_account VARCHAR(50) NOT NULL,
+    amount INTEGER NOT NULL,
+    from_balance INTEGER NOT NULL,
+    to_balance INTEGER NOT NULL,
+    PRIMARY KEY (created_at, id)
+) PARTITION BY RANGE (created_at);
+CREATE INDEX transfers_from_account_idx ON transfers (from_account, created_at, id);
+CREATE INDEX transfers_to_account_idx ON transfers (to_account, created_at, id);
+CREATE TABLE transfers_default PARTITION OF transfers DEFAULT;
+
 \c optimistic;
 CREATE TABLE accounts (
     id VARCHAR(50) PRIMARY KEY,
@@ -22,7 +41,148 @@ CREATE TABLE accounts (
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
+CREATE TABLE transfers (
+    id BIGSERIAL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT clock_timestamp(),
+    from_account VARCHAR(50) NOT NULL,
+    to_account VARCHAR(50) NOT NULL,
+    amount INTEGER NOT NULL,
+    from_balance INTEGER NOT NULL,
+    to_balance INTEGER NOT NULL,
+    PRIMARY KEY (created_at, id)
+) PARTITION BY RANGE (created_at);
+CREATE INDEX transfers_from_account_idx ON transfers (from_account, created_at, id);
+CREATE INDEX transfers_to_account_idx ON transfers (to_account, created_at, id);
+CREATE TABLE transfers_default PARTITION OF transfers DEFAULT;
+
 \c distributed;
+CREATE TABLE accounts (
+    id VARCHAR(50) PRIMARY KEY,
+    balance INTEGER NOT NULL DEFAULT 0,
+    version INTEGER NOT NULL DEFAULT 0,
+    fence_token BIGINT NOT NULL DEFAULT 0, -- 마지막으로 갱신한 락 소유자의 펜싱 토큰
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE transfers (
+    id BIGSERIAL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT clock_timestamp(),
+    from_account VARCHAR(50) NOT NULL,
+    to_account VARCHAR(50) NOT NULL,
+    amount INTEGER NOT NULL,
+    from_balance INTEGER NOT NULL,
+    to_balance INTEGER NOT NULL,
+    PRIMARY KEY (created_at, id)
+) PARTITION BY RANGE (created_at);
+CREATE INDEX transfers_from_account_idx ON transfers (from_account, created_at, id);
+CREATE INDEX transfers_to_account_idx ON transfers (to_account, created_at, id);
+CREATE TABLE transfers_default PARTITION OF transfers DEFAULT;
+
+\c advisory;
+CREATE TABLE accounts (
+    id VARCHAR(50) PRIMARY KEY,
+    balance INTEGER NOT NULL DEFAULT 0,
+    version INTEGER NOT NULL DEFAULT 0,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE transfers (
+    id BIGSERIAL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT clock_timestamp(),
+    from_account VARCHAR(50) NOT NULL,
+    to_account VARCHAR(50) NOT NULL,
+    amount INTEGER NOT NULL,
+    from_balance INTEGER NOT NULL,
+    to_balance INTEGER NOT NULL,
+    PRIMARY KEY (created_at, id)
+) PARTITION BY RANGE (created_at);
+CREATE INDEX transfers_from_account_idx ON transfers (from_account, created_at, id);
+CREATE INDEX transfers_to_account_idx ON transfers (to_account, created_at, id);
+CREATE TABLE transfers_default PARTITION OF transfers DEFAULT;
+
+\c serializable;
+CREATE TABLE accounts (
+    id VARCHAR(50) PRIMARY KEY,
+    balance INTEGER NOT NULL DEFAULT 0,
+    version INTEGER NOT NULL DEFAULT 0,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE transfers (
+    id BIGSERIAL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT clock_timestamp(),
+    from_account VARCHAR(50) NOT NULL,
+    to_account VARCHAR(50) NOT NULL,
+    amount INTEGER NOT NULL,
+    from_balance INTEGER NOT NULL,
+    to_balance INTEGER NOT NULL,
+    PRIMARY KEY (created_at, id)
+) PARTITION BY RANGE (created_at);
+CREATE INDEX transfers_from_account_idx ON transfers (from_account, created_at, id);
+CREATE INDEX transfers_to_account_idx ON transfers (to_account, created_at, id);
+CREATE TABLE transfers_default PARTITION OF transfers DEFAULT;
+
+-- 샤드 DB (계좌는 /sharded/initialize 로 샤드에 나눠서 적재, shard_commits는 2단계 커밋 결정 기록)
+\c shard_0;
+CREATE TABLE accounts (
+    id VARCHAR(50) PRIMARY KEY,
+    balance INTEGER NOT NULL DEFAULT 0,
+    version INTEGER NOT NULL DEFAULT 0,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE transfers (
+    id BIGSERIAL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT clock_timestamp(),
+    from_account VARCHAR(50) NOT NULL,
+    to_account VARCHAR(50) NOT NULL,
+    amount INTEGER NOT NULL,
+    from_balance INTEGER NOT NULL,
+    to_balance INTEGER NOT NULL,
+    PRIMARY KEY (created_at, id)
+) PARTITION BY RANGE (created_at);
+CREATE INDEX transfers_from_account_idx ON transfers (from_account, created_at, id);
+CREATE INDEX transfers_to_account_idx ON transfers (to_account, created_at, id);
+CREATE TABLE transfers_default PARTITION OF transfers DEFAULT;
+
+CREATE TABLE shard_commits (
+    gid VARCHAR(200) PRIMARY KEY,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT clock_timestamp()
+);
+
+\c shard_1;
+CREATE TABLE accounts (
+    id VARCHAR(50) PRIMARY KEY,
+    balance INTEGER NOT NULL DEFAULT 0,
+    version INTEGER NOT NULL DEFAULT 0,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE transfers (
+    id BIGSERIAL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT clock_timestamp(),
+    from_account VARCHAR(50) NOT NULL,
+    to_account VARCHAR(50) NOT NULL,
+    amount INTEGER NOT NULL,
+    from_balance INTEGER NOT NULL,
+    to_balance INTEGER NOT NULL,
+    PRIMARY KEY (created_at, id)
+) PARTITION BY RANGE (created_at);
+CREATE INDEX transfers_from_account_idx ON transfers (from_account, created_at, id);
+CREATE INDEX transfers_to_account_idx ON transfers (to_account, created_at, id);
+CREATE TABLE transfers_default PARTITION OF transfers DEFAULT;
+
+CREATE TABLE shard_commits (
+    gid VARCHAR(200) PRIMARY KEY,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT clock_timestamp()
+);
+
+\c shard_2;
 CREATE TABLE accounts (
     id VARCHAR(50) PRIMARY KEY,
     balance INTEGER NOT NULL DEFAULT 0,
@@ -31,6 +191,25 @@ CREATE TABLE accounts (
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
+CREATE TABLE transfers (
+    id BIGSERIAL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT clock_timestamp(),
+    from_account VARCHAR(50) NOT NULL,
+    to_account VARCHAR(50) NOT NULL,
+    amount INTEGER NOT NULL,
+    from_balance INTEGER NOT NULL,
+    to_balance INTEGER NOT NULL,
+    PRIMARY KEY (created_at, id)
+) PARTITION BY RANGE (created_at);
+CREATE INDEX transfers_from_account_idx ON transfers (from_account, created_at, id);
+CREATE INDEX transfers_to_account_idx ON transfers (to_account, created_at, id);
+CREATE TABLE transfers_default PARTITION OF transfers DEFAULT;
+
+CREATE TABLE shard_commits (
+    gid VARCHAR(200) PRIMARY KEY,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT clock_timestamp()
+);
+
 -- 초기 데이터 삽입 (pessimistic)
 \c pessimistic;
 INSERT INTO accounts (id, balance) VALUES ('account_a', 100000);
@@ -44,4 +223,14 @@ INSERT INTO accounts (id, balance) VALUES ('account_b', 100000);
 -- 초기 데이터 삽입 (distributed)
 \c distributed;
 INSERT INTO accounts (id, balance) VALUES ('account_a', 100000);
-INSERT INTO accounts (id, balance) VALUES ('account_b', 100000); 
\ No newline at end of file
+INSERT INTO accounts (id, balance) VALUES ('account_b', 100000);
+
+-- 초기 데이터 삽입 (advisory)
+\c advisory;
+INSERT INTO accounts (id, balance) VALUES ('account_a', 100000);
+INSERT INTO accounts (id, balance) VALUES ('account_b', 100000);
+
+-- 초기 데이터 삽입 (serializable)
+\c serializable;
+INSERT INTO accounts (id, balance) VALUES ('account_a', 100000);
+INSERT INTO accounts (id, balance) VALUES ('account_b', 100000);
\ No newline at end of file
@@ -0,0 +1,350 @@
+import asyncio
+import time
+import traceback
+
+# DB / Redis 없이 돌아가는 순수 로직 확인 스크립트 (simple_test.py 는 실행 중인 서버 대상)
+# 사용법: python logic_test.py
+# 커넥션/노드가 필요한 부분은 최소한의 가짜 객체로 대신함
+
+
+############################prepared statement (커넥션 풀 반납 후 재사용)############################
+
+class FakePoolConnection:
+    """asyncpg 풀 커넥션 프록시 흉내: 반납(release) 후 사용하면 InterfaceError 와 같은 의미로 실패"""
+
+    def __init__(self, raw):
+        self._con = raw
+        self.released = False
+
+    async def fetch(self, query, *args):
+        if self.released:
+            raise RuntimeError("cannot call fetch: the underlying connection has been released back to the pool")
+        self._con.executed.append(query)
+        return [{"query": query, "args": args}]
+
+    async def fetchrow(self, query, *args):
+        return (await self.fetch(query, *args))[0]
+
+    async def fetchval(self, query, *args):
+        return (await self.fetch(query, *args))[0]["args"]
+
+    async def prepare(self, query):
+        return FakePreparedStatement(self, query)
+
+
+class FakePreparedStatement:
+    """PreparedStatement 흉내: 만든 체크아웃의 커넥션이 반납되면 사용 불가"""
+
+    def __init__(self, conn, query):
+        self.conn = conn
+        self.query = query
+
+    async def fetch(self, *args):
+        return await self.conn.fetch(self.query, *args)
+
+    async def fetchrow(self, *args):
+        return await self.conn.fetchrow(self.query, *args)
+
+    async def fetchval(self, *args):
+        return await self.conn.fetchval(self.query, *args)
+
+
+class FakeRawConnection:
+    def __init__(self):
+        self.executed = []
+
+
+def check_statement_after_release():
+    """같은 물리 커넥션을 두 번 체크아웃해도 두 번째 체크아웃의 실행이 실패하지 않아야 함"""
+    from app.database import prepare_statement
+
+    async def run():
+        raw = FakeRawConnection()
+        for checkout in range(3):
+            conn = FakePoolConnection(raw)
+            stmt = await prepare_statement(conn, "SELECT 1 WHERE $1")
+            row = await stmt.fetchrow(checkout)
+            assert row["args"] == (checkout,)
+            conn.released = True  # 풀에 반납
+        assert len(raw.executed) == 3
+
+    asyncio.run(run())
+
+
+############################벌크 이체 메모리 적용 (apply_transfers / involved_accounts)############################
+
+def transfer(from_account, to_account, amount):
+    from app.models import TransferRequest
+    return TransferRequest(from_account=from_account, to_account=to_account, amount=amount)
+
+
+def check_apply_transfers():
+    """들어온 순서대로 적용, 잔액 부족/없는 계좌는 그 건만 실패, 변경된 계좌는 마지막 잔액"""
+    from app.scenarios.batching import apply_transfers, involved_accounts
+
+    transfers = [
+        transfer("b", "a", 70),
+        transfer("b", "c", 50),   # 잔액 부족 (30 남음)
+        transfer("a", "b", 20),
+        transfer("a", "zz", 1),   # 없는 계좌
+    ]
+    assert involved_accounts(transfers) == ["a", "b", "c", "zz"]
+
+    balances = {"a": 0, "b": 100, "c": 0}
+    outcomes, changed = apply_transfers(balances, transfers)
+    assert [success for success, _, _, _ in outcomes] == [True, False, True, False]
+    assert outcomes[0][2:] == (30, 70)
+    assert outcomes[1][2:] == (30, 0)
+    assert outcomes[3][2:] == (None, None)
+    assert changed == {"a": 50, "b": 50}
+    assert balances == {"a": 50, "b": 50, "c": 0}
+    assert sum(balances.values()) == 100
+
+
+############################그룹 커밋 배처 (TransferBatcher)############################
+
+def check_transfer_batcher():
+    """max_batch 에 차면 바로, 아니면 max_wait 후 한 번에 커밋하고 각 호출자는 자기 결과를 받음
+    commit_batch 가 실패하면 배치 전체가 실패 응답
+    """
+    from app.scenarios.batching import TransferBatcher, apply_transfers
+
+    async def run():
+        balances = {"a": 100, "b": 0}
+        batches = []
+
+        async def commit_batch(requests):
+            batches.append(len(requests))
+            outcomes, _ = apply_transfers(balances, requests)
+            return outcomes
+
+        batcher = TransferBatcher(commit_batch, max_batch=3, max_wait=0.01)
+        results = await asyncio.gather(*(batcher.submit(transfer("a", "b", 30)) for _ in range(5)))
+        assert batches == [3, 2]  # 3건은 가득 차서 바로, 나머지 2건은 max_wait 후
+        assert [result.success for result in results] == [True, True, True, False, False]
+        assert results[2].from_balance == 10 and results[2].to_balance == 90
+        assert balances == {"a": 10, "b": 90}
+
+        async def broken(requests):
+            raise RuntimeError("db down")
+
+        failing = TransferBatcher(broken, max_batch=10, max_wait=0.001)
+        results = await asyncio.gather(*(failing.submit(transfer("a", "b", 1)) for _ in range(2)))
+        assert all(not result.success and "db down" in result.message for result in results)
+
+    asyncio.run(run())
+
+
+############################재시도 정책 / 계좌별 충돌률 (app/retry.py)############################
+
+def check_retry_policies():
+    """정책별 대기시간 범위, 충돌률 추정기 LRU/감쇠 삭제, reset_stats 초기화"""
+    from app.retry import (
+        ConflictRateEstimator, ExponentialBackoff, FullJitter, DecorrelatedJitter, AdaptiveJitter,
+        RetryPolicy, create_retry_policies
+    )
+
+    exponential = ExponentialBackoff()
+    assert [exponential.next_delay(attempt, 0, "a") for attempt in (1, 2, 3)] == [0.01, 0.02, 0.04]
+
+    full = FullJitter()
+    for attempt in range(1, 20):
+        assert 0 <= full.next_delay(attempt, 0, "a") <= min(full.cap, full.base * 2 ** (attempt - 1))
+
+    decorrelated = DecorrelatedJitter()
+    delay = 0.0
+    for attempt in range(1, 20):
+        delay = decorrelated.next_delay(attempt, delay, "a")
+        assert decorrelated.base <= delay <= decorrelated.cap
+
+    # 대기시간 히스토그램 버킷 / 이체별 충돌 횟수
+    full.record_delay(0.003)
+    full.record_delay(5.0)
+    full.record_transfer(2, exhausted=True)
+    stats = full.stats()
+    assert stats["retry_delay_histogram"]["<=5ms"] == 1 and stats["retry_delay_histogram"][">1000ms"] == 1
+    assert stats["conflicts_per_transfer"] == {2: 1} and stats["exhausted"] == 1
+
+    # 충돌률: 최근 max_accounts 개만, 0 근처로 감쇠하면 삭제
+    estimator = ConflictRateEstimator(alpha=0.5, max_accounts=2)
+    for account in ("a", "b", "c"):
+        estimator.observe(account, True)
+    assert list(estimator.rates) == ["b", "c"] and estimator.rate("a") == 0.0
+    for _ in range(10):
+        estimator.observe("c", False)
+    assert "c" not in estimator.rates
+
+    # 적응형: 충돌이 많은 계좌일수록 대기 상한이 큼, reset_stats 로 추정도 초기화
+    adaptive = AdaptiveJitter()
+    for _ in range(20):
+        adaptive.observe("hot", True)
+    assert adaptive.estimator.rate("hot") > 0.9
+    adaptive.reset_stats()
+    assert adaptive.stats()["tracked_accounts"] == 0
+
+    # 시나리오마다 별도 인스턴스
+    assert create_retry_policies()["full_jitter"] is not create_retry_policies()["full_jitter"]
+    try:
+        RetryPolicy()
+        raise AssertionError("next_delay 없는 정책이 생성됨")
+    except TypeError:
+        pass
+
+
+############################잔액 캐시 version 가드 (BalanceCache)############################
+
+def check_balance_cache():
+    """오래된 version 은 새 값을 덮어쓰지 못함, TTL 만료, LRU 크기 제한, version 없는 결과는 무효화"""
+    from app.cache import BalanceCache
+    from app.models import TransferResponse
+
+    cache = BalanceCache("logic_test", max_size=2, ttl=60)
+    assert cache.put("a", 100, 5)
+    assert not cache.put("a", 90, 4)  # 동시에 읽은 예전 값
+    assert cache.get("a") == (100, 5) and cache.stale_rejections == 1
+    assert cache.put("a", 80, 5)      # 같은 version 은 허용
+
+    cache.put("b", 1, 1)
+    cache.get("a")                    # a 를 최근 사용으로
+    cache.put("c", 1, 1)              # 가장 오래 안 쓴 b 제거
+    assert cache.get("b") is None and cache.evictions == 1
+
+    cache.record_transfer(transfer("a", "c", 10), TransferResponse(
+        success=True, message="", from_balance=70, to_balance=11, from_version=6, to_version=2, execution_time=0
+    ))
+    assert cache.get("a") == (70, 6) and cache.get("c") == (11, 2)
+    cache.record_transfer(transfer("a", "c", 10), TransferResponse(
+        success=True, message="", from_balance=60, to_balance=21, execution_time=0
+    ))
+    assert cache.get("a") is None and cache.get("c") is None
+
+    expired = BalanceCache("logic_test", max_size=10, ttl=0.001)
+    expired.put("a", 1, 1)
+    time.sleep(0.01)
+    assert expired.get("a") is None and expired.expired == 1
+
+    disabled = BalanceCache("logic_test", max_size=10, ttl=0)
+    assert not disabled.put("a", 1, 1)
+
+
+############################일관된 해시 링 (ConsistentHashRing)############################
+
+def check_consistent_hash_ring():
+    """같은 키는 항상 같은 샤드, 샤드 간 분포가 고름, 샤드 추가 시 옮겨가는 키는 일부뿐"""
+    from app.sharding import ConsistentHashRing
+
+    accounts = [f"account_{index:06d}" for index in range(20000)]
+    ring = ConsistentHashRing(4)
+    assert ConsistentHashRing(4).shard_for("account_a") == ring.shard_for("account_a")
+
+    counts = [0] * 4
+    for account in accounts:
+        counts[ring.shard_for(account)] += 1
+    assert min(counts) > len(accounts) / 4 * 0.7, counts
+
+    grown = ConsistentHashRing(5)
+    moved = [account for account in accounts if ring.shard_for(account) != grown.shard_for(account)]
+    # 새 샤드로 옮겨간 키만 바뀜 (이론상 1/5 정도)
+    assert all(grown.shard_for(account) == 4 for account in moved)
+    assert len(moved) < len(accounts) * 0.35, len(moved)
+
+
+############################Redlock 과반 / 유효 시간 계산############################
+
+class FakeRedlockNode:
+    def __init__(self, ok: bool, delay: float = 0.0):
+        self.ok = ok
+        self.delay = delay
+        self.released = 0
+
+    async def acquire(self, lock_keys, lock_value, ttl_ms):
+        await asyncio.sleep(self.delay)
+        return self.ok
+
+    async def release(self, lock_keys, lock_value):
+        self.released += 1
+        return 1 if self.ok else 0
+
+
+def check_redlock_validity():
+    """과반 성공이면 유효 시간 = TTL - 획득 시간 - (TTL x drift + 2ms), 과반 실패/유효 시간 없음이면 전 노드 해제"""
+    from app.redlock import Redlock
+
+    def make(nodes):
+        lock = Redlock([], node_timeout=0.05)
+        lock.nodes = nodes
+        lock.quorum = len(nodes) // 2 + 1
+        return lock
+
+    async def run():
+        lock = make([FakeRedlockNode(True), FakeRedlockNode(True), FakeRedlockNode(False)])
+        validity = await lock.acquire(["k"], "v", 1000)
+        assert validity is not None and 1000 - 12 - 5 < validity <= 1000 - 12, validity
+        assert lock.acquired == 1
+
+        nodes = [FakeRedlockNode(True), FakeRedlockNode(False), FakeRedlockNode(False)]
+        lock = make(nodes)
+        assert await lock.acquire(["k"], "v", 1000) is None
+        assert lock.quorum_failures == 1 and all(node.released == 1 for node in nodes)
+
+        # 과반은 잡았지만 획득에 TTL보다 오래 걸림 -> 유효 시간 없음
+        nodes = [FakeRedlockNode(True, delay=0.03)] * 3
+        lock = make(nodes)
+        assert await lock.acquire(["k"], "v", 20) is None
+        assert lock.quorum_failures == 1
+
+    asyncio.run(run())
+
+
+############################메트릭 텍스트 포맷 (app/metrics.py)############################
+
+def check_metrics_exposition():
+    """히스토그램 버킷은 누적으로 출력 + _sum / _count, 카운터는 라벨별 1줄"""
+    from app.metrics import Registry, Histogram, Counter
+
+    registry = Registry()
+    histogram = registry.register(Histogram("test_seconds", "테스트", buckets=(0.1, 1.0)))
+    counter = registry.register(Counter("test_total", "테스트", labelnames=("strategy", "result")))
+
+    child = histogram.labels("optimistic")
+    assert histogram.labels("optimistic") is child  # 같은 라벨이면 같은 시계열
+    for value in (0.05, 0.1, 0.5, 2.0):
+        child.observe(value)
+    counter.labels("optimistic", "committed").inc()
+    counter.labels("optimistic", "committed").inc(2)
+
+    lines = registry.render().splitlines()
+    assert lines[:2] == ["# HELP test_seconds 테스트", "# TYPE test_seconds histogram"]
+    assert 'test_seconds_bucket{strategy="optimistic",le="0.1"} 2' in lines   # 경계값 포함
+    assert 'test_seconds_bucket{strategy="optimistic",le="1.0"} 3' in lines
+    assert 'test_seconds_bucket{strategy="optimistic",le="+Inf"} 4' in lines
+    assert 'test_seconds_sum{strategy="optimistic"} 2.65' in lines
+    assert 'test_seconds_count{strategy="optimistic"} 4' in lines
+    assert "# TYPE test_total counter" in lines
+    assert 'test_total{strategy="optimistic",result="committed"} 3' in lines
+
+
+CHECKS = [
+    check_statement_after_release,
+    check_apply_transfers,
+    check_transfer_batcher,
+    check_retry_policies,
+    check_balance_cache,
+    check_consistent_hash_ring,
+    check_redlock_validity,
+    check_metrics_exposition,
+]
+
+
+if __name__ == "__main__":
+    failed = 0
+    for check in CHECKS:
+        try:
+            check()
+            print(f"통과: {check.__name__}")
+        except Exception:
+            failed += 1
+            print(f"실패: {check.__name__}")
+            traceback.print_exc()
+    print(f"\n{len(CHECKS) - failed}/{len(CHECKS)} 통과")
+    raise SystemExit(1 if failed else 0)